@@ -1,5 +1,5 @@
 
-import React from 'react';
+import React, { useEffect, useState } from 'react';
 import { Dialog, DialogContent, DialogTitle, DialogDescription, DialogClose } from '@/components/ui/dialog';
 import { Button } from '@/components/ui/button';
 import { ScrollArea } from '@/components/ui/scroll-area';
@@ -7,6 +7,7 @@ import { Tabs, TabsContent, TabsList, TabsTrigger } from '@/components/ui/tabs';
 import { Plus, Minus, X, ShoppingBag, Info, Calendar, Package, Utensils, AlertCircle } from 'lucide-react';
 import { useCart, Product } from '@/context/CartContext';
 import { useToast } from '@/hooks/use-toast';
+import { apiService } from '@/services/api';
 
 interface ProductDetailModalProps {
   product: Product | null;
@@ -14,11 +15,31 @@ interface ProductDetailModalProps {
   onOpenChange: (open: boolean) => void;
 }
 
-const ProductDetailModal = ({ product, open, onOpenChange }: ProductDetailModalProps) => {
+const ProductDetailModal = ({ product: listProduct, open, onOpenChange }: ProductDetailModalProps) => {
   const { addToCart, items, updateQuantity, removeFromCart } = useCart();
   const { toast } = useToast();
+  const [details, setDetails] = useState<Partial<Product> | null>(null);
   
-  if (!product) return null;
+  // Grids load the slim "list" fieldset; fetch the full product (description etc.) when opened
+  const productId = listProduct?.id;
+  useEffect(() => {
+    if (!open || productId === undefined) return;
+    let cancelled = false;
+    apiService.getProductById(productId)
+      .then((response) => {
+        if (!cancelled && response.success) setDetails(response.data);
+      })
+      .catch((error) => console.error('Failed to load product details:', error));
+    return () => {
+      cancelled = true;
+    };
+  }, [open, productId]);
+  
+  if (!listProduct) return null;
+  
+  const product: Product = details && details.id === listProduct.id
+    ? { ...listProduct, ...details }
+    : listProduct;
   
   // Find the current item in the cart (if it exists)
   const cartItem = items.find(item => item.product.id === product.id);
@@ -17,11 +17,11 @@ export interface Product {
   name: string;
   category: string;
   price: number;
-  description: string;
+  description?: string; // Only in the "detail" fieldset
   image: string;
   stock: number;
-  rating: number;
-  reviews: number;
+  rating?: number;
+  reviews?: number;
   nutritionalInfo?: NutritionalInfo; // Fixed: No more 'any'
 }
 
@@ -46,6 +46,7 @@ export interface ProductsResponse {
   success: boolean;
   data: Product[];
   count: number;
+  next_cursor?: string | null;
 }
 
 export interface ApiError {
@@ -124,6 +125,14 @@ class ApiService {
     return this.request<{ success: boolean; data: Product }>(`/api/products/${id}`);
   }
   
+  // Resolve many products (e.g. the cart) in one request
+  async getProductsByIds(ids: number[]): Promise<ProductsResponse & { missing: number[] }> {
+    return this.request<ProductsResponse & { missing: number[] }>('/api/products/batch', {
+      method: 'POST',
+      body: JSON.stringify({ ids }),
+    });
+  }
+  
   async getCategories(): Promise<{ success: boolean; data: string[] }> {
     return this.request<{ success: boolean; data: string[] }>('/api/products/categories');
   }
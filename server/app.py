@@ -5,30 +5,48 @@ from routes.auth import auth_bp
 from routes.products import products_bp
 from routes.orders import orders_bp
 from models.supabase_client import supabase_service
+from models.data_backend import data_backend
+from models.stock_reservation import stock_reservations
+from models.health_probe import health_probe, cache_warm_state
+from utils.request_logging import init_logging
+from utils.json_provider import init_json
+from utils.compression import init_compression
+from utils.metrics import init_metrics
+from utils.tracing import init_tracing
+from utils.password_hasher import password_hasher
 import os
 import sys
 import logging
 
+logger = logging.getLogger(__name__)
+
 def create_app():
     """Create and configure Flask application."""
     app = Flask(__name__)
     
-    # Configure logging
-    logging.basicConfig(
-        level=logging.DEBUG,
-        format='[%(asctime)s] %(levelname)s in %(module)s: %(message)s',
-        handlers=[logging.StreamHandler(sys.stdout)]
-    )
-    
     # Load configuration
     if os.environ.get('FLASK_ENV') == 'production':
         app.config.from_object(ProductionConfig)
-        print("🚀 PRODUCTION MODE ACTIVATED")
+        mode_message = "🚀 PRODUCTION MODE ACTIVATED"
     else:
         app.config.from_object(DevelopmentConfig)
-        print("🛠️ DEVELOPMENT MODE ACTIVATED")
+        mode_message = "🛠️ DEVELOPMENT MODE ACTIVATED"
+    
+    # Server-Timing spans first, so the header also covers the hooks below
+    init_tracing(app)
+    
+    # Configure logging: queue-based handler plus one access line per request
+    init_logging(app)
+    logger.info(mode_message)
+    
+    # Per-route request metrics, served at /api/metrics
+    init_metrics(app)
     
-    print(f"✅ Flask app created successfully")
+    # Fast JSON serialization and gzip/brotli for large responses
+    init_json(app)
+    init_compression(app)
+    
+    logger.debug(f"✅ Flask app created successfully")
     
     # FIXED CORS CONFIGURATION - More explicit
     CORS(app, 
@@ -38,14 +56,14 @@ def create_app():
          supports_credentials=True,
          max_age=3600)
     
-    print("✅ CORS configured with explicit settings")
+    logger.debug("✅ CORS configured with explicit settings")
     
     # Handle preflight OPTIONS requests globally
     @app.before_request
     def handle_preflight():
         if request.method == "OPTIONS":
-            print(f"🔄 PREFLIGHT REQUEST: {request.url}")
-            print(f"📍 Origin: {request.headers.get('Origin')}")
+            logger.debug(f"🔄 PREFLIGHT REQUEST: {request.url}")
+            logger.debug(f"📍 Origin: {request.headers.get('Origin')}")
             response = jsonify({'status': 'OK'})
             response.headers.add('Access-Control-Allow-Origin', '*')
             response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
@@ -53,56 +71,60 @@ def create_app():
             response.headers.add('Access-Control-Max-Age', '3600')
             return response, 200
     
-    # Enhanced request logging
-    @app.before_request
-    def log_request_info():
-        if request.method != 'OPTIONS':  # Don't spam logs with OPTIONS
-            print(f"\n🔄 === {request.method} REQUEST ===")
-            print(f"📍 URL: {request.url}")
-            print(f"📡 Origin: {request.headers.get('Origin', 'No Origin')}")
-            print(f"🔑 Headers: {dict(request.headers)}")
-            sys.stdout.flush()
-    
-    # Enhanced response logging
-    @app.after_request
-    def log_response_info(response):
-        if request.method != 'OPTIONS':  # Don't spam logs with OPTIONS
-            print(f"📤 RESPONSE: {response.status_code}")
-            print(f"📋 Response Headers: {dict(response.headers)}")
-            print(f"=== END REQUEST ===\n")
-        sys.stdout.flush()
-        return response
-    
     # Register blueprints
     app.register_blueprint(auth_bp)
     app.register_blueprint(products_bp)
     app.register_blueprint(orders_bp)
-    print("✅ All blueprints registered successfully")
+    logger.debug("✅ All blueprints registered successfully")
+    
+    # Liveness: the process is up and serving; never touches the database
+    @app.route('/api/health/live', methods=['GET', 'OPTIONS'])
+    def health_live():
+        if request.method == 'OPTIONS':
+            return '', 200
+        return jsonify({'success': True, 'status': 'alive'}), 200
+    
+    # Readiness: the last background database probe, pool and cache state
+    @app.route('/api/health/ready', methods=['GET', 'OPTIONS'])
+    def health_ready():
+        if request.method == 'OPTIONS':
+            return '', 200
+        
+        database = health_probe.status()
+        ready = database.pop('ready')
+        if not ready:
+            logger.warning(f"⚠️ Not ready: {database}")
+        return jsonify({
+            'success': ready,
+            'status': 'ready' if ready else 'not_ready',
+            'database': database,
+            'database_pool': supabase_service.pool_stats(),
+            'caches': cache_warm_state()
+        }), 200 if ready else 503
     
     # Health check endpoint with CORS
     @app.route('/api/health', methods=['GET', 'OPTIONS'])
     def health_check():
         if request.method == 'OPTIONS':
             return '', 200
-            
-        print("🏥 Health check endpoint called")
-        try:
-            print("🔍 Testing Supabase connection...")
-            supabase = supabase_service.get_client()
-            response = supabase.table('users').select('count').execute()
-            db_status = "connected"
-            print("✅ Supabase connection successful")
-        except Exception as e:
-            db_status = f"error: {str(e)}"
-            print(f"❌ Supabase connection failed: {e}")
-            
+        
+        logger.debug("🏥 Health check endpoint called")
+        # Served from the background probe, so this never waits on the database
+        probe = health_probe.status()
+        db_status = probe['database']
+        
         health_data = {
             'success': True,
             'message': 'Balaji Store Backend is running',
             'version': '1.0.0',
             'environment': os.environ.get('FLASK_ENV', 'development'),
             'database': db_status,
+            'database_checked_seconds_ago': probe.get('checked_seconds_ago'),
+            'database_pool': supabase_service.pool_stats(),
+            'data_backend': data_backend.stats(),
             'cors': 'enabled',
+            'password_hasher': password_hasher.stats(),
+            'stock_reservations': stock_reservations.stats(),
             'endpoints': {
                 'auth': '/api/auth/',
                 'products': '/api/products/',
@@ -110,13 +132,13 @@ def create_app():
             }
         }
         
-        print(f"🏥 Health check response: {health_data}")
+        logger.debug(f"🏥 Health check response: {health_data}")
         return jsonify(health_data), 200
     
     # Error handlers with CORS
     @app.errorhandler(404)
     def not_found(error):
-        print(f"❌ 404 Error - Path not found: {request.url}")
+        logger.warning(f"❌ 404 Error - Path not found: {request.url}")
         response = jsonify({
             'success': False,
             'message': 'Endpoint not found',
@@ -127,7 +149,7 @@ def create_app():
     
     @app.errorhandler(500)
     def internal_error(error):
-        print(f"💥 500 Error - Internal server error: {error}")
+        logger.error(f"💥 500 Error - Internal server error: {error}")
         response = jsonify({
             'success': False,
             'message': 'Internal server error'
@@ -0,0 +1,37 @@
+"""ASGI entry point, so the API can be deployed under an ASGI server.
+
+Run with ``uvicorn asgi:app --host 0.0.0.0 --port 5000``.
+
+This is deployability only, not an async serving mode. The handlers
+stay synchronous Flask views on the blocking database client, and
+a2wsgi runs each request on a pool of ASGI_THREADS threads. Every
+request in flight therefore holds a thread and, while it waits on the
+database, a pooled connection. Concurrency is the same as a threaded
+WSGI server with as many threads. The event loop only takes over
+accepting connections, reading request bodies and writing responses,
+so idle keep-alive and slow clients cost no thread.
+
+ASGI_THREADS defaults to SUPABASE_POOL_MAX_CONNECTIONS. With more
+threads than connections, the extra threads only wait on the pool (and
+fail after SUPABASE_POOL_TIMEOUT) instead of queueing cheaply in the
+event loop. To hold more requests in flight, raise both together.
+"""
+from a2wsgi import WSGIMiddleware
+from decouple import config
+from app import app as flask_app
+from models.data_backend import data_backend
+from models.supabase_client import SUPABASE_POOL_MAX_CONNECTIONS
+import logging
+
+logger = logging.getLogger(__name__)
+
+ASGI_THREADS = config('ASGI_THREADS', default=SUPABASE_POOL_MAX_CONNECTIONS, cast=int)
+# Response chunks buffered per request before the worker thread waits
+ASGI_SEND_QUEUE_SIZE = config('ASGI_SEND_QUEUE_SIZE', default=10, cast=int)
+
+if data_backend.backend == 'supabase' and ASGI_THREADS > SUPABASE_POOL_MAX_CONNECTIONS:
+    logger.warning(f"⚠️ ASGI_THREADS ({ASGI_THREADS}) exceeds SUPABASE_POOL_MAX_CONNECTIONS "
+                   f"({SUPABASE_POOL_MAX_CONNECTIONS}); the extra threads will wait on the pool")
+
+app = WSGIMiddleware(flask_app, workers=ASGI_THREADS, send_queue_size=ASGI_SEND_QUEUE_SIZE)
+logger.info(f"⚡ ASGI mode: {ASGI_THREADS} request threads")
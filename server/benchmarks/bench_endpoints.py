@@ -0,0 +1,311 @@
+"""Latency and throughput benchmark for every API route, with no network.
+
+The app runs in-process on the SQLite backend (DATA_BACKEND=sqlite), which
+answers the same postgrest query-builder calls as Supabase, seeded with
+configurable volumes. Each route is driven through Flask's test client and
+reported as p50/p95/p99 latency and requests/sec. Save a run with --output
+and pass it to --compare later to fail on regressions.
+
+    python benchmarks/bench_endpoints.py --products 100k --orders 50k --output base.json
+    python benchmarks/bench_endpoints.py --products 100k --orders 50k --compare base.json
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+CATEGORIES = ['Dairy', 'Bakery', 'Grains', 'Fruits', 'Vegetables', 'Snacks', 'Beverages']
+STATUSES = ['pending', 'confirmed', 'shipped', 'delivered', 'cancelled']
+PASSWORD = 'benchmark-password'
+SEED_BATCH = 10000
+
+def parse_volume(value):
+    """'5000', '10k' or '1M' -> int."""
+    multipliers = {'k': 1000, 'm': 1000000}
+    suffix = value[-1:].lower()
+    if suffix in multipliers:
+        return int(float(value[:-1]) * multipliers[suffix])
+    return int(value)
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def configure_environment(args):
+    """Point the app at a local SQLite file; must run before the app is imported."""
+    os.environ['DATA_BACKEND'] = 'sqlite'
+    os.environ['SQLITE_PATH'] = args.db
+    os.environ['CATALOG_READ_MIRROR'] = 'False'
+    os.environ['STOCK_RESERVATIONS_ENABLED'] = str(args.reservations)
+    os.environ.setdefault('SUPABASE_URL', 'http://127.0.0.1:54321')
+    os.environ.setdefault('SUPABASE_KEY', 'endpoint-benchmark')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+def seed(client, args):
+    """Bulk-load products, users and orders unless the file already holds them."""
+    from models.user import User
+    
+    connection = client.connection()
+    counts = {table: connection.execute(f'select count(*) from {table}').fetchone()[0]
+              for table in ('products', 'users', 'orders')}
+    wanted = {'products': args.products, 'users': args.users, 'orders': args.orders}
+    if counts == wanted:
+        return {'seeded': False, **counts}
+    if any(counts.values()):
+        raise SystemExit(f"{args.db} holds {counts}, not {wanted}; use another --db")
+    
+    started_at = time.perf_counter()
+    rng = random.Random(args.seed)
+    
+    def load(sql, rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == SEED_BATCH:
+                client.transaction(lambda c, b=batch: c.executemany(sql, b))
+                batch = []
+        if batch:
+            client.transaction(lambda c, b=batch: c.executemany(sql, b))
+    
+    load('insert into products (id, name, category, price, description, image, stock, rating, reviews) '
+         'values (?, ?, ?, ?, ?, ?, ?, ?, ?)', (
+        (i, f'Product {i}', CATEGORIES[i % len(CATEGORIES)], round(10 + (i % 500) * 1.25, 2),
+         f'Fresh, high quality product number {i} sourced from local farms.',
+         f'https://images.example.com/products/{i}.jpg', 1000000, 4.5, i % 300)
+        for i in range(1, args.products + 1)
+    ))
+    
+    # One bcrypt hash shared by every user: hashing a million passwords
+    # would take hours and measures nothing about the API
+    password_hash = User.hash_password(PASSWORD)
+    user_ids = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(args.users)]
+    load('insert into users (id, email, password_hash, name, role) values (?, ?, ?, ?, ?)', (
+        (user_id, f'user{i}@bench.local', password_hash, f'User {i}', 'customer')
+        for i, user_id in enumerate(user_ids)
+    ))
+    
+    order_ids = []
+    def orders():
+        for i in range(args.orders):
+            order_id = str(uuid.UUID(int=rng.getrandbits(128)))
+            order_ids.append(order_id)
+            created_at = f'2026-{1 + i % 9:02d}-{1 + i % 28:02d}T{i % 24:02d}:{i % 60:02d}:00+00:00'
+            yield (order_id, rng.choice(user_ids), round(rng.uniform(10, 500), 2),
+                   rng.choice(STATUSES), f'{i} Bench Street', created_at, created_at)
+    load('insert into orders (id, user_id, total_amount, status, delivery_address, created_at, updated_at) '
+         'values (?, ?, ?, ?, ?, ?, ?)', orders())
+    load('insert into order_items (order_id, product_id, quantity, unit_price, line_total) '
+         'values (?, ?, 1, 10, 10)', (
+        (order_id, rng.randint(1, args.products)) for order_id in order_ids
+    ))
+    client.transaction(lambda c: c.execute('analyze'))
+    return {'seeded': True, 'seed_seconds': round(time.perf_counter() - started_at, 2), **wanted}
+
+class Scenario:
+    """One route and a factory for its requests.
+    
+    ``build(rng)`` returns the keyword arguments for ``client.open()``; it
+    runs outside the timed section, so setup such as creating the
+    reservation a DELETE releases is not counted.
+    """
+    
+    def __init__(self, name, route, build):
+        self.name = name
+        self.route = route
+        self.build = build
+
+def build_scenarios(app, args):
+    from utils.jwt_helper import JWTHelper
+    from models.data_backend import data_backend
+    
+    client = data_backend.get_client()
+    users = client.query('select id, email, role from users order by random() limit 200', [])
+    with app.app_context():
+        tokens = [{'Authorization': f"Bearer {JWTHelper.encode_token(user['id'], user['email'], user['role'])}"}
+                  for user in users]
+    signup_counter = iter(range(10 ** 9))
+    signup_prefix = uuid.uuid4().hex[:8]
+    product_id = lambda rng: rng.randint(1, args.products)
+    
+    def release(rng):
+        headers = rng.choice(tokens)
+        response = app.test_client().post('/api/orders/reservations', headers=headers,
+                                          json={'items': [{'product_id': product_id(rng), 'quantity': 1}]})
+        return {'method': 'DELETE', 'headers': headers,
+                'path': f"/api/orders/reservations/{response.get_json()['data']['reservation_id']}"}
+    
+    scenarios = [
+        Scenario('health', 'GET /api/health', lambda rng: {'method': 'GET', 'path': '/api/health'}),
+        Scenario('products.list', 'GET /api/products/',
+                 lambda rng: {'method': 'GET', 'path': '/api/products/?limit=20'}),
+        Scenario('products.list_category', 'GET /api/products/?category=',
+                 lambda rng: {'method': 'GET', 'path': f'/api/products/?limit=20&category={rng.choice(CATEGORIES)}'}),
+        Scenario('products.search', 'GET /api/products/?search=',
+                 lambda rng: {'method': 'GET', 'path': f'/api/products/?limit=20&search=product {product_id(rng)}'}),
+        Scenario('products.detail', 'GET /api/products/<id>',
+                 lambda rng: {'method': 'GET', 'path': f'/api/products/{product_id(rng)}'}),
+        Scenario('products.batch', 'POST /api/products/batch',
+                 lambda rng: {'method': 'POST', 'path': '/api/products/batch',
+                              'json': {'ids': [product_id(rng) for _ in range(20)]}}),
+        Scenario('products.categories', 'GET /api/products/categories',
+                 lambda rng: {'method': 'GET', 'path': '/api/products/categories'}),
+        Scenario('products.suggest', 'GET /api/products/suggest',
+                 lambda rng: {'method': 'GET', 'path': f'/api/products/suggest?q=product {rng.randint(1, 99)}'}),
+        Scenario('auth.login', 'POST /api/auth/login',
+                 lambda rng: {'method': 'POST', 'path': '/api/auth/login',
+                              'json': {'email': rng.choice(users)['email'], 'password': PASSWORD}}),
+        Scenario('auth.signup', 'POST /api/auth/signup',
+                 lambda rng: {'method': 'POST', 'path': '/api/auth/signup',
+                              'json': {'email': f'signup-{signup_prefix}-{next(signup_counter)}@bench.local',
+                                       'password': PASSWORD, 'name': 'Bench Signup'}}),
+        Scenario('orders.list', 'GET /api/orders/',
+                 lambda rng: {'method': 'GET', 'path': '/api/orders/?limit=20', 'headers': rng.choice(tokens)}),
+        Scenario('orders.summary', 'GET /api/orders/summary',
+                 lambda rng: {'method': 'GET', 'path': '/api/orders/summary', 'headers': rng.choice(tokens)}),
+        Scenario('orders.create', 'POST /api/orders/',
+                 lambda rng: {'method': 'POST', 'path': '/api/orders/', 'headers': rng.choice(tokens),
+                              'json': {'delivery_address': '1 Bench Street',
+                                       'items': [{'product_id': product_id(rng), 'quantity': 1}
+                                                 for _ in range(3)]}})
+    ]
+    if args.reservations:
+        scenarios += [
+            Scenario('orders.reserve', 'POST /api/orders/reservations',
+                     lambda rng: {'method': 'POST', 'path': '/api/orders/reservations', 'headers': rng.choice(tokens),
+                                  'json': {'items': [{'product_id': product_id(rng), 'quantity': 1}]}}),
+            Scenario('orders.release', 'DELETE /api/orders/reservations/<id>', release)
+        ]
+    return scenarios
+
+def run_scenario(app, scenario, args):
+    rng = random.Random(args.seed)
+    rng_lock = threading.Lock()
+    local = threading.local()
+    
+    def one_request(_):
+        test_client = getattr(local, 'client', None)
+        if test_client is None:
+            test_client = local.client = app.test_client()
+        with rng_lock:
+            request = scenario.build(rng)
+        started = time.perf_counter()
+        response = test_client.open(**request)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        response.close()
+        return elapsed_ms, response.status_code
+    
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(one_request, range(args.warmup)))
+        started = time.perf_counter()
+        samples = list(pool.map(one_request, range(args.requests)))
+        wall_seconds = time.perf_counter() - started
+    
+    timings = sorted(elapsed_ms for elapsed_ms, _ in samples)
+    errors = sum(1 for _, status in samples if status >= 400)
+    return {
+        'route': scenario.route,
+        'requests': args.requests,
+        'errors': errors,
+        'p50_ms': round(percentile(timings, 0.50), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'p99_ms': round(percentile(timings, 0.99), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'rps': round(args.requests / wall_seconds, 1)
+    }
+
+def compare(results, baseline, max_regression):
+    """Routes whose p95 latency or throughput got worse than allowed."""
+    regressions = []
+    limit = 1 + max_regression / 100
+    for name, result in results['routes'].items():
+        before = baseline.get('routes', {}).get(name)
+        if before is None:
+            continue
+        if result['p95_ms'] > before['p95_ms'] * limit:
+            regressions.append(f"{name}: p95 {before['p95_ms']:.2f} -> {result['p95_ms']:.2f} ms")
+        if result['rps'] * limit < before['rps']:
+            regressions.append(f"{name}: {before['rps']:.0f} -> {result['rps']:.0f} req/s")
+        if result['errors'] > before['errors']:
+            regressions.append(f"{name}: {before['errors']} -> {result['errors']} errors")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--products', type=parse_volume, default=parse_volume('10k'))
+    parser.add_argument('--users', type=parse_volume, default=parse_volume('1k'))
+    parser.add_argument('--orders', type=parse_volume, default=parse_volume('10k'))
+    parser.add_argument('--requests', type=int, default=200, help='timed requests per route')
+    parser.add_argument('--warmup', type=int, default=20, help='untimed requests per route')
+    parser.add_argument('--concurrency', type=int, default=1, help='threads issuing requests')
+    parser.add_argument('--routes', help='comma-separated scenario names or prefixes (e.g. products,auth.login)')
+    parser.add_argument('--reservations', action='store_true',
+                        help='enable the stock reservation engine and benchmark its routes')
+    parser.add_argument('--db', help='SQLite file to seed and reuse (default: a temporary file)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write the JSON results to this file')
+    parser.add_argument('--compare', help='JSON results of an earlier run to check for regressions')
+    parser.add_argument('--max-regression', type=float, default=20, help='allowed slowdown in percent')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+    
+    temporary = None
+    if not args.db:
+        temporary = tempfile.TemporaryDirectory(prefix='bench-endpoints-')
+        args.db = os.path.join(temporary.name, 'store.sqlite3')
+    configure_environment(args)
+    
+    from app import app
+    from models.data_backend import data_backend
+    
+    dataset = seed(data_backend.get_client(), args)
+    scenarios = build_scenarios(app, args)
+    if args.routes:
+        wanted = [name.strip() for name in args.routes.split(',')]
+        scenarios = [scenario for scenario in scenarios
+                     if any(scenario.name == name or scenario.name.startswith(name + '.') for name in wanted)]
+    
+    results = {
+        'dataset': dataset,
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'python': sys.version.split()[0],
+        'routes': {}
+    }
+    for scenario in scenarios:
+        results['routes'][scenario.name] = run_scenario(app, scenario, args)
+        if not args.json:
+            result = results['routes'][scenario.name]
+            print(f"  {scenario.name:<24} p50 {result['p50_ms']:>8.2f}  p95 {result['p95_ms']:>8.2f}  "
+                  f"p99 {result['p99_ms']:>8.2f} ms  {result['rps']:>8.1f} req/s"
+                  + (f"  {result['errors']} errors" if result['errors'] else ''), flush=True)
+    
+    regressions = []
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.max_regression)
+        results['regressions'] = regressions
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+    
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+    if temporary is not None:
+        temporary.cleanup()
+    sys.exit(1 if regressions else 0)
+
+if __name__ == '__main__':
+    main()
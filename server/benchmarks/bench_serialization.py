@@ -0,0 +1,97 @@
+"""Serialization and compression benchmark for large catalog responses.
+
+Compares Flask's stdlib JSON provider with the orjson provider and reports
+bytes on the wire for identity, gzip and brotli encodings.
+
+    python benchmarks/bench_serialization.py --products 10000
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from utils.compression import brotli, compress
+from utils.json_provider import OrjsonProvider, orjson
+
+CATEGORIES = ['Dairy', 'Bakery', 'Grains', 'Fruits', 'Vegetables', 'Snacks', 'Beverages']
+
+def make_products(count):
+    """Rows shaped like Product.to_dict() with the "detail" fieldset."""
+    return [{
+        'id': i,
+        'name': f'Product {i}',
+        'category': CATEGORIES[i % len(CATEGORIES)],
+        'price': round(10 + (i % 500) * 1.25, 2),
+        'description': f'Fresh, high quality product number {i} sourced from local farms. ' * 2,
+        'image': f'https://images.example.com/products/{i}.jpg',
+        'stock': i % 120,
+        'rating': 4.5,
+        'reviews': i % 300,
+        'created_at': '2024-01-01T00:00:00+00:00',
+        'updated_at': '2024-06-01T12:30:00+00:00'
+    } for i in range(1, count + 1)]
+
+def time_response(app, provider, payload, runs):
+    timings = []
+    body = b''
+    with app.app_context():
+        for _ in range(runs):
+            started = time.perf_counter()
+            body = provider.response(payload).get_data()
+            timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), body
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--level', type=int, default=5, help='compression level (COMPRESS_LEVEL)')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    payload = {'success': True, 'data': make_products(args.products), 'count': args.products}
+
+    providers = {'stdlib': DefaultJSONProvider(app)}
+    if orjson is not None:
+        providers['orjson'] = OrjsonProvider(app)
+        providers['orjson'].sort_keys = False
+
+    results = {'products': args.products, 'runs': args.runs, 'serialization': {}, 'wire_bytes': {}}
+    body = b''
+    for name, provider in providers.items():
+        median_ms, body = time_response(app, provider, payload, args.runs)
+        results['serialization'][name] = {'median_ms': round(median_ms, 3), 'bytes': len(body)}
+
+    results['wire_bytes']['identity'] = len(body)
+    encodings = ['gzip'] + (['br'] if brotli is not None else [])
+    for encoding in encodings:
+        started = time.perf_counter()
+        encoded = compress(body, encoding, args.level)
+        results['wire_bytes'][encoding] = {
+            'bytes': len(encoded),
+            'ratio': round(len(encoded) / len(body), 4),
+            'compress_ms': round((time.perf_counter() - started) * 1000, 3)
+        }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"Serializing {args.products} products (median of {args.runs} runs)")
+    for name, result in results['serialization'].items():
+        print(f"  {name:<8} {result['median_ms']:>9.2f} ms  {result['bytes']:>10} bytes")
+    print("Bytes on the wire")
+    print(f"  identity {results['wire_bytes']['identity']:>10} bytes")
+    for encoding in encodings:
+        result = results['wire_bytes'][encoding]
+        print(f"  {encoding:<8} {result['bytes']:>10} bytes  ({result['ratio']:.1%}, {result['compress_ms']:.2f} ms)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Startup-time budget check for importing the app and calling create_app().
+
+Each run is a fresh interpreter, so module import costs are measured cold.
+Exits non-zero when the median exceeds the budget or when importing the
+app already loaded the network client libraries (which must stay lazy).
+
+    python benchmarks/startup_time.py --budget-ms 400
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Libraries that only the data layer needs, loaded on first get_client()
+LAZY_MODULES = ('supabase', 'postgrest', 'httpx')
+
+PROBE = f"""
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+create_app()
+elapsed_ms = (time.perf_counter() - started) * 1000
+print(json.dumps({{'ms': elapsed_ms, 'loaded': [m for m in {LAZY_MODULES!r} if m in sys.modules]}}))
+"""
+
+def measure_once():
+    env = dict(os.environ)
+    env.setdefault('SUPABASE_URL', 'http://127.0.0.1:54321')
+    env.setdefault('SUPABASE_KEY', 'startup-benchmark')
+    env.setdefault('LOG_LEVEL', 'WARNING')
+    output = subprocess.run([sys.executable, '-c', PROBE], cwd=SERVER_DIR, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float,
+                        default=float(os.environ.get('STARTUP_BUDGET_MS', 500)))
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+    
+    samples = [measure_once() for _ in range(args.runs)]
+    timings = [sample['ms'] for sample in samples]
+    loaded = sorted({module for sample in samples for module in sample['loaded']})
+    results = {
+        'runs': args.runs,
+        'median_ms': round(statistics.median(timings), 1),
+        'max_ms': round(max(timings), 1),
+        'budget_ms': args.budget_ms,
+        'eagerly_loaded': loaded
+    }
+    failures = []
+    if results['median_ms'] > args.budget_ms:
+        failures.append(f"median {results['median_ms']} ms is over the {args.budget_ms:g} ms budget")
+    if loaded:
+        failures.append(f"importing the app loaded {', '.join(loaded)}")
+    results['ok'] = not failures
+    
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"create_app() cold start over {args.runs} runs: "
+              f"median {results['median_ms']:.1f} ms, max {results['max_ms']:.1f} ms "
+              f"(budget {args.budget_ms:g} ms)")
+        for failure in failures:
+            print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,369 @@
+"""Stream products between CSV/JSONL files and the products table.
+
+Imports read one record at a time and upsert them in batches, so memory
+stays bounded by the batch size whatever the file size. After every
+committed batch a checkpoint file records how far the import got; rerun
+with --resume to continue after a crash or Ctrl-C. Exports page through
+the table by id and write each page straight to the output.
+
+    python catalog_cli.py import catalog.csv --batch-size 1000
+    python catalog_cli.py import catalog.jsonl --resume
+    python catalog_cli.py export products.jsonl --category Dairy
+    python catalog_cli.py export - --format csv > products.csv
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from models.data_backend import data_backend, is_api_error
+from models.product import PRODUCT_COLUMNS
+
+# Columns an import may set, with how CSV text is converted
+IMPORT_TYPES = {'id': int, 'name': str, 'category': str, 'price': float, 'description': str,
+                'image': str, 'stock': int, 'rating': float, 'reviews': int, 'created_at': str,
+                'updated_at': str}
+REQUIRED_FIELDS = ('name', 'price')
+# Left to their database defaults (or current values) when blank
+DEFAULTED_FIELDS = ('stock', 'rating', 'reviews', 'created_at', 'updated_at')
+WRITE_RETRIES = 3
+PROGRESS_SECONDS = 2.0
+
+class RecordError(ValueError):
+    """A record that cannot be imported; it is skipped and reported."""
+
+def detect_format(path: str, explicit: Optional[str]) -> str:
+    if explicit:
+        return explicit
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.jsonl', '.ndjson', '.json'):
+        return 'jsonl'
+    if extension == '.csv':
+        return 'csv'
+    raise SystemExit(f"Cannot tell the format of {path!r}; pass --format csv or --format jsonl")
+
+def read_records(stream, file_format: str) -> Iterator[Tuple[int, Any]]:
+    """Yield ``(record_number, record)`` pairs, one record in memory at a time."""
+    if file_format == 'csv':
+        for number, record in enumerate(csv.DictReader(stream), start=1):
+            yield number, record
+        return
+    number = 0
+    for line in stream:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            yield number, json.loads(line)
+        except ValueError as e:
+            yield number, RecordError(f'invalid JSON: {e}')
+
+def normalize(record: Any, now: str) -> Dict[str, Any]:
+    """Validate one record and convert it to a products row."""
+    if isinstance(record, RecordError):
+        raise record
+    if not isinstance(record, dict):
+        raise RecordError('record is not an object')
+    
+    row: Dict[str, Any] = {}
+    for column, value in record.items():
+        cast = IMPORT_TYPES.get(column)
+        if cast is None:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+            if value == '':
+                value = None
+        if value is None:
+            if column in DEFAULTED_FIELDS:
+                continue
+        elif cast is str:
+            value = str(value)
+        else:
+            try:
+                number = float(value)
+            except (TypeError, ValueError):
+                raise RecordError(f'{column} must be a number, got {value!r}')
+            if cast is int and not number.is_integer():
+                raise RecordError(f'{column} must be a whole number, got {value!r}')
+            value = cast(number)
+        row[column] = value
+    
+    missing = [field for field in REQUIRED_FIELDS if row.get(field) is None]
+    if missing:
+        raise RecordError(f"missing {', '.join(missing)}")
+    if row['price'] < 0 or (row.get('stock') or 0) < 0:
+        raise RecordError('price and stock cannot be negative')
+    # Moves the catalog version, so ETags and caches pick the change up
+    row.setdefault('updated_at', now)
+    return row
+
+class Checkpoint:
+    """How many records of a file are committed, saved atomically after each batch."""
+    
+    def __init__(self, path: str, source: str):
+        self.path = path
+        stat = os.stat(source)
+        self.fingerprint = {'source': os.path.abspath(source), 'size': stat.st_size, 'mtime': stat.st_mtime}
+        self.state = {'records_done': 0, 'imported': 0, 'rejected': 0}
+    
+    def load(self) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path) as checkpoint_file:
+            saved = json.load(checkpoint_file)
+        if saved.get('fingerprint') != self.fingerprint:
+            raise SystemExit(f"{self.path} belongs to a different or modified file; use --restart")
+        self.state = saved['state']
+        return True
+    
+    def save(self) -> None:
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w') as checkpoint_file:
+            json.dump({'fingerprint': self.fingerprint, 'state': self.state}, checkpoint_file)
+        os.replace(temporary, self.path)
+    
+    def clear(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+class Progress:
+    """Throttled progress lines on stderr."""
+    
+    def __init__(self, label: str, total_bytes: Optional[int] = None, total_rows: Optional[int] = None):
+        self.label = label
+        self.total_bytes = total_bytes
+        self.total_rows = total_rows
+        self.started_at = time.monotonic()
+        self.reported_at = self.started_at
+    
+    def report(self, done: int, detail: str = '', position: Optional[int] = None, final: bool = False) -> None:
+        now = time.monotonic()
+        if not final and now - self.reported_at < PROGRESS_SECONDS:
+            return
+        self.reported_at = now
+        elapsed = max(now - self.started_at, 1e-9)
+        percent = ''
+        if self.total_rows:
+            percent = f' {min(done / self.total_rows, 1):.0%}'
+        elif self.total_bytes and position is not None:
+            percent = f' {min(position / self.total_bytes, 1):.0%}'
+        print(f"{'✅' if final else '📦'} {self.label}: {done} records{percent} "
+              f"({done / elapsed:.0f}/s){detail}", file=sys.stderr, flush=True)
+
+def is_data_error(error: Exception) -> bool:
+    """Postgres data/constraint errors (SQLSTATE classes 22 and 23): retrying cannot help."""
+    code = str(getattr(error, 'code', '') or '') if is_api_error(error) else ''
+    return code[:2] in ('22', '23')
+
+def upsert(client, rows: List[Dict[str, Any]]) -> None:
+    client.table('products').upsert(rows, on_conflict='id').execute()
+
+def write_batch(client, batch: List[Tuple[int, Dict[str, Any]]], rejects) -> int:
+    """Upsert a batch, retrying transient failures; returns the rows rejected.
+    
+    A batch refused for its data is retried row by row so one bad record
+    does not sink the rows around it.
+    """
+    rows = [row for _, row in batch]
+    for attempt in range(1, WRITE_RETRIES + 1):
+        try:
+            upsert(client, rows)
+            return 0
+        except Exception as e:
+            if is_data_error(e):
+                break
+            if attempt == WRITE_RETRIES:
+                raise
+            delay = 2 ** (attempt - 1)
+            print(f"⚠️ Batch write failed ({e}), retrying in {delay}s", file=sys.stderr, flush=True)
+            time.sleep(delay)
+    
+    rejected = 0
+    for number, row in batch:
+        try:
+            upsert(client, [row])
+        except Exception as e:
+            if not is_data_error(e):
+                raise
+            rejected += 1
+            reject(rejects, number, str(getattr(e, 'message', e)))
+    return rejected
+
+def reject(rejects, number: int, reason: str) -> None:
+    if rejects is not None:
+        rejects.write(json.dumps({'record': number, 'error': reason}) + '\n')
+    else:
+        print(f"⚠️ Record {number} skipped: {reason}", file=sys.stderr)
+
+def import_products(args: argparse.Namespace) -> int:
+    file_format = detect_format(args.path, args.format)
+    from_stdin = args.path == '-'
+    checkpoint = None
+    if not from_stdin:
+        checkpoint = Checkpoint(args.checkpoint or f'{args.path}.checkpoint.json', args.path)
+        if args.restart:
+            checkpoint.clear()
+        elif os.path.exists(checkpoint.path) and not args.resume:
+            raise SystemExit(f"{checkpoint.path} exists from an earlier run; pass --resume or --restart")
+        if args.resume and checkpoint.load():
+            print(f"↩️ Resuming after record {checkpoint.state['records_done']}", file=sys.stderr)
+    state = checkpoint.state if checkpoint else {'records_done': 0, 'imported': 0, 'rejected': 0}
+    
+    client = data_backend.get_client()
+    rejects = open(args.rejects, 'a') if args.rejects else None
+    stream = sys.stdin if from_stdin else open(args.path, newline='', encoding='utf-8-sig')
+    progress = Progress(f'Imported from {args.path}', None if from_stdin else os.path.getsize(args.path))
+    now = datetime.now(timezone.utc).isoformat()
+    imported_ids = False
+    verb = 'valid' if args.dry_run else 'upserted'
+    batch: List[Tuple[int, Dict[str, Any]]] = []
+    batch_columns: Optional[frozenset] = None
+    pending_rejects = 0
+    
+    def flush(records_done: int) -> None:
+        nonlocal batch, pending_rejects
+        if batch:
+            rejected = write_batch(client, batch, rejects)
+            state['imported'] += len(batch) - rejected
+            state['rejected'] += rejected
+        state['rejected'] += pending_rejects
+        state['records_done'] = records_done
+        pending_rejects = 0
+        batch = []
+        if checkpoint is not None and not args.dry_run:
+            checkpoint.save()
+        position = None if from_stdin else stream.buffer.tell()
+        progress.report(state['records_done'],
+                        f", {state['imported']} {verb}, {state['rejected']} rejected", position)
+    
+    last_number = state['records_done']
+    try:
+        for number, record in read_records(stream, file_format):
+            if number <= state['records_done']:
+                continue
+            last_number = number
+            try:
+                row = normalize(record, now)
+            except RecordError as e:
+                pending_rejects += 1
+                reject(rejects, number, str(e))
+                continue
+            imported_ids = imported_ids or 'id' in row
+            # A bulk upsert needs the same columns in every row
+            columns = frozenset(row)
+            if batch and columns != batch_columns:
+                flush(number - 1)
+            batch_columns = columns
+            if args.dry_run:
+                state['imported'] += 1
+                continue
+            batch.append((number, row))
+            if len(batch) >= args.batch_size:
+                flush(number)
+        flush(last_number)
+    except KeyboardInterrupt:
+        print(f"\n⏸️ Interrupted after record {state['records_done']}; rerun with --resume",
+              file=sys.stderr)
+        return 130
+    except Exception as e:
+        print(f"💥 Import stopped after record {state['records_done']}: {e}; rerun with --resume",
+              file=sys.stderr)
+        return 1
+    finally:
+        if not from_stdin:
+            stream.close()
+        if rejects is not None:
+            rejects.close()
+    
+    if imported_ids and not args.dry_run:
+        try:
+            client.rpc('sync_products_id_sequence', {}).execute()
+        except Exception as e:
+            print(f"⚠️ Could not move the products id sequence past imported ids: {e}", file=sys.stderr)
+    progress.report(state['records_done'],
+                    f", {state['imported']} {verb}, {state['rejected']} rejected", final=True)
+    if checkpoint is not None:
+        checkpoint.clear()
+    return 1 if state['rejected'] and args.strict else 0
+
+def export_products(args: argparse.Namespace) -> int:
+    file_format = args.format or (detect_format(args.path, None) if args.path != '-' else 'jsonl')
+    columns = [column.strip() for column in args.fields.split(',')] if args.fields else list(PRODUCT_COLUMNS)
+    unknown = set(columns) - set(PRODUCT_COLUMNS)
+    if unknown:
+        raise SystemExit(f"Unknown fields: {', '.join(sorted(unknown))}")
+    # Keyset pagination needs the id even when it is not exported
+    select = ','.join(columns if 'id' in columns else ['id'] + columns)
+    
+    client = data_backend.get_client()
+    count_query = client.table('products').select('id', count='exact')
+    if args.category:
+        count_query = count_query.eq('category', args.category)
+    total = count_query.limit(1).execute().count
+    
+    output = sys.stdout if args.path == '-' else open(args.path, 'w', newline='', encoding='utf-8')
+    writer = csv.DictWriter(output, fieldnames=columns, extrasaction='ignore') if file_format == 'csv' else None
+    if writer is not None:
+        writer.writeheader()
+    progress = Progress(f'Exported to {args.path}', total_rows=total)
+    exported = 0
+    last_id = None
+    try:
+        while True:
+            query = client.table('products').select(select)
+            if args.category:
+                query = query.eq('category', args.category)
+            if last_id is not None:
+                query = query.gt('id', last_id)
+            page = query.order('id').limit(args.page_size).execute().data
+            for row in page:
+                if writer is not None:
+                    writer.writerow(row)
+                else:
+                    output.write(json.dumps({column: row.get(column) for column in columns},
+                                            ensure_ascii=False, default=str) + '\n')
+            exported += len(page)
+            progress.report(exported)
+            if len(page) < args.page_size:
+                break
+            last_id = page[-1]['id']
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    progress.report(exported, final=True)
+    return 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    importer = commands.add_parser('import', help='upsert products from a CSV or JSONL file')
+    importer.add_argument('path', help="file to read, or '-' for stdin (no resume)")
+    importer.add_argument('--format', choices=('csv', 'jsonl'))
+    importer.add_argument('--batch-size', type=int, default=500)
+    importer.add_argument('--checkpoint', help='checkpoint file (default: <path>.checkpoint.json)')
+    importer.add_argument('--resume', action='store_true', help='continue from the checkpoint')
+    importer.add_argument('--restart', action='store_true', help='discard the checkpoint and start over')
+    importer.add_argument('--rejects', help='append skipped records and their errors to this JSONL file')
+    importer.add_argument('--strict', action='store_true', help='exit non-zero if any record was rejected')
+    importer.add_argument('--dry-run', action='store_true', help='validate only, write nothing')
+    
+    exporter = commands.add_parser('export', help='write products to a CSV or JSONL file')
+    exporter.add_argument('path', help="file to write, or '-' for stdout")
+    exporter.add_argument('--format', choices=('csv', 'jsonl'))
+    exporter.add_argument('--fields', help='comma-separated columns (default: all)')
+    exporter.add_argument('--category', help='only products in this category')
+    exporter.add_argument('--page-size', type=int, default=1000)
+    
+    args = parser.parse_args(argv)
+    if args.command == 'import':
+        return import_products(args)
+    return export_products(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
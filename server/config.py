@@ -19,9 +19,23 @@ class Config:
     
     # CORS settings
     CORS_ORIGINS = config('CORS_ORIGINS', default='http://localhost:3000').split(',')
+    
+    # Logging - ACCESS_LOG_SAMPLE_RATES is "path_prefix=rate,..." (rate 0.0-1.0)
+    LOG_LEVEL = config('LOG_LEVEL', default='INFO')
+    ACCESS_LOG_SAMPLE_RATES = config('ACCESS_LOG_SAMPLE_RATES', default='/api/health=0.01')
+    
+    # Catalog responses carry ETags; "no-cache" makes browsers revalidate (cheap 304s)
+    CATALOG_CACHE_CONTROL = config('CATALOG_CACHE_CONTROL', default='public, no-cache')
+    
+    # Serialization and compression - JSON_PROVIDER is auto (orjson if installed), orjson or stdlib
+    JSON_PROVIDER = config('JSON_PROVIDER', default='auto')
+    COMPRESS_RESPONSES = config('COMPRESS_RESPONSES', default=True, cast=bool)
+    COMPRESS_MIN_SIZE = config('COMPRESS_MIN_SIZE', default=1024, cast=int)
+    COMPRESS_LEVEL = config('COMPRESS_LEVEL', default=5, cast=int)
 
 class DevelopmentConfig(Config):
     DEBUG = True
+    LOG_LEVEL = config('LOG_LEVEL', default='DEBUG')
 
 class ProductionConfig(Config):
     DEBUG = False
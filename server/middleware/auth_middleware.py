@@ -18,7 +18,7 @@ def token_required(f):
                 'message': 'Token is missing'
             }), 401
         
-        payload = JWTHelper.decode_token(token)
+        payload = JWTHelper.decode_token_cached(token)
         
         if 'error' in payload:
             return jsonify({
@@ -0,0 +1,99 @@
+from models.data_backend import data_backend
+from decouple import config
+from typing import Optional, List, Dict, Any, Iterable, Tuple
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Safety net: even with incremental updates, rebuild from the table this often
+# so changes made outside this process (e.g. the Supabase dashboard) show up.
+CATEGORY_INDEX_REFRESH_SECONDS = config('CATEGORY_INDEX_REFRESH_SECONDS', default=3600, cast=float)
+
+class CategoryIndex:
+    """In-memory index of distinct categories with product and in-stock counts.
+    
+    Built with one scan of the ``category`` and ``stock`` columns, then kept
+    current by ``apply_changes`` so reads cost O(number of categories).
+    """
+    
+    def __init__(self, refresh_seconds: float = CATEGORY_INDEX_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._snapshot: List[Dict[str, Any]] = []
+        self._built_at: Optional[float] = None
+        self._lock = threading.Lock()
+    
+    @property
+    def is_built(self) -> bool:
+        return self._built_at is not None
+    
+    def rebuild(self) -> None:
+        """Recompute the index from the products table."""
+        logger.debug("📂 Building category index...")
+        client = data_backend.get_catalog_client()
+        response = client.table('products').select('category,stock').execute()
+        
+        counts: Dict[str, Dict[str, int]] = {}
+        for row in response.data:
+            self._add(counts, row, 1)
+        
+        with self._lock:
+            self._counts = counts
+            self._built_at = time.monotonic()
+            self._refresh_snapshot()
+        logger.debug(f"✅ Category index built: {len(counts)} categories from {len(response.data)} products")
+    
+    def _ensure_fresh(self) -> None:
+        built_at = self._built_at
+        if built_at is None or time.monotonic() - built_at > self.refresh_seconds:
+            self.rebuild()
+    
+    @staticmethod
+    def _add(counts: Dict[str, Dict[str, int]], row: Optional[Dict[str, Any]], sign: int) -> None:
+        if not row or not row.get('category'):
+            return
+        entry = counts.setdefault(row['category'], {'product_count': 0, 'in_stock_count': 0})
+        entry['product_count'] += sign
+        if (row.get('stock') or 0) > 0:
+            entry['in_stock_count'] += sign
+        if entry['product_count'] <= 0:
+            del counts[row['category']]
+    
+    def _refresh_snapshot(self) -> None:
+        # Rebuilt on every change so reads just return a ready list
+        self._snapshot = [
+            {'category': category, **entry}
+            for category, entry in sorted(self._counts.items())
+        ]
+    
+    def apply_changes(self, changes: Iterable[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]) -> None:
+        """Apply ``(before, after)`` product rows; ``None`` marks insert or delete.
+        
+        Rows need ``category`` and ``stock``. If the index has not been built
+        yet there is nothing to update; the first read builds it.
+        """
+        with self._lock:
+            if self._built_at is None:
+                return
+            for before, after in changes:
+                self._add(self._counts, before, -1)
+                self._add(self._counts, after, 1)
+            self._refresh_snapshot()
+    
+    def invalidate(self) -> None:
+        """Force a rebuild on the next read."""
+        with self._lock:
+            self._built_at = None
+    
+    def get_counts(self) -> List[Dict[str, Any]]:
+        """Categories sorted by name with ``product_count`` and ``in_stock_count``."""
+        self._ensure_fresh()
+        return self._snapshot
+    
+    def get_categories(self) -> List[str]:
+        return [entry['category'] for entry in self.get_counts()]
+
+# Global instance
+category_index = CategoryIndex()
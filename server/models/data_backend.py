@@ -0,0 +1,170 @@
+from models.supabase_client import supabase_service
+from utils.metrics import instrument_client
+from decouple import config
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+import os
+import sys
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 'supabase' or 'sqlite' (fully local, see models/sqlite_client.py)
+DATA_BACKEND = config('DATA_BACKEND', default='supabase')
+# Serve catalog reads from a local SQLite copy of the products table
+CATALOG_READ_MIRROR = config('CATALOG_READ_MIRROR', default=False, cast=bool)
+CATALOG_MIRROR_PATH = config('CATALOG_MIRROR_PATH', default=os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'catalog_mirror.sqlite3'
+))
+CATALOG_MIRROR_REFRESH_SECONDS = config('CATALOG_MIRROR_REFRESH_SECONDS', default=300, cast=float)
+CATALOG_MIRROR_PAGE_SIZE = config('CATALOG_MIRROR_PAGE_SIZE', default=1000, cast=int)
+
+def is_api_error(error: BaseException) -> bool:
+    """True for database API errors from either backend.
+    
+    Checked through ``sys.modules`` so postgrest is never imported just to
+    test for it: if one of its errors was raised, it is already loaded.
+    """
+    for module_name in ('postgrest.exceptions', 'models.sqlite_client'):
+        module = sys.modules.get(module_name)
+        if module is not None and isinstance(error, module.APIError):
+            return True
+    return False
+
+class DataBackend:
+    """Hands models the client for their queries.
+    
+    Every backend speaks the postgrest query-builder interface
+    (``table().select().eq()...execute()``, ``rpc()``), so models stay
+    backend-agnostic. ``get_client()`` is the system of record;
+    ``get_catalog_client()`` serves product reads and, with the read
+    mirror on, answers them from a local SQLite copy of ``products`` that
+    is refreshed periodically and patched by ``Product.record_changes``.
+    Both return clients wrapped to record the ``db_*`` metrics.
+    """
+    
+    def __init__(self, backend: str = DATA_BACKEND, read_mirror: bool = CATALOG_READ_MIRROR,
+                 mirror_path: str = CATALOG_MIRROR_PATH,
+                 mirror_refresh_seconds: float = CATALOG_MIRROR_REFRESH_SECONDS):
+        if backend not in ('supabase', 'sqlite'):
+            raise ValueError(f"DATA_BACKEND must be 'supabase' or 'sqlite', not {backend!r}")
+        self.backend = backend
+        # A local primary already is the mirror
+        self.read_mirror = read_mirror and backend != 'sqlite'
+        self.mirror_path = mirror_path
+        self.mirror_refresh_seconds = mirror_refresh_seconds
+        self._sqlite = None
+        self._mirror = None
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._mirror_synced_at: Optional[float] = None
+        self._mirror_rows = 0
+    
+    def _sqlite_client(self):
+        if self._sqlite is None:
+            with self._lock:
+                if self._sqlite is None:
+                    from models.sqlite_client import SQLiteClient
+                    self._sqlite = SQLiteClient()
+        return self._sqlite
+    
+    def _mirror_client(self):
+        if self._mirror is None:
+            with self._lock:
+                if self._mirror is None:
+                    from models.sqlite_client import SQLiteClient
+                    self._mirror = SQLiteClient(self.mirror_path)
+        return self._mirror
+    
+    def get_client(self):
+        if self.backend == 'sqlite':
+            return instrument_client(self._sqlite_client())
+        return instrument_client(supabase_service.get_client())
+    
+    def get_catalog_client(self):
+        if not self.read_mirror:
+            return self.get_client()
+        self._ensure_mirror()
+        return instrument_client(self._mirror_client())
+    
+    def _ensure_mirror(self) -> None:
+        synced_at = self._mirror_synced_at
+        if synced_at is not None and time.monotonic() - synced_at < self.mirror_refresh_seconds:
+            return
+        if synced_at is None:
+            # Nothing to serve yet: wait for whoever is syncing
+            with self._sync_lock:
+                if self._mirror_synced_at is None:
+                    self.sync_catalog_mirror()
+        elif self._sync_lock.acquire(blocking=False):
+            # Stale but usable: one thread refreshes, the others keep reading
+            try:
+                self.sync_catalog_mirror()
+            except Exception as e:
+                logger.warning(f"⚠️ Catalog mirror refresh failed, serving the previous copy: {e}")
+                self._mirror_synced_at = time.monotonic()
+            finally:
+                self._sync_lock.release()
+    
+    def sync_catalog_mirror(self) -> int:
+        """Copy the products table into the mirror with keyset-paged reads."""
+        started_at = time.perf_counter()
+        client = self.get_client()
+        rows: List[Dict[str, Any]] = []
+        last_id = None
+        while True:
+            query = client.table('products').select('*')
+            if last_id is not None:
+                query = query.gt('id', last_id)
+            page = query.order('id').limit(CATALOG_MIRROR_PAGE_SIZE).execute().data
+            rows.extend(page)
+            if len(page) < CATALOG_MIRROR_PAGE_SIZE:
+                break
+            last_id = page[-1]['id']
+        
+        self._mirror_client().replace_rows('products', rows)
+        self._mirror_rows = len(rows)
+        self._mirror_synced_at = time.monotonic()
+        logger.info(f"🪞 Catalog mirror synced: {len(rows)} products in "
+                    f"{(time.perf_counter() - started_at) * 1000:.0f} ms")
+        return len(rows)
+    
+    def apply_catalog_changes(self, changes: List[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]) -> None:
+        """Patch the mirror with ``(before, after)`` product rows written through this process."""
+        if not self.read_mirror or self._mirror_synced_at is None:
+            return
+        mirror = self._mirror_client()
+        now = datetime.now(timezone.utc).isoformat()
+        try:
+            for before, after in changes:
+                if after is None:
+                    if before:
+                        mirror.table('products').delete().eq('id', before['id']).execute()
+                    continue
+                # Bump updated_at so the catalog version (and ETags) move too
+                values = {'updated_at': now, **{key: value for key, value in after.items() if key != 'id'}}
+                updated = mirror.table('products').update(values).eq('id', after['id']).execute().data
+                if not updated:
+                    if 'name' in after:
+                        mirror.table('products').insert({**values, 'id': after['id']}).execute()
+                    else:
+                        # A partial row for a product the mirror lacks: resync
+                        self._mirror_synced_at = 0.0
+        except Exception as e:
+            logger.warning(f"⚠️ Could not patch catalog mirror, scheduling a resync: {e}")
+            self._mirror_synced_at = 0.0
+    
+    def stats(self) -> Dict[str, Any]:
+        synced_at = self._mirror_synced_at
+        return {
+            'backend': self.backend,
+            'catalog_read_mirror': self.read_mirror,
+            'mirror_rows': self._mirror_rows if self.read_mirror else None,
+            'mirror_age_seconds': round(time.monotonic() - synced_at, 1)
+                if self.read_mirror and synced_at else None
+        }
+
+# Global instance
+data_backend = DataBackend()
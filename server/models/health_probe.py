@@ -0,0 +1,113 @@
+from models.data_backend import data_backend
+from models.product import product_cache
+from models.category_index import category_index
+from models.search_index import search_index
+from models.user import user_cache
+from utils.jwt_helper import token_cache
+from decouple import config
+from typing import Any, Dict, Optional
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+HEALTH_PROBE_INTERVAL = config('HEALTH_PROBE_INTERVAL', default=10, cast=float)
+# A result older than this no longer counts as ready (the probe thread is stuck)
+HEALTH_PROBE_MAX_AGE = config('HEALTH_PROBE_MAX_AGE', default=30, cast=float)
+# How long the very first readiness check waits for the first probe
+HEALTH_PROBE_STARTUP_WAIT = config('HEALTH_PROBE_STARTUP_WAIT', default=2, cast=float)
+
+class HealthProbe:
+    """Checks the database from a background thread on a fixed interval.
+    
+    Health endpoints read the last result instead of querying, so load
+    balancer probes cost no database round trips and answer in
+    microseconds however slow the database is. The thread starts on the
+    first ``status()`` call (and again in a forked child), which keeps
+    app startup free of database work.
+    """
+    
+    def __init__(self, interval: float = HEALTH_PROBE_INTERVAL, max_age: float = HEALTH_PROBE_MAX_AGE,
+                 startup_wait: float = HEALTH_PROBE_STARTUP_WAIT):
+        self.interval = interval
+        self.max_age = max_age
+        self.startup_wait = startup_wait
+        self._result: Optional[Dict[str, Any]] = None
+        self._checked_at: Optional[float] = None
+        self._consecutive_failures = 0
+        self._first_result = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_pid: Optional[int] = None
+    
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread_pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread_pid == os.getpid():
+                return
+            self._thread = threading.Thread(target=self._probe_loop, name='health-probe', daemon=True)
+            self._thread_pid = os.getpid()
+            self._thread.start()
+    
+    def _probe_loop(self) -> None:
+        while True:
+            self.probe()
+            time.sleep(self.interval)
+    
+    def probe(self) -> Dict[str, Any]:
+        """Run one database check and store its result."""
+        started_at = time.perf_counter()
+        try:
+            client = data_backend.get_client()
+            client.table('users').select('id').limit(1).execute()
+            result = {'database': 'connected'}
+            self._consecutive_failures = 0
+        except Exception as e:
+            result = {'database': f'error: {str(e)}'}
+            self._consecutive_failures += 1
+            logger.warning(f"❌ Database health probe failed ({self._consecutive_failures} in a row): {e}")
+        result['latency_ms'] = round((time.perf_counter() - started_at) * 1000, 2)
+        self._result = result
+        self._checked_at = time.monotonic()
+        self._first_result.set()
+        return result
+    
+    def status(self) -> Dict[str, Any]:
+        """The latest probe result, with its age and whether it counts as ready."""
+        self._ensure_thread()
+        self._first_result.wait(self.startup_wait)
+        result, checked_at = self._result, self._checked_at
+        if result is None:
+            return {'ready': False, 'database': 'unknown', 'reason': 'first probe still running'}
+        
+        age = time.monotonic() - checked_at
+        status = {
+            'ready': result['database'] == 'connected' and age <= self.max_age,
+            **result,
+            'checked_seconds_ago': round(age, 1),
+            'consecutive_failures': self._consecutive_failures
+        }
+        if result['database'] == 'connected' and age > self.max_age:
+            status['reason'] = 'probe result is stale'
+        return status
+
+def cache_warm_state() -> Dict[str, Any]:
+    """Whether the in-memory caches and indexes are populated yet."""
+    def cache_state(cache) -> Dict[str, Any]:
+        stats = cache.stats()
+        return {'size': stats['size'], 'hit_ratio': stats['hit_ratio']}
+    
+    return {
+        'product_cache': cache_state(product_cache),
+        'user_cache': cache_state(user_cache),
+        'token_cache': cache_state(token_cache),
+        'category_index': {'built': category_index.is_built},
+        'search_index': {'built': search_index.is_built, 'products': len(search_index)},
+        'catalog_mirror': data_backend.stats()
+    }
+
+# Global instance
+health_probe = HealthProbe()
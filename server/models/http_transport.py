@@ -0,0 +1,43 @@
+from typing import Any, Dict
+import httpx
+import threading
+import time
+
+class MeteredTransport(httpx.HTTPTransport):
+    """HTTP transport that counts in-flight requests, errors and latency."""
+    
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.seconds_total = 0.0
+    
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        started_at = time.perf_counter()
+        try:
+            return super().handle_request(request)
+        except httpx.TimeoutException:
+            with self._lock:
+                self.timeouts += 1
+            raise
+        except httpx.TransportError:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.requests += 1
+                self.seconds_total += time.perf_counter() - started_at
+    
+    def connection_counts(self) -> Dict[str, int]:
+        connections = list(self._pool.connections)
+        idle = sum(1 for connection in connections if connection.is_idle())
+        return {'open_connections': len(connections), 'idle_connections': idle}
@@ -0,0 +1,238 @@
+from models.data_backend import data_backend, is_api_error
+from models.product import Product
+from models.stock_reservation import InsufficientStockError, ReservationNotFoundError, stock_reservations
+from decouple import config
+from typing import Optional, List, Dict, Any, Tuple
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+ORDER_MAX_ITEMS = config('ORDER_MAX_ITEMS', default=100, cast=int)
+
+class InvalidOrderError(ValueError):
+    """The order request itself is malformed or names unknown products."""
+    
+    def __init__(self, message: str, product_ids: Optional[List[int]] = None):
+        super().__init__(message)
+        self.product_ids = product_ids or []
+
+class OrderConflictError(Exception):
+    """The order is valid but cannot be placed against current inventory or prices.
+    
+    ``reason`` is ``insufficient_stock``, ``price_mismatch`` or
+    ``reservation_expired``.
+    """
+    
+    def __init__(self, reason: str, product_ids: Optional[List[int]] = None,
+                 current_total: Optional[float] = None):
+        super().__init__(reason)
+        self.reason = reason
+        self.product_ids = product_ids or []
+        self.current_total = current_total
+
+class Order:
+    """Order queries. Orders are returned as plain row dicts."""
+    
+    @staticmethod
+    def get_page(user_id: Optional[str], limit: int, position: Optional[Dict[str, Any]] = None,
+                 status: Optional[str] = None, created_from: Optional[str] = None,
+                 created_to: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """One keyset page of orders, newest first.
+        
+        Filters are applied in the database and are served by the
+        ``(user_id, created_at, id)`` and ``(user_id, status, created_at)``
+        indexes. ``position`` is the ``{'created_at', 'id'}`` of the last row
+        of the previous page; the position to continue after is returned, or
+        None on the last page. ``user_id=None`` lists every user's orders.
+        """
+        client = data_backend.get_client()
+        query = client.table('orders').select('*')
+        
+        if user_id is not None:
+            query = query.eq('user_id', user_id)
+        if status:
+            query = query.eq('status', status)
+        if created_from:
+            query = query.gte('created_at', created_from)
+        if created_to:
+            query = query.lt('created_at', created_to)
+        
+        # Keyset on (created_at, id) descending: the id tie-breaker keeps
+        # orders sharing a timestamp from being skipped between pages.
+        if position:
+            created_at = position['created_at']
+            last_id = position['id']
+            query = query.or_(
+                f'created_at.lt."{created_at}",'
+                f'and(created_at.eq."{created_at}",id.lt."{last_id}")'
+            )
+        
+        response = query.order('created_at', desc=True).order('id', desc=True).limit(limit + 1).execute()
+        orders = response.data[:limit]
+        
+        next_position = None
+        if len(response.data) > limit:
+            last = orders[-1]
+            next_position = {'created_at': last['created_at'], 'id': last['id']}
+        return orders, next_position
+    
+    @staticmethod
+    def get_summary(user_id: str) -> Dict[str, Any]:
+        """Order counts and totals per status for one user.
+        
+        Reads the ``order_summaries`` aggregate table, which a trigger on
+        ``orders`` keeps current, so the cost is one row per status rather
+        than a scan of the user's orders.
+        """
+        client = data_backend.get_client()
+        response = client.table('order_summaries').select(
+            'status,order_count,total_amount'
+        ).eq('user_id', user_id).execute()
+        
+        by_status = sorted(
+            (row for row in response.data if row['order_count'] > 0),
+            key=lambda row: row['status']
+        )
+        return {
+            'by_status': by_status,
+            'total_orders': sum(row['order_count'] for row in by_status),
+            'total_amount': round(sum(float(row['total_amount'] or 0) for row in by_status), 2)
+        }
+    
+    @staticmethod
+    def normalize_items(items: Any) -> List[Dict[str, int]]:
+        """Validate ``[{'product_id', 'quantity'}, ...]`` and merge repeated products."""
+        if not isinstance(items, list) or not items:
+            raise InvalidOrderError('items must be a non-empty list')
+        
+        quantities: Dict[int, int] = {}
+        for item in items:
+            if not isinstance(item, dict):
+                raise InvalidOrderError('each item needs product_id and quantity')
+            product_id = item.get('product_id')
+            quantity = item.get('quantity', 1)
+            if isinstance(product_id, bool) or isinstance(quantity, bool):
+                raise InvalidOrderError('product_id and quantity must be integers')
+            try:
+                product_id = int(product_id)
+                quantity = int(quantity)
+            except (TypeError, ValueError):
+                raise InvalidOrderError('product_id and quantity must be integers')
+            if quantity <= 0:
+                raise InvalidOrderError(f'quantity must be positive (product {product_id})')
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+        
+        if len(quantities) > ORDER_MAX_ITEMS:
+            raise InvalidOrderError(f'At most {ORDER_MAX_ITEMS} distinct products per order')
+        return [{'product_id': product_id, 'quantity': quantity}
+                for product_id, quantity in quantities.items()]
+    
+    @classmethod
+    def reserve(cls, user_id: str, items: Any) -> Dict[str, Any]:
+        """Hold stock for a cart until checkout; see ``StockReservationEngine``."""
+        lines = cls.normalize_items(items)
+        _, missing = Product.get_by_ids([line['product_id'] for line in lines])
+        if missing:
+            raise InvalidOrderError('Unknown products', missing)
+        try:
+            return stock_reservations.reserve(
+                {line['product_id']: line['quantity'] for line in lines}, user_id=user_id
+            )
+        except InsufficientStockError as e:
+            raise OrderConflictError('insufficient_stock', product_ids=e.product_ids)
+    
+    @classmethod
+    def create_with_items(cls, user_id: str, items: Any, delivery_address: str,
+                          phone: Optional[str] = None, payment_method: str = 'cash_on_delivery',
+                          payment_status: str = 'pending', notes: str = '',
+                          expected_total: Optional[float] = None,
+                          reservation_id: Optional[str] = None) -> Dict[str, Any]:
+        """Place an order with line items, decrementing stock for all of them at once.
+        
+        Prices come from the products table, never from the client; when
+        ``expected_total`` is given the order is refused if it no longer
+        matches. The ``create_order_with_items`` database function locks the
+        products, checks stock and writes the order, its items and every
+        stock decrement in a single transaction, so either all of it happens
+        or none of it does. Returns the order row with an ``items`` list.
+        
+        With stock reservations enabled, stock is claimed in memory instead
+        (from ``reservation_id``, or reserved on the spot) and the database
+        function only writes the order; the decrement is written back later.
+        """
+        reservation = None
+        if reservation_id is not None:
+            try:
+                reservation = stock_reservations.get(reservation_id, user_id)
+            except ReservationNotFoundError:
+                raise OrderConflictError('reservation_expired')
+            lines = reservation['items']
+        else:
+            lines = cls.normalize_items(items)
+        
+        # Unknown IDs are rejected before any locks are taken; stock and
+        # price are checked again, authoritatively, inside the transaction.
+        products, missing = Product.get_by_ids([line['product_id'] for line in lines])
+        if missing:
+            raise InvalidOrderError('Unknown products', missing)
+        
+        if reservation is None and stock_reservations.enabled:
+            reservation = cls.reserve(user_id, lines)
+        if reservation is not None:
+            # Claimed before the order is written so the hold cannot lapse mid-checkout
+            try:
+                stock_reservations.commit(reservation['reservation_id'], user_id)
+            except ReservationNotFoundError:
+                raise OrderConflictError('reservation_expired')
+        
+        client = data_backend.get_client()
+        try:
+            response = client.rpc('create_order_with_items', {
+                'p_user_id': user_id,
+                'p_items': lines,
+                'p_delivery_address': delivery_address,
+                'p_phone': phone,
+                'p_payment_method': payment_method,
+                'p_payment_status': payment_status,
+                'p_notes': notes,
+                'p_expected_total': expected_total,
+                'p_decrement_stock': reservation is None
+            }).execute()
+        except Exception as e:
+            if reservation is not None:
+                stock_reservations.return_stock({line['product_id']: line['quantity'] for line in lines})
+            if is_api_error(e):
+                cls._raise_checkout_error(e)
+            raise
+        
+        order = response.data
+        if reservation is None:
+            categories = {product.id: product.category for product in products}
+            Product.record_changes([
+                (
+                    {'id': item['product_id'], 'category': categories.get(item['product_id']),
+                     'stock': item['stock_after'] + item['quantity']},
+                    {'id': item['product_id'], 'category': categories.get(item['product_id']),
+                     'stock': item['stock_after']}
+                )
+                for item in order['items']
+            ])
+        logger.debug(f"✅ Order {order['id']} placed with {len(order['items'])} items")
+        return order
+    
+    @staticmethod
+    def _raise_checkout_error(error: Exception) -> None:
+        """Translate the exceptions raised by ``create_order_with_items``."""
+        reason = error.message
+        try:
+            detail = json.loads(error.details) if error.details else None
+        except (TypeError, ValueError):
+            detail = None
+        
+        if reason == 'unknown_product':
+            raise InvalidOrderError('Unknown products', detail)
+        if reason == 'insufficient_stock':
+            raise OrderConflictError(reason, product_ids=detail)
+        if reason == 'price_mismatch':
+            raise OrderConflictError(reason, current_total=detail)
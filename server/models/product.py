@@ -1,10 +1,61 @@
+from models.data_backend import data_backend
+from models.category_index import category_index
+from models.search_index import search_index
+from utils.cache import TTLCache
+from decouple import config
+from typing import Optional, List, Dict, Any, Tuple
+import logging
 
-from models.supabase_client import supabase_service
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+logger = logging.getLogger(__name__)
+
+# Read-through cache for catalog reads. Product rows change a few times a day,
+# so lists and single products are served from memory until their TTL lapses
+# or a write path calls Product.invalidate_cache().
+product_cache = TTLCache(
+    max_size=config('PRODUCT_CACHE_MAX_SIZE', default=2048, cast=int),
+    default_ttl=config('PRODUCT_CACHE_TTL', default=60, cast=float),
+    negative_ttl=config('PRODUCT_CACHE_NEGATIVE_TTL', default=30, cast=float),
+    name='products'
+)
+PRODUCT_DETAIL_TTL = config('PRODUCT_DETAIL_CACHE_TTL', default=300, cast=float)
+# IDs per in_() query; keeps the PostgREST URL well under server limits
+PRODUCT_BATCH_CHUNK_SIZE = 200
+# Bounds how long a change made outside this process can go unnoticed by ETags
+CATALOG_VERSION_TTL = config('CATALOG_VERSION_TTL', default=10, cast=float)
+# Bulk stock adjustments: items per request, and per apply_stock_updates call
+STOCK_BULK_MAX_ITEMS = config('STOCK_BULK_MAX_ITEMS', default=10000, cast=int)
+STOCK_BULK_BATCH_SIZE = config('STOCK_BULK_BATCH_SIZE', default=1000, cast=int)
+
+# Column projections. "list" is what the grid/list views render; "detail"
+# is the full row used by the product page.
+PRODUCT_COLUMNS = ('id', 'name', 'category', 'price', 'description', 'image',
+                   'stock', 'rating', 'reviews', 'created_at', 'updated_at')
+FIELDSETS = {
+    'list': ('id', 'name', 'price', 'category', 'image', 'stock'),
+    'detail': PRODUCT_COLUMNS
+}
+
+def resolve_fields(fields: Optional[str], default: str = 'list') -> Tuple[str, ...]:
+    """Turn a ``fields=`` value (fieldset name or column list) into columns.
+    
+    Raises ValueError for unknown columns. ``id`` is always included.
+    """
+    if not fields:
+        return FIELDSETS[default]
+    if fields in FIELDSETS:
+        return FIELDSETS[fields]
+    
+    requested = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [field for field in requested if field not in PRODUCT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown product fields: {', '.join(unknown)}")
+    if 'id' not in requested:
+        requested.insert(0, 'id')
+    # Keep table order so equal projections share cache entries
+    return tuple(column for column in PRODUCT_COLUMNS if column in requested)
 
 class Product:
-    def __init__(self, id=None, name=None, category=None, price=None, 
+    def __init__(self, id=None, name=None, category=None, price=None,
                  description=None, image=None, stock=None, rating=4.5, reviews=0):
         self.id = id
         self.name = name
@@ -16,8 +67,8 @@ class Product:
         self.rating = rating
         self.reviews = reviews
     
-    def to_dict(self) -> Dict[str, Any]:
-        return {
+    def to_dict(self, fields: Optional[Tuple[str, ...]] = None) -> Dict[str, Any]:
+        product_dict = {
             'id': self.id,
             'name': self.name,
             'category': self.category,
@@ -30,88 +81,310 @@ class Product:
             'created_at': getattr(self, 'created_at', None),
             'updated_at': getattr(self, 'updated_at', None)
         }
+        if fields is None:
+            return product_dict
+        return {field: product_dict[field] for field in fields}
+    
+    @classmethod
+    def from_row(cls, product_data: Dict[str, Any]) -> 'Product':
+        """Build a Product from a (possibly projected) products table row."""
+        product = cls(
+            id=product_data['id'],
+            name=product_data.get('name'),
+            category=product_data.get('category'),
+            price=product_data.get('price'),
+            description=product_data.get('description'),
+            image=product_data.get('image'),
+            stock=product_data.get('stock'),
+            rating=product_data.get('rating', 4.5),
+            reviews=product_data.get('reviews', 0)
+        )
+        product.created_at = product_data.get('created_at')
+        product.updated_at = product_data.get('updated_at')
+        return product
     
     @classmethod
-    def get_all_products(cls) -> List['Product']:
-        """Get all products from database."""
+    def get_all_products(cls, fields: Tuple[str, ...] = PRODUCT_COLUMNS) -> List['Product']:
+        """Get all products from database, selecting only ``fields``."""
+        found, products = product_cache.lookup(('all', fields))
+        if found:
+            return products
         try:
-            supabase = supabase_service.get_client()
-            response = supabase.table('products').select('*').execute()
-            
-            products = []
-            for product_data in response.data:
-                product = cls(
-                    id=product_data['id'],
-                    name=product_data['name'],
-                    category=product_data['category'],
-                    price=product_data['price'],
-                    description=product_data['description'],
-                    image=product_data['image'],
-                    stock=product_data['stock'],
-                    rating=product_data.get('rating', 4.5),
-                    reviews=product_data.get('reviews', 0)
-                )
-                product.created_at = product_data.get('created_at')
-                product.updated_at = product_data.get('updated_at')
-                products.append(product)
+            client = data_backend.get_catalog_client()
+            response = client.table('products').select(','.join(fields)).execute()
             
+            products = [cls.from_row(product_data) for product_data in response.data]
+            product_cache.set(('all', fields), products)
             return products
         except Exception as e:
-            print(f"Error getting products: {e}")
+            logger.error(f"Error getting products: {e}")
             return []
     
     @classmethod
-    def get_by_category(cls, category: str) -> List['Product']:
+    def get_by_category(cls, category: str, fields: Tuple[str, ...] = PRODUCT_COLUMNS) -> List['Product']:
         """Get products by category."""
+        found, products = product_cache.lookup(('category', category, fields))
+        if found:
+            return products
         try:
-            supabase = supabase_service.get_client()
-            response = supabase.table('products').select('*').eq('category', category).execute()
-            
-            products = []
-            for product_data in response.data:
-                product = cls(
-                    id=product_data['id'],
-                    name=product_data['name'],
-                    category=product_data['category'],
-                    price=product_data['price'],
-                    description=product_data['description'],
-                    image=product_data['image'],
-                    stock=product_data['stock'],
-                    rating=product_data.get('rating', 4.5),
-                    reviews=product_data.get('reviews', 0)
-                )
-                products.append(product)
+            client = data_backend.get_catalog_client()
+            response = client.table('products').select(','.join(fields)).eq('category', category).execute()
             
+            products = [cls.from_row(product_data) for product_data in response.data]
+            product_cache.set(('category', category, fields), products)
             return products
         except Exception as e:
-            print(f"Error getting products by category: {e}")
+            logger.error(f"Error getting products by category: {e}")
             return []
     
     @classmethod
-    def search_products(cls, query: str) -> List['Product']:
-        """Search products by name or description."""
+    def get_products_page(cls, limit: int, after_id: Optional[int] = None,
+                          category: Optional[str] = None,
+                          fields: Tuple[str, ...] = PRODUCT_COLUMNS) -> Tuple[List['Product'], Optional[int]]:
+        """Get one keyset page of products ordered by ID.
+        
+        Returns the page and the ID to continue after, or None on the last page.
+        One extra row is fetched to detect whether another page exists.
+        """
+        key = ('page', category, after_id, limit, fields)
+        found, page = product_cache.lookup(key)
+        if found:
+            return page
+        
+        client = data_backend.get_catalog_client()
+        query = client.table('products').select(','.join(fields))
+        if category:
+            query = query.eq('category', category)
+        if after_id is not None:
+            query = query.gt('id', after_id)
+        response = query.order('id').limit(limit + 1).execute()
+        
+        rows = response.data
+        products = [cls.from_row(product_data) for product_data in rows[:limit]]
+        next_id = products[-1].id if len(rows) > limit else None
+        product_cache.set(key, (products, next_id))
+        return products, next_id
+    
+    @classmethod
+    def get_by_id(cls, product_id: int) -> Optional['Product']:
+        """Get a single product by ID; missing IDs are negatively cached."""
+        found, product = product_cache.lookup(('product', product_id))
+        if found:
+            return product
+        
+        # Errors propagate so the route can answer 500 instead of a cached 404
+        client = data_backend.get_catalog_client()
+        response = client.table('products').select(','.join(FIELDSETS['detail'])).eq('id', product_id).execute()
+        
+        if not response.data:
+            product_cache.set_missing(('product', product_id))
+            return None
+        
+        product = cls.from_row(response.data[0])
+        product_cache.set(('product', product_id), product, PRODUCT_DETAIL_TTL)
+        return product
+    
+    @classmethod
+    def get_by_ids(cls, product_ids: List[int]) -> Tuple[List['Product'], List[int]]:
+        """Resolve many products at once.
+        
+        Cached products (and cached misses) are served from memory; the rest
+        are fetched with one ``in_`` query per chunk. Returns the products in
+        request order and the IDs that do not exist.
+        """
+        unique_ids = list(dict.fromkeys(product_ids))
+        products: Dict[int, 'Product'] = {}
+        to_fetch: List[int] = []
+        
+        for product_id in unique_ids:
+            found, product = product_cache.lookup(('product', product_id))
+            if not found:
+                to_fetch.append(product_id)
+            elif product is not None:
+                products[product_id] = product
+        
+        if to_fetch:
+            client = data_backend.get_catalog_client()
+            columns = ','.join(FIELDSETS['detail'])
+            for start in range(0, len(to_fetch), PRODUCT_BATCH_CHUNK_SIZE):
+                chunk = to_fetch[start:start + PRODUCT_BATCH_CHUNK_SIZE]
+                response = client.table('products').select(columns).in_('id', chunk).execute()
+                for product_data in response.data:
+                    product = cls.from_row(product_data)
+                    products[product.id] = product
+                    product_cache.set(('product', product.id), product, PRODUCT_DETAIL_TTL)
+            
+            for product_id in to_fetch:
+                if product_id not in products:
+                    product_cache.set_missing(('product', product_id))
+        
+        found_products = [products[product_id] for product_id in unique_ids if product_id in products]
+        missing = [product_id for product_id in unique_ids if product_id not in products]
+        return found_products, missing
+    
+    @classmethod
+    def search_products(cls, query: str, fields: Tuple[str, ...] = PRODUCT_COLUMNS) -> List['Product']:
+        """Search products by name, category or description, best matches first."""
+        try:
+            return [cls.from_row({field: row.get(field) for field in fields})
+                    for row in search_index.search(query)]
+        except Exception as e:
+            logger.warning(f"⚠️ Search index unavailable, falling back to database search: {e}")
+        
         try:
-            supabase = supabase_service.get_client()
-            response = supabase.table('products').select('*').or_(
+            client = data_backend.get_catalog_client()
+            response = client.table('products').select(','.join(fields)).or_(
                 f'name.ilike.%{query}%,description.ilike.%{query}%'
             ).execute()
             
-            products = []
-            for product_data in response.data:
-                product = cls(
-                    id=product_data['id'],
-                    name=product_data['name'],
-                    category=product_data['category'],
-                    price=product_data['price'],
-                    description=product_data['description'],
-                    image=product_data['image'],
-                    stock=product_data['stock'],
-                    rating=product_data.get('rating', 4.5),
-                    reviews=product_data.get('reviews', 0)
-                )
-                products.append(product)
-            
-            return products
+            return [cls.from_row(product_data) for product_data in response.data]
         except Exception as e:
-            print(f"Error searching products: {e}")
+            logger.error(f"Error searching products: {e}")
             return []
+    
+    @staticmethod
+    def suggest(query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Autocomplete suggestions (id, name, category) for a partial query."""
+        return search_index.suggest(query, limit)
+    
+    @staticmethod
+    def invalidate_cache(product_ids: Optional[List[int]] = None) -> None:
+        """Drop cached catalog data after a write.
+        
+        With ``product_ids`` only those products (and every cached list,
+        since any list may contain them) are dropped; without it the whole
+        catalog cache is cleared.
+        """
+        if product_ids is None:
+            product_cache.clear()
+            return
+        for product_id in product_ids:
+            product_cache.invalidate(('product', product_id))
+        product_cache.invalidate_namespace('all')
+        product_cache.invalidate_namespace('category')
+        product_cache.invalidate_namespace('page')
+        product_cache.invalidate_namespace('version')
+    
+    @staticmethod
+    def get_catalog_version() -> str:
+        """Cheap catalog version: latest ``updated_at`` plus row count.
+        
+        Cached briefly and dropped on every local write, so conditional GETs
+        can be answered without touching the products table.
+        """
+        found, version = product_cache.lookup(('version',))
+        if found:
+            return version
+        
+        client = data_backend.get_catalog_client()
+        response = client.table('products').select('updated_at', count='exact').order(
+            'updated_at', desc=True, nullsfirst=False
+        ).limit(1).execute()
+        
+        latest = response.data[0].get('updated_at') if response.data else None
+        version = f"{latest}:{response.count}"
+        product_cache.set(('version',), version, CATALOG_VERSION_TTL)
+        return version
+    
+    @classmethod
+    def record_changes(cls, changes: List[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]) -> None:
+        """Single hook for write paths after products were inserted, updated or deleted.
+        
+        ``changes`` holds ``(before, after)`` rows, with ``None`` for the
+        missing side of an insert or delete. Drops affected cache entries
+        and updates the derived catalog indexes (and the read mirror, if
+        enabled) incrementally.
+        """
+        product_ids = {row['id'] for pair in changes for row in pair if row}
+        data_backend.apply_catalog_changes(changes)
+        cls.invalidate_cache(sorted(product_ids))
+        category_index.apply_changes(changes)
+        search_index.apply_changes(changes)
+    
+    @classmethod
+    def apply_stock_updates(cls, updates: List[Any]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Set (``stock``) or adjust (``delta``) stock for many products.
+        
+        Returns one result per item, in request order, with a ``status`` of
+        ``updated``, ``not_found``, ``negative_stock`` or ``duplicate``, plus
+        the ``{id, category, stock}`` rows that changed. Items go to the
+        database in ``STOCK_BULK_BATCH_SIZE`` batches, each applied
+        atomically, and caches and indexes are updated once at the end.
+        Raises ValueError, before anything is written, when ``updates`` is
+        not a usable list or any item is malformed.
+        """
+        if not isinstance(updates, list) or not updates:
+            raise ValueError('updates must be a non-empty list')
+        if len(updates) > STOCK_BULK_MAX_ITEMS:
+            raise ValueError(f'At most {STOCK_BULK_MAX_ITEMS} updates per request')
+        
+        payloads = []
+        for index, item in enumerate(updates):
+            try:
+                payloads.append(cls._parse_stock_update(item))
+            except ValueError as e:
+                raise ValueError(f'updates[{index}]: {e}')
+        
+        results: List[Dict[str, Any]] = []
+        pending: Dict[int, int] = {}
+        for index, payload in enumerate(payloads):
+            result: Dict[str, Any] = {'index': index, 'product_id': payload['product_id']}
+            results.append(result)
+            if payload['product_id'] in pending:
+                result.update(status='duplicate', message='product_id appears more than once')
+                continue
+            pending[payload['product_id']] = index
+            result['_payload'] = payload
+        
+        valid = [result.pop('_payload') for result in results if '_payload' in result]
+        changes = []
+        client = data_backend.get_client()
+        for start in range(0, len(valid), STOCK_BULK_BATCH_SIZE):
+            batch = valid[start:start + STOCK_BULK_BATCH_SIZE]
+            try:
+                response = client.rpc('apply_stock_updates', {'p_updates': batch}).execute()
+            except Exception as e:
+                logger.error(f"💥 Bulk stock batch of {len(batch)} failed: {e}")
+                for payload in batch:
+                    results[pending[payload['product_id']]].update(status='error', message='Database error')
+                continue
+            for row in response.data:
+                result = results[pending[row['product_id']]]
+                result['status'] = row['status']
+                if row['status'] == 'not_found':
+                    continue
+                result['previous_stock'] = row['previous_stock']
+                result['stock'] = row['stock']
+                if row['status'] == 'updated' and row['stock'] != row['previous_stock']:
+                    changes.append((
+                        {'id': row['product_id'], 'category': row['category'], 'stock': row['previous_stock']},
+                        {'id': row['product_id'], 'category': row['category'], 'stock': row['stock']}
+                    ))
+        
+        if changes:
+            cls.record_changes(changes)
+        logger.debug(f"✅ Bulk stock update: {len(changes)} of {len(updates)} products changed")
+        return results, [after for _, after in changes]
+    
+    @staticmethod
+    def _parse_stock_update(item: Any) -> Dict[str, int]:
+        if not isinstance(item, dict):
+            raise ValueError('each update must be an object')
+        product_id = item.get('product_id')
+        # bool is an int subclass; floats and numeric strings are refused too
+        if isinstance(product_id, bool) or not isinstance(product_id, int):
+            raise ValueError('product_id must be an integer')
+        if ('stock' in item) == ('delta' in item):
+            raise ValueError('give exactly one of stock or delta')
+        key = 'stock' if 'stock' in item else 'delta'
+        value = item[key]
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise ValueError(f'{key} must be an integer')
+        if key == 'stock' and value < 0:
+            raise ValueError('stock cannot be negative')
+        return {'product_id': product_id, key: value}
+    
+    @staticmethod
+    def cache_stats() -> Dict[str, Any]:
+        """Hit/miss counters for the catalog cache."""
+        return product_cache.stats()
@@ -0,0 +1,251 @@
+from models.data_backend import data_backend
+from decouple import config
+from typing import Optional, List, Dict, Any, Iterable, Set, Tuple
+import bisect
+import re
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+SEARCH_INDEX_REFRESH_SECONDS = config('SEARCH_INDEX_REFRESH_SECONDS', default=3600, cast=float)
+
+# How much a hit in each field counts towards a product's score
+FIELD_WEIGHTS = {'name': 3.0, 'category': 2.0, 'description': 1.0}
+
+# Match quality multipliers: exact token, token prefix, typo-tolerant match
+EXACT_MATCH = 1.0
+PREFIX_MATCH = 0.6
+FUZZY_MATCH = 0.4
+
+# Cheap trigram-overlap filter applied before computing edit distance
+MIN_FUZZY_SIMILARITY = 0.1
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase word tokens of ``text``."""
+    if not text:
+        return []
+    return _TOKEN_RE.findall(text.lower())
+
+def trigrams(token: str) -> Set[str]:
+    padded = f'  {token} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Edit distance counting adjacent swaps as one edit ("mlik" -> "milk").
+    
+    Gives up early and returns ``limit + 1`` once the distance exceeds ``limit``.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before_previous: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1,
+                       previous[j - 1] + (char_a != char_b))
+            if i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                cost = min(cost, before_previous[j - 2] + 1)
+            current.append(cost)
+        if min(current) > limit:
+            return limit + 1
+        before_previous, previous = previous, current
+    return previous[-1]
+
+class ProductSearchIndex:
+    """In-process full-text index over product name, category and description.
+    
+    Holds a token -> {product_id: weight} inverted index, a sorted vocabulary
+    for prefix lookups and a trigram -> tokens map for typo tolerance. It is
+    built with one table scan and kept current through ``apply_changes``.
+    """
+    
+    def __init__(self, refresh_seconds: float = SEARCH_INDEX_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._rows: Dict[Any, Dict[str, Any]] = {}
+        self._postings: Dict[str, Dict[Any, float]] = {}
+        self._trigrams: Dict[str, Set[str]] = {}
+        self._vocabulary: List[str] = []
+        self._vocabulary_dirty = False
+        self._built_at: Optional[float] = None
+        self._lock = threading.RLock()
+    
+    @property
+    def is_built(self) -> bool:
+        return self._built_at is not None
+    
+    def __len__(self) -> int:
+        return len(self._rows)
+    
+    def rebuild(self) -> None:
+        """Index every product from the products table."""
+        logger.debug("🔎 Building product search index...")
+        client = data_backend.get_catalog_client()
+        response = client.table('products').select('*').execute()
+        
+        with self._lock:
+            self._rows = {}
+            self._postings = {}
+            self._trigrams = {}
+            for row in response.data:
+                self._index(row)
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+            self._built_at = time.monotonic()
+        logger.debug(f"✅ Search index built: {len(self._rows)} products, {len(self._vocabulary)} terms")
+    
+    def _ensure_fresh(self) -> None:
+        built_at = self._built_at
+        if built_at is None or time.monotonic() - built_at > self.refresh_seconds:
+            self.rebuild()
+    
+    def _index(self, row: Dict[str, Any]) -> None:
+        product_id = row['id']
+        self._rows[product_id] = row
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(row.get(field)):
+                postings = self._postings.get(token)
+                if postings is None:
+                    postings = self._postings[token] = {}
+                    for gram in trigrams(token):
+                        self._trigrams.setdefault(gram, set()).add(token)
+                    self._vocabulary_dirty = True
+                postings[product_id] = postings.get(product_id, 0.0) + weight
+    
+    def _unindex(self, product_id: Any) -> None:
+        row = self._rows.pop(product_id, None)
+        if row is None:
+            return
+        for field in FIELD_WEIGHTS:
+            for token in tokenize(row.get(field)):
+                postings = self._postings.get(token)
+                if postings is None:
+                    continue
+                postings.pop(product_id, None)
+                if not postings:
+                    del self._postings[token]
+                    for gram in trigrams(token):
+                        tokens = self._trigrams.get(gram)
+                        if tokens is not None:
+                            tokens.discard(token)
+                            if not tokens:
+                                del self._trigrams[gram]
+                    self._vocabulary_dirty = True
+    
+    def apply_changes(self, changes: Iterable[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]) -> None:
+        """Apply ``(before, after)`` product rows; ``None`` marks insert or delete.
+        
+        Partial ``after`` rows (e.g. a stock-only update) are merged into the
+        indexed row. Before the first build there is nothing to update.
+        """
+        with self._lock:
+            if self._built_at is None:
+                return
+            for before, after in changes:
+                if after is None:
+                    if before:
+                        self._unindex(before['id'])
+                    continue
+                merged = {**self._rows.get(after['id'], {}), **after}
+                self._unindex(after['id'])
+                self._index(merged)
+    
+    def invalidate(self) -> None:
+        """Force a rebuild on the next lookup."""
+        with self._lock:
+            self._built_at = None
+    
+    def _sorted_vocabulary(self) -> List[str]:
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+        return self._vocabulary
+    
+    def _prefix_terms(self, prefix: str) -> List[str]:
+        vocabulary = self._sorted_vocabulary()
+        start = bisect.bisect_left(vocabulary, prefix)
+        end = bisect.bisect_left(vocabulary, prefix + '\uffff')
+        return vocabulary[start:end]
+    
+    def _fuzzy_terms(self, term: str) -> List[Tuple[str, float]]:
+        """Vocabulary terms within a small edit distance of ``term``."""
+        if len(term) < 3:
+            return []
+        grams = trigrams(term)
+        shared: Dict[str, int] = {}
+        for gram in grams:
+            for token in self._trigrams.get(gram, ()):
+                shared[token] = shared.get(token, 0) + 1
+        
+        max_edits = 1 if len(term) <= 5 else 2
+        matches = []
+        for token, common in shared.items():
+            similarity = common / (len(grams) + len(trigrams(token)) - common)
+            if similarity < MIN_FUZZY_SIMILARITY:
+                continue
+            distance = edit_distance(term, token, max_edits)
+            if 0 < distance <= max_edits:
+                matches.append((token, 1.0 - distance / (max_edits + 1)))
+        return matches
+    
+    def _term_scores(self, term: str, allow_prefix: bool) -> Dict[Any, float]:
+        scores: Dict[Any, float] = {}
+        
+        def add(token: str, quality: float) -> None:
+            for product_id, weight in self._postings.get(token, {}).items():
+                score = weight * quality
+                if score > scores.get(product_id, 0.0):
+                    scores[product_id] = score
+        
+        add(term, EXACT_MATCH)
+        if allow_prefix:
+            for token in self._prefix_terms(term):
+                if token != term:
+                    add(token, PREFIX_MATCH)
+        if not scores:
+            for token, closeness in self._fuzzy_terms(term):
+                add(token, FUZZY_MATCH * closeness)
+        return scores
+    
+    def search(self, query: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Ranked product rows matching every term of ``query``.
+        
+        The last term also matches as a prefix so results update while typing,
+        and terms with no exact or prefix hit fall back to fuzzy matching.
+        """
+        self._ensure_fresh()
+        terms = tokenize(query)
+        if not terms:
+            return []
+        
+        with self._lock:
+            totals: Optional[Dict[Any, float]] = None
+            for position, term in enumerate(terms):
+                scores = self._term_scores(term, allow_prefix=position == len(terms) - 1)
+                if totals is None:
+                    totals = scores
+                else:
+                    totals = {product_id: totals[product_id] + score
+                              for product_id, score in scores.items() if product_id in totals}
+                if not totals:
+                    return []
+            
+            ranked = sorted(totals.items(),
+                            key=lambda item: (-item[1], str(self._rows[item[0]].get('name') or '')))
+            if limit is not None:
+                ranked = ranked[:limit]
+            return [self._rows[product_id] for product_id, _ in ranked]
+    
+    def suggest(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Autocomplete entries (id, name, category) for a partial query."""
+        return [
+            {'id': row['id'], 'name': row.get('name'), 'category': row.get('category')}
+            for row in self.search(query, limit)
+        ]
+
+# Global instance
+search_index = ProductSearchIndex()
@@ -0,0 +1,604 @@
+from decouple import config
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import uuid
+
+logger = logging.getLogger(__name__)
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SQLITE_PATH = config('SQLITE_PATH', default=os.path.join(SERVER_DIR, 'instance', 'store.sqlite3'))
+SQLITE_BUSY_TIMEOUT_MS = config('SQLITE_BUSY_TIMEOUT_MS', default=5000, cast=int)
+SQLITE_CACHE_KB = config('SQLITE_CACHE_KB', default=20000, cast=int)
+
+NOW = "strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')"
+
+# Same tables, keys and indexes as the Supabase schema
+SCHEMA = f"""
+create table if not exists products (
+    id integer primary key autoincrement,
+    name text not null,
+    category text,
+    price real not null default 0,
+    description text,
+    image text,
+    stock integer not null default 0,
+    rating real default 0,
+    reviews integer default 0,
+    created_at text not null default ({NOW}),
+    updated_at text not null default ({NOW})
+);
+create index if not exists products_category_id_idx on products (category, id);
+create index if not exists products_updated_at_idx on products (updated_at);
+
+create table if not exists users (
+    id text primary key,
+    email text not null unique,
+    password_hash text not null,
+    name text,
+    phone text,
+    role text not null default 'customer',
+    created_at text not null default ({NOW}),
+    updated_at text not null default ({NOW})
+);
+
+create table if not exists orders (
+    id text primary key,
+    user_id text not null,
+    total_amount real not null default 0,
+    status text not null default 'pending',
+    delivery_address text,
+    phone text,
+    payment_method text default 'cash_on_delivery',
+    payment_status text default 'pending',
+    notes text default '',
+    created_at text not null default ({NOW}),
+    updated_at text not null default ({NOW})
+);
+create index if not exists orders_user_created_idx on orders (user_id, created_at desc, id desc);
+create index if not exists orders_user_status_created_idx on orders (user_id, status, created_at desc, id desc);
+create index if not exists orders_created_idx on orders (created_at desc, id desc);
+
+create table if not exists order_items (
+    id integer primary key autoincrement,
+    order_id text not null references orders (id) on delete cascade,
+    product_id integer not null references products (id),
+    quantity integer not null check (quantity > 0),
+    unit_price real not null,
+    line_total real not null
+);
+create index if not exists order_items_order_idx on order_items (order_id);
+
+create table if not exists order_summaries (
+    user_id text not null,
+    status text not null,
+    order_count integer not null default 0,
+    total_amount real not null default 0,
+    primary key (user_id, status)
+);
+
+create trigger if not exists orders_summary_insert after insert on orders begin
+    insert into order_summaries (user_id, status, order_count, total_amount)
+    values (new.user_id, coalesce(new.status, 'pending'), 1, coalesce(new.total_amount, 0))
+    on conflict (user_id, status) do update
+        set order_count = order_count + 1, total_amount = total_amount + excluded.total_amount;
+end;
+create trigger if not exists orders_summary_update after update of user_id, status, total_amount on orders begin
+    update order_summaries
+        set order_count = order_count - 1, total_amount = total_amount - coalesce(old.total_amount, 0)
+        where user_id = old.user_id and status = coalesce(old.status, 'pending');
+    insert into order_summaries (user_id, status, order_count, total_amount)
+    values (new.user_id, coalesce(new.status, 'pending'), 1, coalesce(new.total_amount, 0))
+    on conflict (user_id, status) do update
+        set order_count = order_count + 1, total_amount = total_amount + excluded.total_amount;
+end;
+create trigger if not exists orders_summary_delete after delete on orders begin
+    update order_summaries
+        set order_count = order_count - 1, total_amount = total_amount - coalesce(old.total_amount, 0)
+        where user_id = old.user_id and status = coalesce(old.status, 'pending');
+end;
+"""
+
+# Tables keyed by a UUID string, generated here as the database would
+UUID_TABLES = {'users', 'orders'}
+
+OPERATORS = {'eq': '=', 'neq': '!=', 'gt': '>', 'gte': '>=', 'lt': '<', 'lte': '<=',
+             'like': 'LIKE', 'ilike': 'LIKE'}
+IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+LOGIC_GROUP = re.compile(r'^(not\.)?(and|or)\((.*)\)$', re.S)
+
+class APIError(Exception):
+    """Error shaped like postgrest's APIError (``code``, ``message``, ``details``, ``hint``)."""
+    
+    def __init__(self, error: Dict[str, Any]):
+        self.code = error.get('code')
+        self.message = error.get('message')
+        self.details = error.get('details')
+        self.hint = error.get('hint')
+        super().__init__(self.message)
+
+class SQLiteResponse:
+    def __init__(self, data: Any, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+def _split_top_level(expression: str) -> List[str]:
+    """Split a PostgREST logic expression on commas outside quotes and parentheses."""
+    parts, depth, quoted, current = [], 0, False, []
+    for i, char in enumerate(expression):
+        if char == '"' and (i == 0 or expression[i - 1] != '\\'):
+            quoted = not quoted
+        elif not quoted and char == '(':
+            depth += 1
+        elif not quoted and char == ')':
+            depth -= 1
+        elif not quoted and depth == 0 and char == ',':
+            parts.append(''.join(current))
+            current = []
+            continue
+        current.append(char)
+    parts.append(''.join(current))
+    return [part.strip() for part in parts if part.strip()]
+
+def _quoted(columns: List[str]) -> str:
+    return ', '.join(f'"{column}"' for column in columns)
+
+def _unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1].replace('\\"', '"')
+    return value
+
+class SQLiteQuery:
+    """The subset of postgrest's request builder the models use, over SQLite."""
+    
+    def __init__(self, client: 'SQLiteClient', table: str):
+        self._client = client
+        self._table = client.check_table(table)
+        self._method = 'select'
+        self._columns = '*'
+        self._count: Optional[str] = None
+        self._values: Any = None
+        self._on_conflict: Optional[str] = None
+        self._where: List[Tuple[str, List[Any]]] = []
+        self._order: List[str] = []
+        self._limit: Optional[int] = None
+        self._offset: Optional[int] = None
+    
+    # Statement kinds
+    
+    def select(self, *columns: str, count: Optional[str] = None) -> 'SQLiteQuery':
+        self._columns = ','.join(columns) or '*'
+        self._count = count
+        return self
+    
+    def insert(self, values: Any, **kwargs: Any) -> 'SQLiteQuery':
+        self._method, self._values = 'insert', values
+        return self
+    
+    def upsert(self, values: Any, on_conflict: str = 'id', **kwargs: Any) -> 'SQLiteQuery':
+        self._method, self._values = 'upsert', values
+        self._on_conflict = self._column(on_conflict)
+        return self
+    
+    def update(self, values: Dict[str, Any], **kwargs: Any) -> 'SQLiteQuery':
+        self._method, self._values = 'update', values
+        return self
+    
+    def delete(self, **kwargs: Any) -> 'SQLiteQuery':
+        self._method = 'delete'
+        return self
+    
+    # Filters
+    
+    def eq(self, column: str, value: Any) -> 'SQLiteQuery':
+        return self._filter(column, 'eq', value)
+    
+    def neq(self, column: str, value: Any) -> 'SQLiteQuery':
+        return self._filter(column, 'neq', value)
+    
+    def gt(self, column: str, value: Any) -> 'SQLiteQuery':
+        return self._filter(column, 'gt', value)
+    
+    def gte(self, column: str, value: Any) -> 'SQLiteQuery':
+        return self._filter(column, 'gte', value)
+    
+    def lt(self, column: str, value: Any) -> 'SQLiteQuery':
+        return self._filter(column, 'lt', value)
+    
+    def lte(self, column: str, value: Any) -> 'SQLiteQuery':
+        return self._filter(column, 'lte', value)
+    
+    def like(self, column: str, pattern: str) -> 'SQLiteQuery':
+        return self._filter(column, 'like', pattern)
+    
+    def ilike(self, column: str, pattern: str) -> 'SQLiteQuery':
+        return self._filter(column, 'ilike', pattern)
+    
+    def is_(self, column: str, value: Any) -> 'SQLiteQuery':
+        return self._filter(column, 'is', value)
+    
+    def in_(self, column: str, values: Iterable[Any]) -> 'SQLiteQuery':
+        self._where.append(self._condition(column, 'in', list(values)))
+        return self
+    
+    def or_(self, filters: str, **kwargs: Any) -> 'SQLiteQuery':
+        """PostgREST logic tree, e.g. ``a.lt.1,and(a.eq.1,b.lt.2)``."""
+        self._where.append(self._logic(filters, 'OR'))
+        return self
+    
+    def order(self, column: str, desc: bool = False, nullsfirst: Optional[bool] = None,
+              **kwargs: Any) -> 'SQLiteQuery':
+        clause = f'"{self._column(column)}" {"DESC" if desc else "ASC"}'
+        if nullsfirst is not None:
+            clause += ' NULLS FIRST' if nullsfirst else ' NULLS LAST'
+        self._order.append(clause)
+        return self
+    
+    def limit(self, size: int, **kwargs: Any) -> 'SQLiteQuery':
+        self._limit = int(size)
+        return self
+    
+    def range(self, start: int, end: int, **kwargs: Any) -> 'SQLiteQuery':
+        self._offset, self._limit = int(start), int(end) - int(start) + 1
+        return self
+    
+    # Compilation
+    
+    def _column(self, column: str) -> str:
+        if not IDENTIFIER.match(column) or column not in self._client.columns(self._table):
+            raise APIError({'code': '42703', 'message': f'column {self._table}.{column} does not exist'})
+        return column
+    
+    def _filter(self, column: str, operator: str, value: Any) -> 'SQLiteQuery':
+        self._where.append(self._condition(column, operator, value))
+        return self
+    
+    def _condition(self, column: str, operator: str, value: Any, negate: bool = False) -> Tuple[str, List[Any]]:
+        column = f'"{self._column(column)}"'
+        if operator == 'in':
+            values = value if isinstance(value, list) else [
+                _unquote(item) for item in _split_top_level(str(value).strip('()'))
+            ]
+            if not values:
+                sql, params = '0', []
+            else:
+                sql, params = f'{column} IN ({",".join("?" * len(values))})', values
+        elif operator == 'is':
+            literal = {'null': 'NULL', 'true': '1', 'false': '0'}.get(str(value).lower())
+            if literal is None:
+                raise APIError({'code': 'PGRST100', 'message': f'unsupported is value: {value}'})
+            sql, params = f'{column} IS {literal}', []
+        elif operator in OPERATORS:
+            if operator in ('like', 'ilike'):
+                value = str(value).replace('*', '%')
+            sql, params = f'{column} {OPERATORS[operator]} ?', [value]
+        else:
+            raise APIError({'code': 'PGRST100', 'message': f'unsupported operator: {operator}'})
+        return (f'NOT ({sql})', params) if negate else (sql, params)
+    
+    def _logic(self, expression: str, joiner: str) -> Tuple[str, List[Any]]:
+        sqls, params = [], []
+        for part in _split_top_level(expression):
+            group = LOGIC_GROUP.match(part)
+            if group:
+                sql, group_params = self._logic(group.group(3), group.group(2).upper())
+                if group.group(1):
+                    sql = f'NOT {sql}'
+            else:
+                pieces = part.split('.', 2)
+                if len(pieces) < 3:
+                    raise APIError({'code': 'PGRST100', 'message': f'failed to parse filter: {part}'})
+                column, operator, value = pieces
+                negate = operator == 'not'
+                if negate:
+                    operator, value = value.split('.', 1)
+                sql, group_params = self._condition(column, operator, _unquote(value), negate)
+            sqls.append(sql)
+            params.extend(group_params)
+        return f'({f" {joiner} ".join(sqls)})', params
+    
+    def _where_sql(self) -> Tuple[str, List[Any]]:
+        if not self._where:
+            return '', []
+        params = [param for _, condition_params in self._where for param in condition_params]
+        return ' WHERE ' + ' AND '.join(sql for sql, _ in self._where), params
+    
+    def _projection(self) -> str:
+        columns = [column.strip() for column in self._columns.split(',') if column.strip()]
+        if columns == ['*']:
+            return '*'
+        if columns == ['count'] and 'count' not in self._client.columns(self._table):
+            # PostgREST's aggregate form, used by the health check
+            return 'count(*) AS "count"'
+        return ', '.join(f'"{self._column(column)}"' for column in columns)
+    
+    def _rows(self) -> List[Dict[str, Any]]:
+        rows = self._values if isinstance(self._values, list) else [self._values]
+        if self._table in UUID_TABLES:
+            rows = [row if row.get('id') else {**row, 'id': str(uuid.uuid4())} for row in rows]
+        return rows
+    
+    def execute(self) -> SQLiteResponse:
+        where, params = self._where_sql()
+        table = f'"{self._table}"'
+        
+        if self._method == 'select':
+            sql = f'SELECT {self._projection()} FROM {table}{where}'
+            if self._order:
+                sql += ' ORDER BY ' + ', '.join(self._order)
+            if self._limit is not None or self._offset is not None:
+                sql += f' LIMIT {self._limit if self._limit is not None else -1} OFFSET {self._offset or 0}'
+            count = None
+            if self._count:
+                count = self._client.query(f'SELECT count(*) AS n FROM {table}{where}', params)[0]['n']
+            return SQLiteResponse(self._client.query(sql, params), count)
+        
+        if self._method == 'update':
+            columns = [self._column(column) for column in self._values]
+            assignments = ', '.join(f'"{column}" = ?' for column in columns)
+            sql = f'UPDATE {table} SET {assignments}{where} RETURNING *'
+            return SQLiteResponse(self._client.query(sql, list(self._values.values()) + params, write=True))
+        
+        if self._method == 'delete':
+            return SQLiteResponse(self._client.query(f'DELETE FROM {table}{where} RETURNING *', params, write=True))
+        
+        statements = []
+        for row in self._rows():
+            columns = [self._column(column) for column in row]
+            sql = f'INSERT INTO {table} ({_quoted(columns)}) VALUES ({", ".join("?" * len(columns))})'
+            if self._method == 'upsert':
+                updates = [column for column in columns if column != self._on_conflict]
+                action = ('DO UPDATE SET ' + ', '.join(f'"{column}" = excluded."{column}"' for column in updates)
+                          if updates else 'DO NOTHING')
+                sql += f' ON CONFLICT ("{self._on_conflict}") {action}'
+            statements.append((sql + ' RETURNING *', list(row.values())))
+        return SQLiteResponse(self._client.run_many(statements))
+
+class SQLiteRPC:
+    def __init__(self, client: 'SQLiteClient', function: str, params: Dict[str, Any]):
+        self._client = client
+        self._function = function
+        self._params = params
+    
+    def execute(self) -> SQLiteResponse:
+        function = RPC_FUNCTIONS.get(self._function)
+        if function is None:
+            raise APIError({'code': 'PGRST202', 'message': f'Could not find the function {self._function}'})
+        return SQLiteResponse(self._client.transaction(lambda connection: function(connection, self._params)))
+
+class SQLiteClient:
+    """Local SQLite backend exposing the same ``table()``/``rpc()`` interface as the Supabase client.
+    
+    Each thread gets its own connection. The database runs in WAL mode, so
+    readers never block on the single writer, and the schema mirrors the
+    Supabase tables and indexes. Database functions called through
+    ``rpc()`` are implemented in Python inside one IMMEDIATE transaction.
+    """
+    
+    def __init__(self, path: str = SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._pid = os.getpid()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        self._columns: Dict[str, List[str]] = {}
+    
+    def connection(self) -> sqlite3.Connection:
+        if self._pid != os.getpid():
+            # Connections must not cross a fork
+            self._local = threading.local()
+            self._pid = os.getpid()
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            if self.path != ':memory:':
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000,
+                                         isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute('PRAGMA foreign_keys=ON')
+            connection.execute(f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}')
+            connection.execute(f'PRAGMA cache_size=-{SQLITE_CACHE_KB}')
+            self._local.connection = connection
+            self._ensure_schema(connection)
+        return connection
+    
+    def _ensure_schema(self, connection: sqlite3.Connection) -> None:
+        if self._schema_ready:
+            return
+        with self._schema_lock:
+            if not self._schema_ready:
+                connection.executescript(SCHEMA)
+                self._schema_ready = True
+                logger.debug(f"✅ SQLite schema ready at {self.path}")
+    
+    def columns(self, table: str) -> List[str]:
+        if table not in self._columns:
+            rows = self.connection().execute(f'PRAGMA table_info("{table}")').fetchall()
+            self._columns[table] = [row['name'] for row in rows]
+        return self._columns[table]
+    
+    def check_table(self, table: str) -> str:
+        if not IDENTIFIER.match(table) or not self.columns(table):
+            raise APIError({'code': '42P01', 'message': f'relation "{table}" does not exist'})
+        return table
+    
+    def table(self, table: str) -> SQLiteQuery:
+        return SQLiteQuery(self, table)
+    
+    from_ = table
+    
+    def rpc(self, function: str, params: Optional[Dict[str, Any]] = None, **kwargs: Any) -> SQLiteRPC:
+        return SQLiteRPC(self, function, params or {})
+    
+    def query(self, sql: str, params: List[Any], write: bool = False) -> List[Dict[str, Any]]:
+        try:
+            if write:
+                return self.transaction(lambda connection: [dict(row) for row in connection.execute(sql, params)])
+            return [dict(row) for row in self.connection().execute(sql, params)]
+        except sqlite3.IntegrityError as e:
+            raise self._integrity_error(e)
+    
+    def run_many(self, statements: List[Tuple[str, List[Any]]]) -> List[Dict[str, Any]]:
+        def run(connection: sqlite3.Connection) -> List[Dict[str, Any]]:
+            return [dict(row) for sql, params in statements for row in connection.execute(sql, params)]
+        try:
+            return self.transaction(run)
+        except sqlite3.IntegrityError as e:
+            raise self._integrity_error(e)
+    
+    def transaction(self, work):
+        """Run ``work(connection)`` in one write transaction, rolling back on error."""
+        connection = self.connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            result = work(connection)
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        return result
+    
+    def replace_rows(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        """Swap a table's contents for ``rows`` atomically (used to refresh a mirror)."""
+        table = self.check_table(table)
+        known = self.columns(table)
+        
+        def replace(connection: sqlite3.Connection) -> None:
+            connection.execute(f'DELETE FROM "{table}"')
+            for row in rows:
+                columns = [column for column in row if column in known]
+                connection.execute(
+                    f'INSERT INTO "{table}" ({_quoted(columns)}) VALUES ({", ".join("?" * len(columns))})',
+                    [row[column] for column in columns]
+                )
+        self.transaction(replace)
+    
+    @staticmethod
+    def _integrity_error(error: sqlite3.IntegrityError) -> APIError:
+        message = str(error)
+        # Postgres SQLSTATE codes, so callers can treat both backends alike
+        code = '23505' if 'UNIQUE' in message else '23503' if 'FOREIGN KEY' in message else '23514'
+        return APIError({'code': code, 'message': message})
+
+def _checkout_error(reason: str, detail: Any) -> APIError:
+    return APIError({'code': 'P0001', 'message': reason, 'details': json.dumps(detail)})
+
+def _create_order_with_items(connection: sqlite3.Connection, params: Dict[str, Any]) -> Dict[str, Any]:
+    """SQLite version of the ``create_order_with_items`` database function."""
+    quantities: Dict[int, int] = {}
+    for item in params['p_items']:
+        product_id = int(item['product_id'])
+        quantities[product_id] = quantities.get(product_id, 0) + int(item['quantity'])
+    product_ids = sorted(quantities)
+    
+    placeholders = ','.join('?' * len(product_ids))
+    products = {
+        row['id']: row for row in connection.execute(
+            f'SELECT id, price, stock FROM products WHERE id IN ({placeholders})', product_ids
+        )
+    }
+    missing = [product_id for product_id in product_ids if product_id not in products]
+    if missing:
+        raise _checkout_error('unknown_product', missing)
+    
+    decrement = params.get('p_decrement_stock', True)
+    if decrement:
+        short = [product_id for product_id in product_ids if products[product_id]['stock'] < quantities[product_id]]
+        if short:
+            raise _checkout_error('insufficient_stock', short)
+    
+    total = round(sum(products[product_id]['price'] * quantities[product_id] for product_id in product_ids), 2)
+    expected = params.get('p_expected_total')
+    if expected is not None and abs(float(expected) - total) >= 0.01:
+        raise _checkout_error('price_mismatch', total)
+    
+    if decrement:
+        connection.executemany(
+            f'UPDATE products SET stock = stock - ?, updated_at = {NOW} WHERE id = ?',
+            [(quantities[product_id], product_id) for product_id in product_ids]
+        )
+    
+    order = dict(connection.execute(
+        'INSERT INTO orders (id, user_id, total_amount, delivery_address, phone, payment_method, '
+        'payment_status, notes) VALUES (?, ?, ?, ?, ?, ?, ?, ?) RETURNING *',
+        (str(uuid.uuid4()), params['p_user_id'], total, params.get('p_delivery_address'),
+         params.get('p_phone'), params.get('p_payment_method', 'cash_on_delivery'),
+         params.get('p_payment_status', 'pending'), params.get('p_notes', ''))
+    ).fetchone())
+    
+    items = []
+    for product_id in product_ids:
+        price = products[product_id]['price']
+        quantity = quantities[product_id]
+        connection.execute(
+            'INSERT INTO order_items (order_id, product_id, quantity, unit_price, line_total) VALUES (?, ?, ?, ?, ?)',
+            (order['id'], product_id, quantity, price, round(price * quantity, 2))
+        )
+        items.append({
+            'product_id': product_id,
+            'quantity': quantity,
+            'unit_price': price,
+            'line_total': round(price * quantity, 2),
+            'stock_after': products[product_id]['stock'] - (quantity if decrement else 0)
+        })
+    order['items'] = items
+    return order
+
+def _apply_stock_deltas(connection: sqlite3.Connection, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """SQLite version of the ``apply_stock_deltas`` database function."""
+    deltas: Dict[int, int] = {}
+    for item in params['p_deltas']:
+        product_id = int(item['product_id'])
+        deltas[product_id] = deltas.get(product_id, 0) + int(item['delta'])
+    
+    rows = []
+    for product_id, delta in sorted(deltas.items()):
+        current = connection.execute('SELECT stock FROM products WHERE id = ?', (product_id,)).fetchone()
+        if current is None:
+            continue
+        target = current['stock'] + delta
+        row = connection.execute(
+            f'UPDATE products SET stock = ?, updated_at = {NOW} WHERE id = ? '
+            'RETURNING id, category, stock',
+            (max(target, 0), product_id)
+        ).fetchone()
+        rows.append({**dict(row), 'shortfall': max(-target, 0)})
+    return rows
+
+def _apply_stock_updates(connection: sqlite3.Connection, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """SQLite version of the ``apply_stock_updates`` database function."""
+    results = []
+    for item in params['p_updates']:
+        product_id = int(item['product_id'])
+        row = connection.execute('SELECT category, stock FROM products WHERE id = ?', (product_id,)).fetchone()
+        if row is None:
+            results.append({'product_id': product_id, 'category': None, 'previous_stock': None,
+                            'stock': None, 'status': 'not_found'})
+            continue
+        new_stock = int(item['stock']) if item.get('stock') is not None else row['stock'] + int(item.get('delta') or 0)
+        if new_stock < 0:
+            status, new_stock = 'negative_stock', row['stock']
+        else:
+            status = 'updated'
+            connection.execute(f'UPDATE products SET stock = ?, updated_at = {NOW} WHERE id = ?',
+                               (new_stock, product_id))
+        results.append({'product_id': product_id, 'category': row['category'],
+                        'previous_stock': row['stock'], 'stock': new_stock, 'status': status})
+    return results
+
+def _sync_products_id_sequence(connection: sqlite3.Connection, params: Dict[str, Any]) -> Optional[int]:
+    """AUTOINCREMENT already moves past explicit ids; report the high-water mark."""
+    return connection.execute('SELECT max(id) FROM products').fetchone()[0]
+
+RPC_FUNCTIONS = {
+    'create_order_with_items': _create_order_with_items,
+    'apply_stock_deltas': _apply_stock_deltas,
+    'apply_stock_updates': _apply_stock_updates,
+    'sync_products_id_sequence': _sync_products_id_sequence
+}
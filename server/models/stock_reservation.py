@@ -0,0 +1,329 @@
+from models.data_backend import data_backend
+from models.product import Product
+from decouple import config
+from typing import Optional, List, Dict, Any
+import atexit
+import logging
+import os
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# The engine is authoritative for stock only while every checkout goes
+# through this process, so it is off unless explicitly enabled.
+STOCK_RESERVATIONS_ENABLED = config('STOCK_RESERVATIONS_ENABLED', default=False, cast=bool)
+STOCK_RESERVATION_TTL = config('STOCK_RESERVATION_TTL', default=600, cast=float)
+STOCK_WRITEBACK_SECONDS = config('STOCK_WRITEBACK_SECONDS', default=2, cast=float)
+# Products with no holds or unwritten changes are reloaded after this long
+STOCK_ENTRY_IDLE_SECONDS = config('STOCK_ENTRY_IDLE_SECONDS', default=60, cast=float)
+
+class InsufficientStockError(Exception):
+    """Some products cannot cover the requested quantities."""
+    
+    def __init__(self, product_ids: List[int]):
+        super().__init__(f'Insufficient stock for products {product_ids}')
+        self.product_ids = product_ids
+
+class ReservationNotFoundError(LookupError):
+    """The reservation does not exist, has expired or belongs to another user."""
+
+class StockEntry:
+    """In-memory stock of one product.
+    
+    ``on_hand`` is the products table value as last read or written back,
+    ``pending`` the net quantity sold but not yet written back and
+    ``reserved`` the quantity held by active reservations.
+    """
+    
+    __slots__ = ('product_id', 'category', 'on_hand', 'pending', 'reserved', 'touched_at')
+    
+    def __init__(self, product_id: int, category: Optional[str], on_hand: int):
+        self.product_id = product_id
+        self.category = category
+        self.on_hand = on_hand
+        self.pending = 0
+        self.reserved = 0
+        self.touched_at = time.monotonic()
+    
+    @property
+    def available(self) -> int:
+        return self.on_hand - self.pending - self.reserved
+
+class StockReservationEngine:
+    """Reserve/commit/release of product stock held in memory.
+    
+    A checkout reserves its quantities (all or nothing) under one lock, so
+    concurrent buyers of the same product never read-modify-write the
+    database and can never be sold more than is available. Committed
+    quantities are written back to ``products.stock`` in batches by a
+    background thread through the ``apply_stock_deltas`` function;
+    reservations that are neither committed nor released expire.
+    
+    State lives in this process: with several worker processes each would
+    hand out the same stock, so enable it only with a single worker.
+    """
+    
+    def __init__(self, enabled: bool = STOCK_RESERVATIONS_ENABLED,
+                 ttl: float = STOCK_RESERVATION_TTL,
+                 writeback_seconds: float = STOCK_WRITEBACK_SECONDS,
+                 idle_seconds: float = STOCK_ENTRY_IDLE_SECONDS):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.writeback_seconds = writeback_seconds
+        self.idle_seconds = idle_seconds
+        self._entries: Dict[int, StockEntry] = {}
+        self._reservations: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_pid: Optional[int] = None
+        self._stop = threading.Event()
+        self._counters = {
+            'reserved': 0, 'committed': 0, 'released': 0, 'expired': 0,
+            'rejected': 0, 'flushes': 0, 'flush_failures': 0
+        }
+        self._last_flush_ms = 0.0
+    
+    def _ensure_writer(self) -> None:
+        # Started on first use, and again in a forked child, which does not
+        # inherit the parent's threads
+        if self._writer is not None and self._writer_pid == os.getpid():
+            return
+        with self._lock:
+            if self._writer is not None and self._writer_pid == os.getpid():
+                return
+            self._stop.clear()
+            self._writer = threading.Thread(target=self._write_loop, name='stock-writeback', daemon=True)
+            self._writer_pid = os.getpid()
+            self._writer.start()
+    
+    def _write_loop(self) -> None:
+        while not self._stop.wait(self.writeback_seconds):
+            try:
+                self.expire()
+                self.flush()
+            except Exception as e:
+                logger.error(f"💥 Stock write-back loop error: {e}")
+    
+    def _load(self, product_ids: List[int]) -> None:
+        """Read stock for products not tracked yet."""
+        with self._lock:
+            missing = [product_id for product_id in product_ids if product_id not in self._entries]
+        if not missing:
+            return
+        
+        client = data_backend.get_client()
+        response = client.table('products').select('id,category,stock').in_('id', missing).execute()
+        with self._lock:
+            for row in response.data:
+                # Another thread may have loaded (and used) it meanwhile
+                if row['id'] not in self._entries:
+                    self._entries[row['id']] = StockEntry(row['id'], row.get('category'), row['stock'] or 0)
+    
+    def reserve(self, quantities: Dict[int, int], user_id: str,
+                ttl: Optional[float] = None) -> Dict[str, Any]:
+        """Hold ``{product_id: quantity}`` for ``user_id`` for ``ttl`` seconds, all or nothing.
+        
+        Raises InsufficientStockError naming every product that falls short;
+        unknown products count as having no stock.
+        """
+        self._ensure_writer()
+        self._load(list(quantities))
+        
+        now = time.monotonic()
+        with self._lock:
+            self._expire_locked(now)
+            short = [
+                product_id for product_id, quantity in quantities.items()
+                if product_id not in self._entries or self._entries[product_id].available < quantity
+            ]
+            if short:
+                self._counters['rejected'] += 1
+                raise InsufficientStockError(short)
+            
+            for product_id, quantity in quantities.items():
+                entry = self._entries[product_id]
+                entry.reserved += quantity
+                entry.touched_at = now
+            
+            reservation = {
+                'id': uuid.uuid4().hex,
+                'user_id': user_id,
+                'items': dict(quantities),
+                'expires_at': time.time() + (ttl or self.ttl),
+                '_deadline': now + (ttl or self.ttl)
+            }
+            self._reservations[reservation['id']] = reservation
+            self._counters['reserved'] += 1
+        return self._public(reservation)
+    
+    def get(self, reservation_id: str, user_id: str) -> Dict[str, Any]:
+        with self._lock:
+            return self._public(self._find_locked(reservation_id, user_id))
+    
+    def commit(self, reservation_id: str, user_id: str) -> Dict[str, Any]:
+        """Turn a reservation into a sale; stock is written back asynchronously."""
+        with self._lock:
+            reservation = self._find_locked(reservation_id, user_id)
+            del self._reservations[reservation_id]
+            now = time.monotonic()
+            for product_id, quantity in reservation['items'].items():
+                entry = self._entries.get(product_id)
+                if entry is None:
+                    continue
+                entry.reserved -= quantity
+                entry.pending += quantity
+                entry.touched_at = now
+            self._counters['committed'] += 1
+        return self._public(reservation)
+    
+    def release(self, reservation_id: str, user_id: str) -> None:
+        """Give reserved stock back without selling it."""
+        with self._lock:
+            reservation = self._find_locked(reservation_id, user_id)
+            self._drop_locked(reservation)
+            self._counters['released'] += 1
+    
+    def return_stock(self, quantities: Dict[int, int]) -> None:
+        """Undo committed quantities, e.g. when the order write failed after commit."""
+        self._load(list(quantities))
+        with self._lock:
+            for product_id, quantity in quantities.items():
+                entry = self._entries.get(product_id)
+                if entry is not None:
+                    entry.pending -= quantity
+    
+    def sync(self, rows: List[Dict[str, Any]]) -> None:
+        """Adopt stock values just written to the products table by another path."""
+        with self._lock:
+            for row in rows:
+                entry = self._entries.get(row['id'])
+                if entry is not None:
+                    entry.on_hand = row['stock']
+    
+    def expire(self) -> int:
+        with self._lock:
+            return self._expire_locked(time.monotonic())
+    
+    def flush(self) -> int:
+        """Write committed quantities back in one batched call; returns products written."""
+        with self._flush_lock:
+            with self._lock:
+                deltas = {product_id: entry.pending for product_id, entry in self._entries.items() if entry.pending}
+            if not deltas:
+                return 0
+            
+            started_at = time.perf_counter()
+            try:
+                client = data_backend.get_client()
+                response = client.rpc('apply_stock_deltas', {
+                    'p_deltas': [{'product_id': product_id, 'delta': -quantity}
+                                 for product_id, quantity in deltas.items()]
+                }).execute()
+            except Exception as e:
+                # Pending quantities stay in memory and go out with the next flush
+                with self._lock:
+                    self._counters['flush_failures'] += 1
+                logger.error(f"💥 Stock write-back failed for {len(deltas)} products: {e}")
+                return 0
+            
+            changes = []
+            with self._lock:
+                for row in response.data:
+                    quantity = deltas[row['id']]
+                    # Units the database could not deduct without going negative
+                    shortfall = row.get('shortfall') or 0
+                    if shortfall:
+                        logger.warning(f"⚠️ Product {row['id']} oversold by {shortfall}: "
+                                       f"stock was lowered below the committed quantity, clamped to 0")
+                    entry = self._entries.get(row['id'])
+                    if entry is not None:
+                        entry.pending -= quantity
+                        entry.on_hand = row['stock']
+                    changes.append((
+                        {'id': row['id'], 'category': row['category'],
+                         'stock': row['stock'] + quantity - shortfall},
+                        {'id': row['id'], 'category': row['category'], 'stock': row['stock']}
+                    ))
+                # Products deleted in the meantime have nothing left to write,
+                # and reservations holding them can no longer be checked out
+                for product_id in deltas.keys() - {row['id'] for row in response.data}:
+                    self._forget_product_locked(product_id)
+                    logger.warning(f"⚠️ Dropping stock changes for deleted product {product_id}")
+                self._counters['flushes'] += 1
+                self._last_flush_ms = round((time.perf_counter() - started_at) * 1000, 2)
+        
+        Product.record_changes(changes)
+        logger.debug(f"✅ Stock written back for {len(changes)} products")
+        return len(changes)
+    
+    def shutdown(self) -> None:
+        self._stop.set()
+        if self._writer_pid == os.getpid():
+            self.flush()
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'tracked_products': len(self._entries),
+                'active_reservations': len(self._reservations),
+                'reserved_units': sum(entry.reserved for entry in self._entries.values()),
+                'pending_units': sum(entry.pending for entry in self._entries.values()),
+                'last_flush_ms': self._last_flush_ms,
+                **self._counters
+            }
+    
+    def _find_locked(self, reservation_id: str, user_id: str) -> Dict[str, Any]:
+        reservation = self._reservations.get(reservation_id)
+        if reservation is None or reservation['_deadline'] <= time.monotonic():
+            raise ReservationNotFoundError(reservation_id)
+        # Only the user who reserved may use or release the hold
+        if not user_id or reservation['user_id'] != user_id:
+            raise ReservationNotFoundError(reservation_id)
+        return reservation
+    
+    def _drop_locked(self, reservation: Dict[str, Any]) -> None:
+        del self._reservations[reservation['id']]
+        for product_id, quantity in reservation['items'].items():
+            entry = self._entries.get(product_id)
+            if entry is not None:
+                entry.reserved -= quantity
+    
+    def _forget_product_locked(self, product_id: int) -> None:
+        """Stop tracking a product, releasing every reservation that holds it."""
+        holding = [reservation for reservation in self._reservations.values()
+                   if product_id in reservation['items']]
+        for reservation in holding:
+            self._drop_locked(reservation)
+        self._counters['released'] += len(holding)
+        self._entries.pop(product_id, None)
+    
+    def _expire_locked(self, now: float) -> int:
+        expired = [reservation for reservation in self._reservations.values() if reservation['_deadline'] <= now]
+        for reservation in expired:
+            self._drop_locked(reservation)
+        self._counters['expired'] += len(expired)
+        
+        idle = [
+            product_id for product_id, entry in self._entries.items()
+            if not entry.reserved and not entry.pending and now - entry.touched_at > self.idle_seconds
+        ]
+        for product_id in idle:
+            del self._entries[product_id]
+        return len(expired)
+    
+    @staticmethod
+    def _public(reservation: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'reservation_id': reservation['id'],
+            'items': [{'product_id': product_id, 'quantity': quantity}
+                      for product_id, quantity in reservation['items'].items()],
+            'expires_at': reservation['expires_at']
+        }
+
+# Global instance
+stock_reservations = StockReservationEngine()
+atexit.register(stock_reservations.shutdown)
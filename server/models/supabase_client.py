@@ -1,30 +1,217 @@
-from supabase import create_client, Client
 from decouple import config
+from utils.metrics import metrics
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 import os
-import sys
+import threading
+import logging
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+logger = logging.getLogger(__name__)
+
+# 'shared': one client for all threads; 'thread': one client per thread.
+# Both modes send requests through the same pooled HTTP connections.
+SUPABASE_CLIENT_MODE = config('SUPABASE_CLIENT_MODE', default='shared')
+SUPABASE_POOL_MAX_CONNECTIONS = config('SUPABASE_POOL_MAX_CONNECTIONS', default=20, cast=int)
+SUPABASE_POOL_MAX_KEEPALIVE = config('SUPABASE_POOL_MAX_KEEPALIVE', default=10, cast=int)
+SUPABASE_KEEPALIVE_EXPIRY = config('SUPABASE_KEEPALIVE_EXPIRY', default=30, cast=float)
+SUPABASE_CONNECT_TIMEOUT = config('SUPABASE_CONNECT_TIMEOUT', default=5, cast=float)
+SUPABASE_READ_TIMEOUT = config('SUPABASE_READ_TIMEOUT', default=30, cast=float)
+# Seconds to wait for a free pooled connection before failing
+SUPABASE_POOL_TIMEOUT = config('SUPABASE_POOL_TIMEOUT', default=10, cast=float)
+SUPABASE_HTTP2 = config('SUPABASE_HTTP2', default=False, cast=bool)
+# Independent pools that split the connections; threads are spread across
+# them. One httpx pool serializes on its lock with many concurrent threads.
+# 0 picks one pool per 25 connections.
+SUPABASE_POOL_SHARDS = config('SUPABASE_POOL_SHARDS', default=0, cast=int)
 
 class SupabaseService:
-    def __init__(self):
-        print("🔗 === INITIALIZING SUPABASE SERVICE ===")
-        supabase_url = config('SUPABASE_URL')
-        supabase_key = config('SUPABASE_KEY')
-        
-        print(f"🌐 Supabase URL: {supabase_url}")
-        print(f"🔑 API Key: {supabase_key[:20]}...{supabase_key[-10:]}")
+    """Creates Supabase clients over pooled, keep-alive HTTP connections.
+    
+    httpx connection pools are thread-safe, so in ``shared`` mode threads
+    share one client per pool. ``thread`` mode gives each thread its own
+    client object (for callers that mutate client state such as auth
+    headers) while still reusing the pooled connections. With
+    ``SUPABASE_POOL_SHARDS`` above 1 the connections are split over that
+    many pools and each thread sticks to one of them, which keeps lock
+    contention flat when hundreds of threads wait on the database.
+    
+    Nothing is imported or connected until the first ``get_client()``, and
+    a forked child (gunicorn ``--preload`` workers) drops whatever it
+    inherited and builds its own pools, since sockets and locks cannot be
+    shared across processes.
+    """
+    
+    def __init__(self, mode: str = SUPABASE_CLIENT_MODE, shards: int = SUPABASE_POOL_SHARDS):
+        if mode not in ('shared', 'thread'):
+            raise ValueError(f"SUPABASE_CLIENT_MODE must be 'shared' or 'thread', not {mode!r}")
+        self.mode = mode
+        self.shards = shards if shards > 0 else max(1, SUPABASE_POOL_MAX_CONNECTIONS // 25)
+        self._override: Optional['Client'] = None
+        self._reset()
+    
+    def _reset(self) -> None:
+        self._pid = os.getpid()
+        self.transports: List[Any] = []
+        self.http_clients: List[Any] = []
+        self._shared_clients: Dict[int, 'Client'] = {}
+        self._local = threading.local()
+        self._next_shard = 0
+        self._clients_created = 0
+        self._lock = threading.Lock()
+        self._client_lock = threading.Lock()
+    
+    def _ensure_pool(self) -> None:
+        if self.http_clients:
+            return
+        with self._lock:
+            if self.http_clients:
+                return
+            logger.debug("🔗 === INITIALIZING SUPABASE SERVICE ===")
+            import httpx
+            from models.http_transport import MeteredTransport
+            
+            self.supabase_url = config('SUPABASE_URL')
+            self.supabase_key = config('SUPABASE_KEY')
+            logger.debug(f"🌐 Supabase URL: {self.supabase_url} "
+                         f"(client mode: {self.mode}, pools: {self.shards})")
+            
+            # Round up so the shards together allow at least the configured totals
+            max_connections = -(-SUPABASE_POOL_MAX_CONNECTIONS // self.shards)
+            max_keepalive = -(-SUPABASE_POOL_MAX_KEEPALIVE // self.shards)
+            for _ in range(self.shards):
+                transport = MeteredTransport(
+                    limits=httpx.Limits(
+                        max_connections=max_connections,
+                        max_keepalive_connections=max_keepalive,
+                        keepalive_expiry=SUPABASE_KEEPALIVE_EXPIRY
+                    ),
+                    http2=SUPABASE_HTTP2
+                )
+                self.transports.append(transport)
+                self.http_clients.append(httpx.Client(
+                    transport=transport,
+                    timeout=httpx.Timeout(SUPABASE_READ_TIMEOUT, connect=SUPABASE_CONNECT_TIMEOUT,
+                                          pool=SUPABASE_POOL_TIMEOUT),
+                    follow_redirects=True
+                ))
+            logger.debug("🔗 === SUPABASE SERVICE INITIALIZED ===")
+    
+    def _shard(self) -> int:
+        """The pool this thread uses, assigned round-robin on first call."""
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            with self._lock:
+                shard = self._next_shard % self.shards
+                self._next_shard += 1
+            self._local.shard = shard
+        return shard
+    
+    def _create_client(self, shard: int) -> 'Client':
+        from supabase import create_client, ClientOptions
         
+        self._ensure_pool()
         try:
-            self.client: Client = create_client(supabase_url, supabase_key)
-            print("✅ Supabase client created successfully")
+            # Timeouts and limits come from the pooled httpx client
+            client = create_client(self.supabase_url, self.supabase_key,
+                                   options=ClientOptions(httpx_client=self.http_clients[shard]))
         except Exception as e:
-            print(f"💥 Failed to create Supabase client: {e}")
+            logger.error(f"💥 Failed to create Supabase client: {e}")
             raise e
+        with self._lock:
+            self._clients_created += 1
+        logger.debug("✅ Supabase client created successfully")
+        return client
+    
+    @property
+    def client(self) -> 'Client':
+        """The calling thread's client."""
+        return self.get_client()
+    
+    @client.setter
+    def client(self, client: 'Client') -> None:
+        # Lets scripts and tests substitute a client of their own
+        self._override = client
+    
+    def get_client(self) -> 'Client':
+        if self._override is not None:
+            return self._override
+        if self._pid != os.getpid():
+            # Forked without the at-fork hook having run
+            self._reset()
+        
+        if self.mode == 'thread':
+            client: Optional['Client'] = getattr(self._local, 'client', None)
+            if client is None:
+                logger.debug(f"📡 Creating Supabase client for thread {threading.current_thread().name}")
+                client = self._create_client(self._shard())
+                self._local.client = client
+            return client
+        
+        shard = self._shard()
+        client = self._shared_clients.get(shard)
+        if client is None:
+            with self._client_lock:
+                client = self._shared_clients.get(shard)
+                if client is None:
+                    client = self._create_client(shard)
+                    self._shared_clients[shard] = client
+        return client
+    
+    def pool_stats(self) -> Dict[str, Any]:
+        """Connection pool utilization and request counters, summed over pools."""
+        transports = list(self.transports)
+        stats = {
+            'mode': self.mode,
+            'pools': self.shards,
+            'initialized': bool(transports),
+            'clients_created': self._clients_created,
+            'max_connections': SUPABASE_POOL_MAX_CONNECTIONS,
+            'max_keepalive_connections': SUPABASE_POOL_MAX_KEEPALIVE
+        }
+        if not transports:
+            return stats
+        
+        totals = {'in_flight': 0, 'peak_in_flight': 0, 'requests': 0, 'errors': 0, 'timeouts': 0,
+                  'open_connections': 0, 'idle_connections': 0}
+        seconds_total = 0.0
+        for transport in transports:
+            with transport._lock:
+                totals['in_flight'] += transport.in_flight
+                totals['peak_in_flight'] += transport.peak_in_flight
+                totals['requests'] += transport.requests
+                totals['errors'] += transport.errors
+                totals['timeouts'] += transport.timeouts
+                seconds_total += transport.seconds_total
+            for key, value in transport.connection_counts().items():
+                totals[key] += value
         
-        print("🔗 === SUPABASE SERVICE INITIALIZED ===")
+        requests = totals['requests']
+        stats.update(totals)
+        stats['utilization'] = round(totals['in_flight'] / SUPABASE_POOL_MAX_CONNECTIONS, 3)
+        stats['request_ms_avg'] = round(seconds_total / requests * 1000, 2) if requests else 0.0
+        return stats
     
-    def get_client(self) -> Client:
-        print("📡 Getting Supabase client...")
-        return self.client
+    def metric_samples(self) -> List[Any]:
+        """Pool gauges and counters for the metrics endpoint."""
+        stats = self.pool_stats()
+        if not stats['initialized']:
+            return []
+        return [
+            ('supabase_pool_in_flight', 'gauge', 'Requests using a pooled connection.', {}, stats['in_flight']),
+            ('supabase_pool_open_connections', 'gauge', 'Open pooled connections.', {}, stats['open_connections']),
+            ('supabase_pool_idle_connections', 'gauge', 'Idle keep-alive connections.', {}, stats['idle_connections']),
+            ('supabase_pool_max_connections', 'gauge', 'Configured connection limit.', {}, stats['max_connections']),
+            ('supabase_http_requests_total', 'counter', 'HTTP requests sent to Supabase.', {}, stats['requests']),
+            ('supabase_http_errors_total', 'counter', 'Transport errors talking to Supabase.',
+             {'kind': 'transport'}, stats['errors']),
+            ('supabase_http_errors_total', 'counter', 'Transport errors talking to Supabase.',
+             {'kind': 'timeout'}, stats['timeouts'])
+        ]
 
-# Global instance
-print("🚀 Creating global Supabase service instance...")
+# Global instance; clients are created on first use
 supabase_service = SupabaseService()
+metrics.add_collector(supabase_service.metric_samples)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=supabase_service._reset)
@@ -1,8 +1,27 @@
-import bcrypt
 from datetime import datetime
-from models.supabase_client import supabase_service
+from models.data_backend import data_backend, is_api_error
+from utils.password_hasher import password_hasher, HasherBusyError
+from utils.cache import TTLCache
+from decouple import config
 from typing import Optional, Dict, Any
 import sys
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Postgres error code for a unique constraint violation
+UNIQUE_VIOLATION = '23505'
+
+# Short-lived cache of user rows keyed by ('email', email) and ('id', id).
+# Misses are not cached, so a user created by another worker is found at once.
+user_cache = TTLCache(
+    max_size=config('USER_CACHE_MAX_SIZE', default=4096, cast=int),
+    default_ttl=config('USER_CACHE_TTL', default=30, cast=float),
+    name='users'
+)
+
+class UserAlreadyExistsError(Exception):
+    """Raised by User.create_user when the email is already registered."""
 
 class User:
     def __init__(self, id=None, email=None, password=None, name=None, phone=None, role='customer'):
@@ -18,18 +37,39 @@ class User:
     @staticmethod
     def hash_password(password: str) -> str:
         """Hash a password for storing."""
-        print("🔐 Hashing password...")
-        hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-        print("✅ Password hashed successfully")
+        logger.debug("🔐 Hashing password...")
+        hashed = password_hasher.hash(password)
+        logger.debug("✅ Password hashed successfully")
         return hashed
     
     def check_password(self, password: str) -> bool:
         """Check if provided password matches the hashed password."""
-        print("🔍 Checking password...")
-        result = bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
-        print(f"🔐 Password check result: {'✅ MATCH' if result else '❌ NO MATCH'}")
+        logger.debug("🔍 Checking password...")
+        result = password_hasher.verify(password, self.password_hash)
+        logger.debug(f"🔐 Password check result: {'✅ MATCH' if result else '❌ NO MATCH'}")
         return result
     
+    def needs_rehash(self) -> bool:
+        """True when the stored hash uses an outdated bcrypt cost factor."""
+        return password_hasher.needs_rehash(self.password_hash)
+    
+    def update_password_hash(self, password: str) -> bool:
+        """Re-hash ``password`` with the current cost factor and store it."""
+        logger.debug(f"🔐 Re-hashing password for user: {self.id}")
+        try:
+            new_hash = self.hash_password(password)
+            client = data_backend.get_client()
+            client.table('users').update({
+                'password_hash': new_hash,
+                'updated_at': datetime.now().isoformat()
+            }).eq('id', self.id).execute()
+            self.password_hash = new_hash
+            User.invalidate_cache(self)
+            return True
+        except Exception as e:
+            logger.error(f"💥 Error updating password hash: {e}")
+            return False
+    
     def to_dict(self) -> Dict[str, Any]:
         """Convert user object to dictionary."""
         user_dict = {
@@ -41,19 +81,46 @@ class User:
             'created_at': getattr(self, 'created_at', None),
             'updated_at': getattr(self, 'updated_at', None)
         }
-        print(f"📋 User converted to dict: {user_dict}")
         return user_dict
     
+    @classmethod
+    def from_row(cls, user_dict: Dict[str, Any]) -> 'User':
+        """Build a User from a users table row."""
+        user = cls(
+            id=user_dict['id'],
+            email=user_dict['email'],
+            name=user_dict['name'],
+            phone=user_dict['phone'],
+            role=user_dict['role']
+        )
+        user.password_hash = user_dict['password_hash']
+        user.created_at = user_dict.get('created_at')
+        user.updated_at = user_dict.get('updated_at')
+        return user
+    
+    @staticmethod
+    def _cache(user: 'User') -> None:
+        user_cache.set(('email', user.email), user)
+        user_cache.set(('id', user.id), user)
+    
+    @staticmethod
+    def invalidate_cache(user: 'User') -> None:
+        """Drop a user from the lookup cache after a write."""
+        user_cache.invalidate(('email', user.email))
+        user_cache.invalidate(('id', user.id))
+    
     @classmethod
     def create_user(cls, email: str, password: str, name: str = None, phone: str = None, role: str = 'customer'):
-        """Create a new user in Supabase."""
-        print(f"👤 === CREATING USER: {email} ===")
+        """Create a new user in Supabase with a single insert.
+        
+        Relies on the unique index on users.email (see supabase/migrations)
+        instead of a lookup first; a duplicate raises UserAlreadyExistsError.
+        """
+        logger.debug(f"👤 === CREATING USER: {email} ===")
         try:
-            print("🔗 Getting Supabase client...")
-            supabase = supabase_service.get_client()
-            print("✅ Supabase client obtained")
+            client = data_backend.get_client()
             
-            print("📦 Preparing user data...")
+            logger.debug("📦 Preparing user data...")
             user_data = {
                 'email': email,
                 'password_hash': cls.hash_password(password),
@@ -63,103 +130,79 @@ class User:
                 'created_at': datetime.now().isoformat(),
                 'updated_at': datetime.now().isoformat()
             }
-            print(f"📋 User data prepared: {user_data}")
             
-            print("💾 Inserting user into database...")
-            response = supabase.table('users').insert(user_data).execute()
-            print(f"📡 Database response: {response}")
+            logger.debug("💾 Inserting user into database...")
+            response = client.table('users').insert(user_data).execute()
             
             if response.data:
-                user_dict = response.data[0]
-                print(f"✅ User created in database: {user_dict}")
+                user = cls.from_row(response.data[0])
+                cls._cache(user)
                 
-                user = cls(
-                    id=user_dict['id'],
-                    email=user_dict['email'],
-                    name=user_dict['name'],
-                    phone=user_dict['phone'],
-                    role=user_dict['role']
-                )
-                user.password_hash = user_dict['password_hash']
-                user.created_at = user_dict['created_at']
-                user.updated_at = user_dict['updated_at']
-                
-                print(f"✅ User object created successfully")
-                print("👤 === USER CREATION COMPLETED ===")
+                logger.debug(f"✅ User created in database: {user.id}")
+                logger.debug("👤 === USER CREATION COMPLETED ===")
                 return user
             else:
-                print("❌ No data returned from database")
+                logger.warning("❌ No data returned from database")
                 return None
+        except HasherBusyError:
+            raise
         except Exception as e:
-            print(f"💥 Error creating user: {e}")
-            print("👤 === USER CREATION FAILED ===")
+            if is_api_error(e) and e.code == UNIQUE_VIOLATION:
+                logger.warning(f"❌ User already exists: {email}")
+                raise UserAlreadyExistsError(email)
+            logger.error(f"💥 Error creating user: {e}")
+            logger.debug("👤 === USER CREATION FAILED ===")
             return None
     
     @classmethod
     def find_by_email(cls, email: str) -> Optional['User']:
         """Find user by email."""
-        print(f"🔍 === SEARCHING FOR USER: {email} ===")
+        logger.debug(f"🔍 === SEARCHING FOR USER: {email} ===")
+        user = user_cache.get(('email', email))
+        if user is not None:
+            logger.debug("✅ User served from cache")
+            return user
         try:
-            print("🔗 Getting Supabase client...")
-            supabase = supabase_service.get_client()
-            print("✅ Supabase client obtained")
+            client = data_backend.get_client()
             
-            print(f"🔍 Querying database for user: {email}")
-            response = supabase.table('users').select('*').eq('email', email).execute()
-            print(f"📡 Database response: {response}")
+            logger.debug(f"🔍 Querying database for user: {email}")
+            response = client.table('users').select('*').eq('email', email).execute()
             
             if response.data:
-                user_dict = response.data[0]
-                print(f"✅ User found in database: {user_dict}")
-                
-                user = cls(
-                    id=user_dict['id'],
-                    email=user_dict['email'],
-                    name=user_dict['name'],
-                    phone=user_dict['phone'],
-                    role=user_dict['role']
-                )
-                user.password_hash = user_dict['password_hash']
-                user.created_at = user_dict.get('created_at')
-                user.updated_at = user_dict.get('updated_at')
+                user = cls.from_row(response.data[0])
+                cls._cache(user)
                 
-                print("✅ User object created from database data")
-                print("🔍 === USER SEARCH COMPLETED ===")
+                logger.debug("✅ User object created from database data")
+                logger.debug("🔍 === USER SEARCH COMPLETED ===")
                 return user
             else:
-                print(f"❌ User not found: {email}")
-                print("🔍 === USER SEARCH COMPLETED (NOT FOUND) ===")
+                logger.warning(f"❌ User not found: {email}")
+                logger.debug("🔍 === USER SEARCH COMPLETED (NOT FOUND) ===")
                 return None
         except Exception as e:
-            print(f"💥 Error finding user: {e}")
-            print("🔍 === USER SEARCH FAILED ===")
+            logger.error(f"💥 Error finding user: {e}")
+            logger.debug("🔍 === USER SEARCH FAILED ===")
             return None
     
     @classmethod
     def find_by_id(cls, user_id: int) -> Optional['User']:
         """Find user by ID."""
-        print(f"🔍 === SEARCHING FOR USER BY ID: {user_id} ===")
+        logger.debug(f"🔍 === SEARCHING FOR USER BY ID: {user_id} ===")
+        user = user_cache.get(('id', str(user_id)))
+        if user is not None:
+            logger.debug("✅ User served from cache")
+            return user
         try:
-            supabase = supabase_service.get_client()
+            client = data_backend.get_client()
             
-            response = supabase.table('users').select('*').eq('id', user_id).execute()
-            print(f"📡 Database response: {response}")
+            response = client.table('users').select('*').eq('id', user_id).execute()
             
             if response.data:
-                user_dict = response.data[0]
-                user = cls(
-                    id=user_dict['id'],
-                    email=user_dict['email'],
-                    name=user_dict['name'],
-                    phone=user_dict['phone'],
-                    role=user_dict['role']
-                )
-                user.password_hash = user_dict['password_hash']
-                user.created_at = user_dict.get('created_at')
-                user.updated_at = user_dict.get('updated_at')
-                print("✅ User found by ID")
+                user = cls.from_row(response.data[0])
+                cls._cache(user)
+                logger.debug("✅ User found by ID")
                 return user
             return None
         except Exception as e:
-            print(f"💥 Error finding user by ID: {e}")
+            logger.error(f"💥 Error finding user by ID: {e}")
             return None
@@ -1,8 +1,12 @@
 from flask import Blueprint, request, jsonify
 from flask_cors import cross_origin
-from models.user import User
+from models.user import User, UserAlreadyExistsError
 from utils.jwt_helper import JWTHelper
+from utils.password_hasher import HasherBusyError
 import sys
+import logging
+
+logger = logging.getLogger(__name__)
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
@@ -10,19 +14,18 @@ auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 @cross_origin()
 def login():
     """User login endpoint."""
-    print("🔐 === LOGIN ENDPOINT CALLED ===")
+    logger.debug("🔐 === LOGIN ENDPOINT CALLED ===")
     
     if request.method == 'OPTIONS':
-        print("✅ OPTIONS request handled for login")
+        logger.debug("✅ OPTIONS request handled for login")
         return '', 200
     
     try:
-        print("📥 Processing login request...")
+        logger.debug("📥 Processing login request...")
         data = request.get_json()
-        print(f"📋 Received data: {data}")
         
         if not data:
-            print("❌ No data provided in request")
+            logger.warning("❌ No data provided in request")
             return jsonify({
                 'success': False,
                 'message': 'No data provided'
@@ -31,38 +34,43 @@ def login():
         email = data.get('email', '').strip()
         password = data.get('password', '').strip()
         
-        print(f"👤 Login attempt for email: {email}")
+        logger.debug(f"👤 Login attempt for email: {email}")
         
         if not email or not password:
-            print("❌ Missing email or password")
+            logger.warning("❌ Missing email or password")
             return jsonify({
                 'success': False,
                 'message': 'Email and password are required'
             }), 400
         
-        print("🔍 Searching for user in database...")
+        logger.debug("🔍 Searching for user in database...")
         # Find user by email
         user = User.find_by_email(email)
         
         if not user:
-            print(f"❌ User not found: {email}")
+            logger.warning(f"❌ User not found: {email}")
             return jsonify({
                 'success': False,
                 'message': 'Invalid credentials'
             }), 401
         
-        print(f"✅ User found: {email}")
-        print("🔐 Checking password...")
+        logger.debug(f"✅ User found: {email}")
+        logger.debug("🔐 Checking password...")
         
         if not user.check_password(password):
-            print("❌ Password check failed")
+            logger.warning("❌ Password check failed")
             return jsonify({
                 'success': False,
                 'message': 'Invalid credentials'
             }), 401
         
-        print("✅ Password check passed")
-        print("🎟️ Generating JWT token...")
+        logger.debug("✅ Password check passed")
+        
+        # Transparently upgrade hashes made with an outdated cost factor
+        if user.needs_rehash():
+            user.update_password_hash(password)
+        
+        logger.debug("🎟️ Generating JWT token...")
         
         # Generate JWT token
         token = JWTHelper.encode_token(user.id, user.email, user.role)
@@ -76,15 +84,20 @@ def login():
             }
         }
         
-        print(f"✅ Login successful for user: {email}")
-        print(f"🎟️ Token generated: {token[:20]}...")
-        print("🔐 === LOGIN COMPLETED SUCCESSFULLY ===")
+        logger.debug(f"✅ Login successful for user: {email}")
+        logger.debug("🔐 === LOGIN COMPLETED SUCCESSFULLY ===")
         
         return jsonify(response_data), 200
-        
+    
+    except HasherBusyError as e:
+        logger.warning(f"⚠️ Login rejected, password hasher busy: {e}")
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 503, {'Retry-After': '1'}
     except Exception as e:
-        print(f"💥 LOGIN ERROR: {str(e)}")
-        print("🔐 === LOGIN FAILED ===")
+        logger.error(f"💥 LOGIN ERROR: {str(e)}")
+        logger.debug("🔐 === LOGIN FAILED ===")
         return jsonify({
             'success': False,
             'message': f'Login failed: {str(e)}'
@@ -94,19 +107,18 @@ def login():
 @cross_origin()
 def signup():
     """User registration endpoint."""
-    print("📝 === SIGNUP ENDPOINT CALLED ===")
+    logger.debug("📝 === SIGNUP ENDPOINT CALLED ===")
     
     if request.method == 'OPTIONS':
-        print("✅ OPTIONS request handled for signup")
+        logger.debug("✅ OPTIONS request handled for signup")
         return '', 200
     
     try:
-        print("📥 Processing signup request...")
+        logger.debug("📥 Processing signup request...")
         data = request.get_json()
-        print(f"📋 Received data: {data}")
         
         if not data:
-            print("❌ No data provided in request")
+            logger.warning("❌ No data provided in request")
             return jsonify({
                 'success': False,
                 'message': 'No data provided'
@@ -116,56 +128,42 @@ def signup():
         password = data.get('password', '').strip()
         name = data.get('name', '').strip()
         phone = data.get('phone', '').strip()
-        role = data.get('role', 'customer').strip()
         
-        print(f"👤 Signup attempt for: {email}")
-        print(f"📛 Name: {name}")
-        print(f"📞 Phone: {phone}")
-        print(f"🎭 Role: {role}")
+        logger.debug(f"👤 Signup attempt for: {email}")
+        logger.debug(f"📛 Name: {name}")
+        logger.debug(f"📞 Phone: {phone}")
         
         if not email or not password:
-            print("❌ Missing email or password")
+            logger.warning("❌ Missing email or password")
             return jsonify({
                 'success': False,
                 'message': 'Email and password are required'
             }), 400
         
-        print("🔍 Checking if user already exists...")
-        # Check if user already exists
-        existing_user = User.find_by_email(email)
-        if existing_user:
-            print(f"❌ User already exists: {email}")
-            return jsonify({
-                'success': False,
-                'message': 'User already exists'
-            }), 409
+        # Self-service accounts are always customers; admins are created
+        # out of band (see seed_db.py), never from a client-supplied role
+        if data.get('role') not in (None, 'customer'):
+            logger.warning(f"⚠️ Ignoring role {data.get('role')!r} requested at signup")
         
-        print("✅ Email is available")
-        
-        # Validate role
-        if role not in ['customer', 'admin']:
-            role = 'customer'
-            print(f"⚠️ Invalid role provided, defaulting to: {role}")
-        
-        print("👤 Creating new user...")
-        # Create new user
+        logger.debug("👤 Creating new user...")
+        # Create new user - one insert; the unique email index rejects duplicates
         new_user = User.create_user(
             email=email,
             password=password,
             name=name if name else None,
             phone=phone if phone else None,
-            role=role
+            role='customer'
         )
         
         if not new_user:
-            print("💥 Failed to create user in database")
+            logger.error("💥 Failed to create user in database")
             return jsonify({
                 'success': False,
                 'message': 'Failed to create user'
             }), 500
         
-        print(f"✅ User created successfully: {email}")
-        print("🎟️ Generating JWT token...")
+        logger.debug(f"✅ User created successfully: {email}")
+        logger.debug("🎟️ Generating JWT token...")
         
         # Generate JWT token
         token = JWTHelper.encode_token(new_user.id, new_user.email, new_user.role)
@@ -179,15 +177,26 @@ def signup():
             }
         }
         
-        print(f"✅ Signup successful for user: {email}")
-        print(f"🎟️ Token generated: {token[:20]}...")
-        print("📝 === SIGNUP COMPLETED SUCCESSFULLY ===")
+        logger.debug(f"✅ Signup successful for user: {email}")
+        logger.debug("📝 === SIGNUP COMPLETED SUCCESSFULLY ===")
         
         return jsonify(response_data), 201
-        
+    
+    except UserAlreadyExistsError:
+        logger.warning(f"❌ User already exists: {email}")
+        return jsonify({
+            'success': False,
+            'message': 'User already exists'
+        }), 409
+    except HasherBusyError as e:
+        logger.warning(f"⚠️ Signup rejected, password hasher busy: {e}")
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 503, {'Retry-After': '1'}
     except Exception as e:
-        print(f"💥 SIGNUP ERROR: {str(e)}")
-        print("📝 === SIGNUP FAILED ===")
+        logger.error(f"💥 SIGNUP ERROR: {str(e)}")
+        logger.debug("📝 === SIGNUP FAILED ===")
         return jsonify({
             'success': False,
             'message': f'Registration failed: {str(e)}'
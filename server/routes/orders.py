@@ -1,71 +1,192 @@
 from flask import Blueprint, request, jsonify
 from flask_cors import cross_origin
-from models.supabase_client import supabase_service
-import sys
+from models.data_backend import data_backend
+from models.order import InvalidOrderError, Order, OrderConflictError
+from models.stock_reservation import ReservationNotFoundError, stock_reservations
+from middleware.auth_middleware import token_required
+from utils.pagination import PaginationError, decode_cursor, encode_cursor, parse_limit
+from datetime import datetime
+from typing import Any, Dict, Optional
+import logging
+import re
+import uuid
+
+logger = logging.getLogger(__name__)
 
 orders_bp = Blueprint('orders', __name__, url_prefix='/api/orders')
 
+# Timestamps as the databases return them, e.g. 2026-10-18T06:27:48.123456+00:00
+CURSOR_TIMESTAMP = re.compile(r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d{1,6})?([+-]\d{2}:\d{2}|Z)?')
+
+def parse_date_param(name: str) -> Optional[str]:
+    """Validate an ISO 8601 date/datetime query parameter."""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).isoformat()
+    except ValueError:
+        raise ValueError(f'{name} must be an ISO 8601 date or datetime')
+
+def parse_order_position(position: Dict[str, Any]) -> Dict[str, str]:
+    """Validate a decoded orders cursor before it is used in a filter.
+    
+    ``created_at`` must be an ISO 8601 timestamp and ``id`` a UUID;
+    anything else raises PaginationError.
+    """
+    created_at = position.get('created_at')
+    last_id = position.get('id')
+    if not isinstance(created_at, str) or not isinstance(last_id, str):
+        raise PaginationError('Invalid cursor')
+    if not CURSOR_TIMESTAMP.fullmatch(created_at):
+        raise PaginationError('Invalid cursor')
+    try:
+        datetime.fromisoformat(created_at)
+        last_id = str(uuid.UUID(last_id))
+    except ValueError:
+        raise PaginationError('Invalid cursor')
+    # The timestamp is passed through unchanged: SQLite compares it as text
+    return {'created_at': created_at, 'id': last_id}
+
+def resolve_order_owner() -> Optional[str]:
+    """The user whose orders are requested: the caller, or any user for admins."""
+    current_user = request.current_user
+    if current_user.get('role') == 'admin':
+        # Admins may look at one user (?user_id=) or, without it, everyone
+        return request.args.get('user_id')
+    return current_user['sub']
+
 @orders_bp.route('/', methods=['GET', 'OPTIONS'])
 @cross_origin()
+@token_required
 def get_orders():
-    """Get all orders - for testing without auth first."""
-    print("🛒 === GET ORDERS ENDPOINT CALLED ===")
+    """Get the caller's orders newest first, filtered by status/date range and keyset-paginated."""
+    logger.debug("🛒 === GET ORDERS ENDPOINT CALLED ===")
     
     if request.method == 'OPTIONS':
-        print("✅ OPTIONS request handled for orders")
+        logger.debug("✅ OPTIONS request handled for orders")
         return '', 200
     
     try:
-        print("📥 Getting all orders...")
-        supabase = supabase_service.get_client()
-        response = supabase.table('orders').select('*').execute()
+        limit = parse_limit(request.args.get('limit'))
+        position = decode_cursor(request.args.get('cursor'))
+        if position is not None:
+            position = parse_order_position(position)
+        
+        try:
+            created_from = parse_date_param('from')
+            created_to = parse_date_param('to')
+        except ValueError as e:
+            logger.warning(f"❌ Invalid date filter: {e}")
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
         
-        print(f"✅ Found {len(response.data)} orders")
+        user_id = resolve_order_owner()
+        status = request.args.get('status')
+        
+        logger.debug(f"📥 Getting orders page - User: {user_id}, Status: {status}, Limit: {limit}, Cursor: {position}")
+        orders, next_position = Order.get_page(
+            user_id,
+            limit,
+            position=position,
+            status=status,
+            created_from=created_from,
+            created_to=created_to
+        )
+        
+        logger.debug(f"✅ Found {len(orders)} orders")
         return jsonify({
             'success': True,
-            'data': response.data,
-            'count': len(response.data)
+            'data': orders,
+            'count': len(orders),
+            'next_cursor': encode_cursor(next_position) if next_position else None
         }), 200
-        
+    
+    except PaginationError as e:
+        logger.warning(f"❌ Invalid pagination parameters: {e}")
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
     except Exception as e:
-        print(f"💥 ERROR getting orders: {e}")
+        logger.error(f"💥 ERROR getting orders: {e}")
         return jsonify({
             'success': False,
             'message': f'Failed to get orders: {str(e)}'
         }), 500
 
+@orders_bp.route('/summary', methods=['GET', 'OPTIONS'])
+@cross_origin()
+@token_required
+def get_order_summary():
+    """Order counts and totals per status for the caller (or ?user_id= for admins)."""
+    logger.debug("📊 === GET ORDER SUMMARY ENDPOINT CALLED ===")
+    
+    if request.method == 'OPTIONS':
+        logger.debug("✅ OPTIONS request handled for order summary")
+        return '', 200
+    
+    try:
+        user_id = resolve_order_owner()
+        if user_id is None:
+            return jsonify({
+                'success': False,
+                'message': 'user_id is required'
+            }), 400
+        
+        summary = Order.get_summary(user_id)
+        
+        logger.debug(f"✅ Order summary for {user_id}: {summary['total_orders']} orders")
+        return jsonify({
+            'success': True,
+            'data': summary
+        }), 200
+    
+    except Exception as e:
+        logger.error(f"💥 ERROR getting order summary: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'Failed to get order summary: {str(e)}'
+        }), 500
+
 @orders_bp.route('/', methods=['POST'])
 @cross_origin()
+@token_required
 def create_order():
-    """Create a new order - for testing without auth first."""
-    print("🛒 === CREATE ORDER ENDPOINT CALLED ===")
+    """Create an order for the caller."""
+    logger.debug("🛒 === CREATE ORDER ENDPOINT CALLED ===")
     
     try:
-        print("📥 Processing order creation...")
+        logger.debug("📥 Processing order creation...")
         data = request.get_json()
-        print(f"📋 Received data: {data}")
         
         if not data:
-            print("❌ No data provided")
+            logger.warning("❌ No data provided")
             return jsonify({
                 'success': False,
                 'message': 'No data provided'
             }), 400
         
-        supabase = supabase_service.get_client()
-        
-        # For testing, we'll require user_id to be provided
-        required_fields = ['user_id', 'total_amount', 'delivery_address']
+        # Orders always belong to the caller; a user_id in the body is ignored
+        has_items = 'items' in data or 'reservation_id' in data
+        required_fields = ['delivery_address'] if has_items else ['total_amount', 'delivery_address']
         for field in required_fields:
             if not data.get(field):
-                print(f"❌ Missing required field: {field}")
+                logger.warning(f"❌ Missing required field: {field}")
                 return jsonify({
                     'success': False,
                     'message': f'Missing required field: {field}'
                 }), 400
         
+        if has_items:
+            return create_order_with_items(data)
+        
+        client = data_backend.get_client()
+        
         order_data = {
-            'user_id': data.get('user_id'),  # This should be a UUID string
+            'user_id': request.current_user['sub'],
             'total_amount': data.get('total_amount'),
             'delivery_address': data.get('delivery_address'),
             'phone': data.get('phone'),
@@ -74,42 +195,164 @@ def create_order():
             'notes': data.get('notes', '')
         }
         
-        print(f"📦 Creating order with data: {order_data}")
-        order_response = supabase.table('orders').insert(order_data).execute()
+        logger.debug(f"📦 Creating order with data: {order_data}")
+        order_response = client.table('orders').insert(order_data).execute()
         
         if order_response.data:
             order = order_response.data[0]
-            print(f"✅ Order created successfully: {order['id']}")
+            logger.debug(f"✅ Order created successfully: {order['id']}")
             return jsonify({
                 'success': True,
                 'message': 'Order created successfully',
                 'data': order
             }), 201
         else:
-            print("❌ No data returned from database")
+            logger.warning("❌ No data returned from database")
             return jsonify({
                 'success': False,
                 'message': 'Failed to create order - no data returned'
             }), 500
-            
+    
     except Exception as e:
-        print(f"💥 CREATE ORDER ERROR: {str(e)}")
+        logger.error(f"💥 CREATE ORDER ERROR: {str(e)}")
         return jsonify({
             'success': False,
             'message': f'Failed to create order: {str(e)}'
         }), 500
 
+def create_order_with_items(data):
+    """Checkout path: line items priced server-side, stock decremented atomically."""
+    try:
+        order = Order.create_with_items(
+            user_id=request.current_user['sub'],
+            items=data.get('items'),
+            delivery_address=data.get('delivery_address'),
+            phone=data.get('phone'),
+            payment_method=data.get('payment_method', 'cash_on_delivery'),
+            payment_status=data.get('payment_status', 'pending'),
+            notes=data.get('notes', ''),
+            expected_total=data.get('total_amount'),
+            reservation_id=data.get('reservation_id')
+        )
+    except InvalidOrderError as e:
+        logger.warning(f"❌ Invalid order: {e}")
+        return jsonify({
+            'success': False,
+            'message': str(e),
+            'product_ids': e.product_ids
+        }), 400
+    except OrderConflictError as e:
+        logger.info(f"⚠️ Order refused ({e.reason}): {e.product_ids or e.current_total}")
+        messages = {
+            'insufficient_stock': 'Insufficient stock for some products',
+            'price_mismatch': 'Prices have changed, please review your order',
+            'reservation_expired': 'Reservation not found or expired'
+        }
+        return jsonify({
+            'success': False,
+            'message': messages.get(e.reason, e.reason),
+            'reason': e.reason,
+            'product_ids': e.product_ids,
+            'current_total': e.current_total
+        }), 409
+    
+    logger.debug(f"✅ Order created successfully: {order['id']}")
+    return jsonify({
+        'success': True,
+        'message': 'Order created successfully',
+        'data': order
+    }), 201
+
+@orders_bp.route('/reservations', methods=['POST', 'OPTIONS'])
+@cross_origin()
+@token_required
+def create_reservation():
+    """Hold stock for the caller's cart; pass reservation_id when creating the order."""
+    logger.debug("🔒 === CREATE RESERVATION ENDPOINT CALLED ===")
+    
+    if request.method == 'OPTIONS':
+        logger.debug("✅ OPTIONS request handled for reservations")
+        return '', 200
+    
+    if not stock_reservations.enabled:
+        return jsonify({
+            'success': False,
+            'message': 'Stock reservations are disabled'
+        }), 404
+    
+    try:
+        data = request.get_json(silent=True) or {}
+        reservation = Order.reserve(request.current_user['sub'], data.get('items'))
+        
+        logger.debug(f"✅ Reservation created: {reservation['reservation_id']}")
+        return jsonify({
+            'success': True,
+            'data': reservation
+        }), 201
+    
+    except InvalidOrderError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e),
+            'product_ids': e.product_ids
+        }), 400
+    except OrderConflictError as e:
+        return jsonify({
+            'success': False,
+            'message': 'Insufficient stock for some products',
+            'reason': e.reason,
+            'product_ids': e.product_ids
+        }), 409
+    except Exception as e:
+        logger.error(f"💥 ERROR creating reservation: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'Failed to create reservation: {str(e)}'
+        }), 500
+
+@orders_bp.route('/reservations/<reservation_id>', methods=['DELETE', 'OPTIONS'])
+@cross_origin()
+@token_required
+def release_reservation(reservation_id):
+    """Give a held cart's stock back."""
+    logger.debug(f"🔓 === RELEASE RESERVATION {reservation_id} ===")
+    
+    if request.method == 'OPTIONS':
+        return '', 200
+    
+    try:
+        stock_reservations.release(reservation_id, request.current_user['sub'])
+        return jsonify({
+            'success': True,
+            'message': 'Reservation released'
+        }), 200
+    
+    except ReservationNotFoundError:
+        return jsonify({
+            'success': False,
+            'message': 'Reservation not found or expired'
+        }), 404
+    except Exception as e:
+        logger.error(f"💥 ERROR releasing reservation: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'Failed to release reservation: {str(e)}'
+        }), 500
+
 @orders_bp.route('/test', methods=['GET'])
 @cross_origin()
 def test_orders_endpoint():
     """Test endpoint to verify orders route is working."""
-    print("🧪 === ORDERS TEST ENDPOINT CALLED ===")
+    logger.debug("🧪 === ORDERS TEST ENDPOINT CALLED ===")
     return jsonify({
         'success': True,
         'message': 'Orders endpoint is working!',
         'routes': [
-            'GET /api/orders/ - Get all orders',
-            'POST /api/orders/ - Create new order',
+            'GET /api/orders/ - Get your orders (status, from, to, limit/cursor)',
+            'GET /api/orders/summary - Order counts and totals per status',
+            'POST /api/orders/ - Create new order (items: [{product_id, quantity}])',
+            'POST /api/orders/reservations - Hold stock for a cart',
+            'DELETE /api/orders/reservations/<id> - Release held stock',
             'GET /api/orders/test - This test endpoint'
         ]
     }), 200
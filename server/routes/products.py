@@ -1,99 +1,261 @@
 from flask import Blueprint, request, jsonify
 from flask_cors import cross_origin
-from models.product import Product
-from models.supabase_client import supabase_service
-import sys
+from models.product import Product, resolve_fields
+from models.category_index import category_index
+from models.stock_reservation import stock_reservations
+from middleware.auth_middleware import token_required, admin_required
+from utils.pagination import PaginationError, decode_cursor, encode_cursor, parse_limit
+from utils.http_cache import conditional_get
+from typing import Dict, List
+import logging
+
+logger = logging.getLogger(__name__)
 
 products_bp = Blueprint('products', __name__, url_prefix='/api/products')
 
+MAX_BATCH_IDS = 1000
+
+def parse_product_ids(values) -> List[int]:
+    """Validate a list of product IDs from a query string or JSON body."""
+    try:
+        product_ids = [int(value) for value in values]
+    except (TypeError, ValueError):
+        raise ValueError('ids must be integers')
+    if not product_ids:
+        raise ValueError('ids must not be empty')
+    if len(product_ids) > MAX_BATCH_IDS:
+        raise ValueError(f'At most {MAX_BATCH_IDS} ids per request')
+    return product_ids
+
 @products_bp.route('/', methods=['GET', 'OPTIONS'])
 @cross_origin(origins=['http://localhost:8080', 'http://127.0.0.1:8080'])
+@conditional_get(Product.get_catalog_version)
 def get_all_products():
-    """Get all products."""
-    print("📦 === GET ALL PRODUCTS ENDPOINT CALLED ===")
+    """Get products; ``fields`` selects the "list" (default) or "detail" projection or explicit columns."""
+    logger.debug("📦 === GET ALL PRODUCTS ENDPOINT CALLED ===")
     
     # Handle preflight
     if request.method == 'OPTIONS':
-        print("✅ OPTIONS preflight handled for products")
+        logger.debug("✅ OPTIONS preflight handled for products")
         return '', 200
     
     try:
         category = request.args.get('category')
         search = request.args.get('search')
+        ids = request.args.get('ids')
+        paginate = 'limit' in request.args or 'cursor' in request.args
+        next_cursor = None
+        missing = None
         
-        print(f"🔍 Query params - Category: {category}, Search: {search}")
+        try:
+            fields = resolve_fields(request.args.get('fields'))
+        except ValueError as e:
+            logger.warning(f"❌ Invalid fields parameter: {e}")
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
         
-        if search:
-            print(f"🔍 Searching for: {search}")
-            products = Product.search_products(search)
+        logger.debug(f"🔍 Query params - Category: {category}, Search: {search}, Fields: {fields}")
+        
+        if ids is not None:
+            try:
+                product_ids = parse_product_ids(ids.split(','))
+            except ValueError as e:
+                logger.warning(f"❌ Invalid ids parameter: {e}")
+                return jsonify({
+                    'success': False,
+                    'message': str(e)
+                }), 400
+            logger.debug(f"📦 Getting products by IDs: {product_ids}")
+            products, missing = Product.get_by_ids(product_ids)
+        elif search:
+            logger.debug(f"🔍 Searching for: {search}")
+            products = Product.search_products(search, fields)
+        elif paginate:
+            limit = parse_limit(request.args.get('limit'))
+            position = decode_cursor(request.args.get('cursor'))
+            after_id = position.get('id') if position else None
+            if after_id is not None and not isinstance(after_id, int):
+                raise PaginationError('Invalid cursor')
+            logger.debug(f"📄 Getting products page - Limit: {limit}, After ID: {after_id}")
+            products, next_id = Product.get_products_page(
+                limit,
+                after_id=after_id,
+                category=category if category and category != 'All' else None,
+                fields=fields
+            )
+            if next_id is not None:
+                next_cursor = encode_cursor({'id': next_id})
         elif category and category != 'All':
-            print(f"📂 Getting products by category: {category}")
-            products = Product.get_by_category(category)
+            logger.debug(f"📂 Getting products by category: {category}")
+            products = Product.get_by_category(category, fields)
         else:
-            print("📦 Getting all products")
-            products = Product.get_all_products()
+            logger.debug("📦 Getting all products")
+            products = Product.get_all_products(fields)
         
-        products_data = [product.to_dict() for product in products]
+        products_data = [product.to_dict(fields) for product in products]
         
-        print(f"✅ Found {len(products_data)} products")
+        logger.debug(f"✅ Found {len(products_data)} products")
         response_data = {
             'success': True,
             'data': products_data,
-            'count': len(products_data)
+            'count': len(products_data),
+            'next_cursor': next_cursor
         }
+        if missing is not None:
+            response_data['missing'] = missing
         
         return jsonify(response_data), 200
+    
+    except PaginationError as e:
+        logger.warning(f"❌ Invalid pagination parameters: {e}")
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        logger.exception(f"💥 ERROR getting products: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'Failed to get products: {str(e)}'
+        }), 500
+
+@products_bp.route('/batch', methods=['POST', 'OPTIONS'])
+@cross_origin(origins=['http://localhost:8080', 'http://127.0.0.1:8080'])
+def get_products_batch():
+    """Resolve a long list of product IDs in one request (POST variant of ?ids=)."""
+    logger.debug("📦 === BATCH PRODUCTS ENDPOINT CALLED ===")
+    
+    # Handle preflight
+    if request.method == 'OPTIONS':
+        logger.debug("✅ OPTIONS preflight handled for batch products")
+        return '', 200
+    
+    try:
+        data = request.get_json(silent=True)
+        
+        if not isinstance(data, dict) or 'ids' not in data:
+            logger.warning("❌ No ids provided")
+            return jsonify({
+                'success': False,
+                'message': 'ids is required'
+            }), 400
         
+        try:
+            product_ids = parse_product_ids(data['ids'])
+            fields = resolve_fields(data.get('fields'))
+        except ValueError as e:
+            logger.warning(f"❌ Invalid batch request: {e}")
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        
+        products, missing = Product.get_by_ids(product_ids)
+        products_data = [product.to_dict(fields) for product in products]
+        
+        logger.debug(f"✅ Resolved {len(products_data)} products, {len(missing)} missing")
+        return jsonify({
+            'success': True,
+            'data': products_data,
+            'count': len(products_data),
+            'missing': missing
+        }), 200
+    
     except Exception as e:
-        print(f"💥 ERROR getting products: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"💥 ERROR getting products batch: {e}")
         return jsonify({
             'success': False,
             'message': f'Failed to get products: {str(e)}'
         }), 500
 
+@products_bp.route('/stock/bulk', methods=['POST', 'OPTIONS'])
+@cross_origin()
+@token_required
+@admin_required
+def bulk_update_stock():
+    """Apply absolute (``stock``) or relative (``delta``) stock changes for many products.
+    
+    Body: ``{"updates": [{"product_id": 1, "stock": 40}, {"product_id": 2, "delta": -3}]}``.
+    Answers 200 with one result per update, in request order. Preflight
+    OPTIONS requests are answered by ``cross_origin`` before the auth
+    decorators run.
+    """
+    logger.debug("📦 === BULK STOCK UPDATE ENDPOINT CALLED ===")
+    
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            logger.warning("❌ Bulk stock request body is not a JSON object")
+            return jsonify({
+                'success': False,
+                'message': 'Request body must be a JSON object'
+            }), 400
+        
+        try:
+            results, changed_rows = Product.apply_stock_updates(data.get('updates'))
+        except ValueError as e:
+            logger.warning(f"❌ Invalid bulk stock request: {e}")
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        
+        # Reservations must see the new on-hand values
+        stock_reservations.sync(changed_rows)
+        
+        summary: Dict[str, int] = {}
+        for result in results:
+            summary[result['status']] = summary.get(result['status'], 0) + 1
+        logger.info(f"📦 Bulk stock update by {request.current_user.get('email')}: {summary}")
+        return jsonify({
+            'success': True,
+            'data': results,
+            'summary': summary
+        }), 200
+    
+    except Exception as e:
+        logger.exception(f"💥 ERROR in bulk stock update: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'Failed to update stock: {str(e)}'
+        }), 500
+
 @products_bp.route('/categories', methods=['GET', 'OPTIONS'])
 @cross_origin(origins=['http://localhost:8080', 'http://127.0.0.1:8080'])
+@conditional_get(Product.get_catalog_version)
 def get_categories():
-    """Get all product categories."""
-    print("📂 === GET CATEGORIES ENDPOINT CALLED ===")
+    """Get all product categories with product and in-stock counts."""
+    logger.debug("📂 === GET CATEGORIES ENDPOINT CALLED ===")
     
     # Handle preflight
     if request.method == 'OPTIONS':
-        print("✅ OPTIONS preflight handled for categories")
+        logger.debug("✅ OPTIONS preflight handled for categories")
         return '', 200
     
     try:
-        print("🔗 Getting Supabase client...")
-        supabase = supabase_service.get_client()
-        print("✅ Supabase client obtained")
-        
-        print("🔍 Querying categories...")
-        response = supabase.table('products').select('category').execute()
-        print(f"📡 Database response: {len(response.data)} rows")
+        counts = category_index.get_counts()
         
-        if response.data:
-            categories = list(set([product['category'] for product in response.data]))
-            categories.sort()
+        if counts:
+            categories = [entry['category'] for entry in counts]
             
-            print(f"✅ Found categories: {categories}")
+            logger.debug(f"✅ Found categories: {categories}")
             return jsonify({
                 'success': True,
-                'data': categories
+                'data': categories,
+                'counts': counts
             }), 200
         else:
-            print("⚠️ No products found, returning default categories")
+            logger.warning("⚠️ No products found, returning default categories")
             default_categories = ['Dairy', 'Bakery', 'Grains', 'Fruits', 'Vegetables']
             return jsonify({
                 'success': True,
                 'data': default_categories
             }), 200
-        
+    
     except Exception as e:
-        print(f"💥 ERROR getting categories: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"💥 ERROR getting categories: {e}")
         # Return fallback categories if database fails
         default_categories = ['Dairy', 'Bakery', 'Grains', 'Fruits', 'Vegetables']
         return jsonify({
@@ -101,51 +263,75 @@ def get_categories():
             'data': default_categories
         }), 200
 
+@products_bp.route('/suggest', methods=['GET', 'OPTIONS'])
+@cross_origin(origins=['http://localhost:8080', 'http://127.0.0.1:8080'])
+def suggest_products():
+    """Autocomplete product names for a partial query."""
+    logger.debug("💡 === SUGGEST PRODUCTS ENDPOINT CALLED ===")
+    
+    # Handle preflight
+    if request.method == 'OPTIONS':
+        logger.debug("✅ OPTIONS preflight handled for suggest")
+        return '', 200
+    
+    try:
+        query = request.args.get('q', '').strip()
+        limit = min(request.args.get('limit', 10, type=int) or 10, 50)
+        
+        suggestions = Product.suggest(query, limit) if query else []
+        
+        logger.debug(f"✅ {len(suggestions)} suggestions for: {query}")
+        return jsonify({
+            'success': True,
+            'data': suggestions
+        }), 200
+    
+    except Exception as e:
+        logger.exception(f"💥 ERROR getting suggestions: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'Failed to get suggestions: {str(e)}'
+        }), 500
+
 @products_bp.route('/<int:product_id>', methods=['GET', 'OPTIONS'])
 @cross_origin(origins=['http://localhost:8080', 'http://127.0.0.1:8080'])
+@conditional_get(Product.get_catalog_version)
 def get_product_by_id(product_id):
     """Get product by ID."""
-    print(f"🔍 === GET PRODUCT BY ID: {product_id} ===")
+    logger.debug(f"🔍 === GET PRODUCT BY ID: {product_id} ===")
     
     # Handle preflight
     if request.method == 'OPTIONS':
-        print("✅ OPTIONS preflight handled for product by ID")
+        logger.debug("✅ OPTIONS preflight handled for product by ID")
         return '', 200
     
     try:
-        supabase = supabase_service.get_client()
-        response = supabase.table('products').select('*').eq('id', product_id).execute()
-        
-        if response.data:
-            product_data = response.data[0]
-            product = Product(
-                id=product_data['id'],
-                name=product_data['name'],
-                category=product_data['category'],
-                price=product_data['price'],
-                description=product_data['description'],
-                image=product_data['image'],
-                stock=product_data['stock'],
-                rating=product_data.get('rating', 4.5),
-                reviews=product_data.get('reviews', 0)
-            )
-            
-            print(f"✅ Product found: {product.name}")
+        try:
+            fields = resolve_fields(request.args.get('fields'), default='detail')
+        except ValueError as e:
+            logger.warning(f"❌ Invalid fields parameter: {e}")
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        
+        product = Product.get_by_id(product_id)
+        
+        if product:
+            logger.debug(f"✅ Product found: {product.name}")
             return jsonify({
                 'success': True,
-                'data': product.to_dict()
+                'data': product.to_dict(fields)
             }), 200
         else:
-            print(f"❌ Product not found: {product_id}")
+            logger.warning(f"❌ Product not found: {product_id}")
             return jsonify({
                 'success': False,
                 'message': 'Product not found'
             }), 404
-            
+    
     except Exception as e:
-        print(f"💥 ERROR getting product: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"💥 ERROR getting product: {e}")
         return jsonify({
             'success': False,
             'message': f'Failed to get product: {str(e)}'
@@ -1,8 +1,11 @@
 from app import create_app
-from models.user import db, User
+from models.user import User, UserAlreadyExistsError
 
 def seed_database():
-    """Seed database with initial data."""
+    """Seed database with initial data.
+    
+    Products are loaded separately: python catalog_cli.py import <file>
+    """
     app = create_app()
     
     with app.app_context():
@@ -10,32 +13,30 @@ def seed_database():
             # Create admin user if doesn't exist
             admin_email = 'admin@example.com'
             if not User.find_by_email(admin_email):
-                admin_user = User(
+                admin_user = User.create_user(
                     email=admin_email,
                     password='password',
                     name='Admin User',
                     role='admin'
                 )
-                db.session.add(admin_user)
-                print("✅ Admin user created")
+                print("✅ Admin user created" if admin_user else "❌ Admin user could not be created")
             
             # Create customer user if doesn't exist
             customer_email = 'customer@example.com'
             if not User.find_by_email(customer_email):
-                customer_user = User(
+                customer_user = User.create_user(
                     email=customer_email,
                     password='password',
                     name='Customer User',
                     role='customer'
                 )
-                db.session.add(customer_user)
-                print("✅ Customer user created")
+                print("✅ Customer user created" if customer_user else "❌ Customer user could not be created")
             
-            db.session.commit()
             print("✅ Database seeded successfully!")
-            
+        
+        except UserAlreadyExistsError as e:
+            print(f"ℹ️ Already seeded: {e}")
         except Exception as e:
-            db.session.rollback()
             print(f"❌ Error seeding database: {e}")
 
 if __name__ == '__main__':
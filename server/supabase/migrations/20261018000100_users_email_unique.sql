@@ -0,0 +1,3 @@
+-- Signup inserts directly and relies on this index to reject duplicate
+-- emails (SQLSTATE 23505), which the API maps to 409 Conflict.
+create unique index if not exists users_email_key on public.users (email);
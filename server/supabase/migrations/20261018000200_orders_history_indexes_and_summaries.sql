@@ -0,0 +1,53 @@
+-- Per-user order history: GET /api/orders/ filters by user_id (and
+-- optionally status) and pages on (created_at, id) descending.
+create index if not exists orders_user_created_idx
+    on public.orders (user_id, created_at desc, id desc);
+create index if not exists orders_user_status_created_idx
+    on public.orders (user_id, status, created_at desc, id desc);
+
+-- Maintained aggregates for GET /api/orders/summary: one row per
+-- (user, status), kept current by the trigger below.
+create table if not exists public.order_summaries (
+    user_id uuid not null,
+    status text not null,
+    order_count integer not null default 0,
+    total_amount numeric(12, 2) not null default 0,
+    primary key (user_id, status)
+);
+
+create or replace function public.apply_order_summary_delta(
+    p_user_id uuid, p_status text, p_count integer, p_amount numeric
+) returns void language sql as $$
+    insert into public.order_summaries as s (user_id, status, order_count, total_amount)
+    values (p_user_id, coalesce(p_status, 'pending'), p_count, coalesce(p_amount, 0))
+    on conflict (user_id, status) do update
+        set order_count = s.order_count + excluded.order_count,
+            total_amount = s.total_amount + excluded.total_amount;
+$$;
+
+create or replace function public.maintain_order_summaries() returns trigger
+language plpgsql as $$
+begin
+    if tg_op in ('UPDATE', 'DELETE') then
+        perform public.apply_order_summary_delta(old.user_id, old.status, -1, -old.total_amount);
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') then
+        perform public.apply_order_summary_delta(new.user_id, new.status, 1, new.total_amount);
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists orders_maintain_summaries on public.orders;
+create trigger orders_maintain_summaries
+    after insert or update of user_id, status, total_amount or delete on public.orders
+    for each row execute function public.maintain_order_summaries();
+
+-- Backfill from existing orders
+insert into public.order_summaries (user_id, status, order_count, total_amount)
+select user_id, coalesce(status, 'pending'), count(*), coalesce(sum(total_amount), 0)
+from public.orders
+group by user_id, coalesce(status, 'pending')
+on conflict (user_id, status) do update
+    set order_count = excluded.order_count,
+        total_amount = excluded.total_amount;
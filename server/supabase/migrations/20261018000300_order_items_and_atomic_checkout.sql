@@ -0,0 +1,101 @@
+-- Order line items. Prices are copied from products at checkout time.
+create table if not exists public.order_items (
+    id bigint generated by default as identity primary key,
+    order_id uuid not null references public.orders (id) on delete cascade,
+    product_id bigint not null references public.products (id),
+    quantity integer not null check (quantity > 0),
+    unit_price numeric(10, 2) not null,
+    line_total numeric(12, 2) not null
+);
+create index if not exists order_items_order_idx on public.order_items (order_id);
+
+-- Creates an order with its items and decrements stock for every product
+-- in one transaction. Either all stock updates succeed and the order is
+-- written, or nothing changes:
+--   insufficient_stock  some product lacks stock (detail: JSON array of ids)
+--   unknown_product     some product id does not exist (detail: JSON array)
+--   price_mismatch      p_expected_total differs from the computed total
+-- p_items is a JSON array of {"product_id": int, "quantity": int}.
+create or replace function public.create_order_with_items(
+    p_user_id uuid,
+    p_items jsonb,
+    p_delivery_address text,
+    p_phone text default null,
+    p_payment_method text default 'cash_on_delivery',
+    p_payment_status text default 'pending',
+    p_notes text default '',
+    p_expected_total numeric default null
+) returns jsonb
+language plpgsql as $$
+declare
+    v_missing jsonb;
+    v_short jsonb;
+    v_total numeric(12, 2);
+    v_order public.orders;
+    v_items jsonb;
+begin
+    create temporary table _checkout_items on commit drop as
+    select (item->>'product_id')::bigint as product_id,
+           sum((item->>'quantity')::integer) as quantity
+    from jsonb_array_elements(p_items) as item
+    group by 1;
+
+    -- Lock rows in id order so concurrent checkouts cannot deadlock
+    perform 1 from public.products p
+    where p.id in (select product_id from _checkout_items)
+    order by p.id
+    for update;
+
+    select jsonb_agg(c.product_id) into v_missing
+    from _checkout_items c
+    where not exists (select 1 from public.products p where p.id = c.product_id);
+    if v_missing is not null then
+        raise exception 'unknown_product' using detail = v_missing::text;
+    end if;
+
+    select jsonb_agg(c.product_id) into v_short
+    from _checkout_items c
+    join public.products p on p.id = c.product_id
+    where p.stock < c.quantity;
+    if v_short is not null then
+        raise exception 'insufficient_stock' using detail = v_short::text;
+    end if;
+
+    select sum(p.price * c.quantity) into v_total
+    from _checkout_items c
+    join public.products p on p.id = c.product_id;
+    if p_expected_total is not null and abs(p_expected_total - v_total) >= 0.01 then
+        raise exception 'price_mismatch' using detail = v_total::text;
+    end if;
+
+    -- One batched UPDATE for every product in the order
+    update public.products p
+    set stock = p.stock - c.quantity,
+        updated_at = now()
+    from _checkout_items c
+    where p.id = c.product_id;
+
+    insert into public.orders (user_id, total_amount, delivery_address, phone,
+                               payment_method, payment_status, notes)
+    values (p_user_id, v_total, p_delivery_address, p_phone,
+            p_payment_method, p_payment_status, p_notes)
+    returning * into v_order;
+
+    insert into public.order_items (order_id, product_id, quantity, unit_price, line_total)
+    select v_order.id, c.product_id, c.quantity, p.price, p.price * c.quantity
+    from _checkout_items c
+    join public.products p on p.id = c.product_id;
+
+    select jsonb_agg(jsonb_build_object(
+               'product_id', c.product_id,
+               'quantity', c.quantity,
+               'unit_price', p.price,
+               'line_total', p.price * c.quantity,
+               'stock_after', p.stock))
+    into v_items
+    from _checkout_items c
+    join public.products p on p.id = c.product_id;
+
+    return to_jsonb(v_order) || jsonb_build_object('items', v_items);
+end;
+$$;
@@ -0,0 +1,125 @@
+-- Checkout without touching stock: when the application's reservation
+-- engine has already claimed the quantities, it passes
+-- p_decrement_stock = false and writes stock back later in batches through
+-- apply_stock_deltas. The signature changes, so drop the old overload first.
+drop function if exists public.create_order_with_items(uuid, jsonb, text, text, text, text, text, numeric);
+
+create or replace function public.create_order_with_items(
+    p_user_id uuid,
+    p_items jsonb,
+    p_delivery_address text,
+    p_phone text default null,
+    p_payment_method text default 'cash_on_delivery',
+    p_payment_status text default 'pending',
+    p_notes text default '',
+    p_expected_total numeric default null,
+    p_decrement_stock boolean default true
+) returns jsonb
+language plpgsql as $$
+declare
+    v_missing jsonb;
+    v_short jsonb;
+    v_total numeric(12, 2);
+    v_order public.orders;
+    v_items jsonb;
+begin
+    create temporary table _checkout_items on commit drop as
+    select (item->>'product_id')::bigint as product_id,
+           sum((item->>'quantity')::integer) as quantity
+    from jsonb_array_elements(p_items) as item
+    group by 1;
+
+    -- Lock rows in id order so concurrent checkouts cannot deadlock
+    perform 1 from public.products p
+    where p.id in (select product_id from _checkout_items)
+    order by p.id
+    for update;
+
+    select jsonb_agg(c.product_id) into v_missing
+    from _checkout_items c
+    where not exists (select 1 from public.products p where p.id = c.product_id);
+    if v_missing is not null then
+        raise exception 'unknown_product' using detail = v_missing::text;
+    end if;
+
+    if p_decrement_stock then
+        select jsonb_agg(c.product_id) into v_short
+        from _checkout_items c
+        join public.products p on p.id = c.product_id
+        where p.stock < c.quantity;
+        if v_short is not null then
+            raise exception 'insufficient_stock' using detail = v_short::text;
+        end if;
+    end if;
+
+    select sum(p.price * c.quantity) into v_total
+    from _checkout_items c
+    join public.products p on p.id = c.product_id;
+    if p_expected_total is not null and abs(p_expected_total - v_total) >= 0.01 then
+        raise exception 'price_mismatch' using detail = v_total::text;
+    end if;
+
+    -- One batched UPDATE for every product in the order
+    if p_decrement_stock then
+        update public.products p
+        set stock = p.stock - c.quantity,
+            updated_at = now()
+        from _checkout_items c
+        where p.id = c.product_id;
+    end if;
+
+    insert into public.orders (user_id, total_amount, delivery_address, phone,
+                               payment_method, payment_status, notes)
+    values (p_user_id, v_total, p_delivery_address, p_phone,
+            p_payment_method, p_payment_status, p_notes)
+    returning * into v_order;
+
+    insert into public.order_items (order_id, product_id, quantity, unit_price, line_total)
+    select v_order.id, c.product_id, c.quantity, p.price, p.price * c.quantity
+    from _checkout_items c
+    join public.products p on p.id = c.product_id;
+
+    select jsonb_agg(jsonb_build_object(
+               'product_id', c.product_id,
+               'quantity', c.quantity,
+               'unit_price', p.price,
+               'line_total', p.price * c.quantity,
+               'stock_after', p.stock))
+    into v_items
+    from _checkout_items c
+    join public.products p on p.id = c.product_id;
+
+    return to_jsonb(v_order) || jsonb_build_object('items', v_items);
+end;
+$$;
+
+-- Applies signed stock deltas to many products in one UPDATE and returns
+-- the resulting rows. p_deltas is a JSON array of {"product_id": int, "delta": int}.
+-- Stock never goes below zero: when a decrement races an edit that lowered
+-- stock, the row is clamped to 0 and shortfall reports the units that could
+-- not be deducted.
+drop function if exists public.apply_stock_deltas(jsonb);
+
+create or replace function public.apply_stock_deltas(p_deltas jsonb)
+returns table (id bigint, category text, stock integer, shortfall integer)
+language sql as $$
+    with d as (
+        select (item->>'product_id')::bigint as product_id,
+               sum((item->>'delta')::integer)::integer as delta
+        from jsonb_array_elements(p_deltas) as item
+        group by 1
+    ), current_stock as (
+        -- Lock rows in id order so concurrent writers cannot deadlock
+        select p.id, p.stock + d.delta as target
+        from public.products p
+        join d on d.product_id = p.id
+        order by p.id
+        for update of p
+    )
+    update public.products p
+    set stock = greatest(c.target, 0),
+        updated_at = now()
+    from current_stock c
+    where p.id = c.id
+    returning p.id, p.category, p.stock, greatest(-c.target, 0);
+$$;
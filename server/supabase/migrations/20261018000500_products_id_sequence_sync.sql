@@ -0,0 +1,23 @@
+-- Bulk imports upsert products with explicit ids, which does not advance
+-- the id sequence; afterwards a plain insert would collide with an
+-- imported row. catalog_cli.py calls this once an import finishes.
+create or replace function public.sync_products_id_sequence()
+returns bigint
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_sequence text := pg_get_serial_sequence('public.products', 'id');
+    v_max_id bigint;
+begin
+    if v_sequence is null then
+        return null;
+    end if;
+    select max(id) into v_max_id from public.products;
+    if v_max_id is null then
+        return null;
+    end if;
+    return setval(v_sequence, v_max_id);
+end;
+$$;
@@ -0,0 +1,46 @@
+-- Bulk stock adjustment for warehouse syncs. p_updates is a JSON array of
+-- {"product_id": int, "stock": int} (absolute) or {"product_id": int,
+-- "delta": int} items, at most one per product. Rows are locked in id
+-- order, updates that would leave stock negative are skipped, and every
+-- requested product comes back with a status:
+-- 'updated', 'not_found' or 'negative_stock'.
+create or replace function public.apply_stock_updates(p_updates jsonb)
+returns table (product_id bigint, category text, previous_stock integer, stock integer, status text)
+language sql as $$
+    with requested as (
+        select (item->>'product_id')::bigint as product_id,
+               (item->>'stock')::integer as absolute,
+               coalesce((item->>'delta')::integer, 0) as delta
+        from jsonb_array_elements(p_updates) as item
+    ),
+    locked as (
+        select p.id, p.category, p.stock
+        from public.products p
+        where p.id in (select r.product_id from requested r)
+        order by p.id
+        for update
+    ),
+    planned as (
+        select r.product_id, l.category, l.stock as previous_stock,
+               coalesce(r.absolute, l.stock + r.delta) as new_stock
+        from requested r
+        join locked l on l.id = r.product_id
+    ),
+    updated as (
+        update public.products p
+        set stock = c.new_stock,
+            updated_at = now()
+        from planned c
+        where p.id = c.product_id and c.new_stock >= 0
+        returning p.id
+    )
+    select r.product_id,
+           c.category,
+           c.previous_stock,
+           case when c.new_stock >= 0 then c.new_stock else c.previous_stock end,
+           case when c.product_id is null then 'not_found'
+                when c.new_stock < 0 then 'negative_stock'
+                else 'updated' end
+    from requested r
+    left join planned c on c.product_id = r.product_id;
+$$;
@@ -0,0 +1,76 @@
+import pytest
+from app import app
+from models.data_backend import data_backend
+from models.sqlite_client import SQLiteClient
+from utils.jwt_helper import JWTHelper
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_backend, 'backend', 'sqlite')
+    monkeypatch.setattr(data_backend, 'read_mirror', False)
+    monkeypatch.setattr(data_backend, '_sqlite', SQLiteClient(str(tmp_path / 'store.sqlite3')))
+    data_backend.get_client().table('products').insert([
+        {'name': f'Product {number}', 'category': 'Snacks', 'price': 10.0, 'stock': 5}
+        for number in range(1, 4)
+    ]).execute()
+    return app.test_client()
+
+def auth(role):
+    with app.app_context():
+        return {'Authorization': 'Bearer ' + JWTHelper.encode_token(f'{role}-id', f'{role}@example.com', role)}
+
+def post_bulk(client, body, headers=None):
+    return client.post('/api/products/stock/bulk', json=body, headers=headers or auth('admin'))
+
+def db_stock(product_id):
+    rows = data_backend.get_client().table('products').select('stock').eq('id', product_id).execute().data
+    return rows[0]['stock']
+
+def test_requires_admin(client):
+    body = {'updates': [{'product_id': 1, 'stock': 0}]}
+    assert client.post('/api/products/stock/bulk', json=body).status_code == 401
+    assert post_bulk(client, body, auth('customer')).status_code == 403
+    assert db_stock(1) == 5
+
+def test_preflight_needs_no_token(client):
+    response = client.options('/api/products/stock/bulk', headers={
+        'Origin': 'http://localhost:8080', 'Access-Control-Request-Method': 'POST'})
+    assert response.status_code == 200
+
+@pytest.mark.parametrize('body', [[1], 'updates', 3, None])
+def test_rejects_non_object_body(client, body):
+    response = post_bulk(client, body)
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'Request body must be a JSON object'
+
+@pytest.mark.parametrize('update', [
+    {'product_id': 1.9, 'stock': 1},
+    {'product_id': True, 'stock': 1},
+    {'product_id': '1', 'stock': 1},
+    {'product_id': 1, 'stock': '4'},
+    {'product_id': 1, 'stock': 2.5},
+    {'product_id': 1, 'delta': False},
+    {'product_id': 1, 'stock': -1},
+    {'product_id': 1, 'stock': 1, 'delta': 1},
+    {'stock': 1}
+])
+def test_rejects_malformed_update_without_writing(client, update):
+    response = post_bulk(client, {'updates': [{'product_id': 2, 'stock': 0}, update]})
+    assert response.status_code == 400
+    assert response.get_json()['message'].startswith('updates[1]:')
+    assert db_stock(2) == 5
+
+def test_applies_updates_with_per_item_status(client):
+    response = post_bulk(client, {'updates': [
+        {'product_id': 1, 'stock': 40},
+        {'product_id': 2, 'delta': -6},
+        {'product_id': 3, 'delta': -2},
+        {'product_id': 3, 'stock': 9},
+        {'product_id': 999, 'stock': 1}
+    ]})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [result['status'] for result in body['data']] == [
+        'updated', 'negative_stock', 'updated', 'duplicate', 'not_found']
+    assert body['summary'] == {'updated': 2, 'negative_stock': 1, 'duplicate': 1, 'not_found': 1}
+    assert (db_stock(1), db_stock(2), db_stock(3)) == (40, 5, 3)
@@ -0,0 +1,47 @@
+from flask import Flask
+from utils.metrics import MetricsRegistry, init_metrics
+import utils.metrics
+
+def histogram_lines(registry: MetricsRegistry, name: str) -> dict:
+    lines = {}
+    for line in registry.render().splitlines():
+        if line.startswith(name):
+            series, _, value = line.rpartition(' ')
+            lines[series] = float(value)
+    return lines
+
+def test_observe_above_last_bucket_counts_only_in_inf():
+    registry = MetricsRegistry(enabled=True, buckets=(0.1, 1.0, 10.0))
+    registry.observe('latency', (), 11.0)
+    registry.observe('latency', (), 0.5)
+    
+    lines = histogram_lines(registry, 'latency')
+    assert lines['latency_sum'] == 11.5
+    assert lines['latency_count'] == 2
+    assert lines['latency_bucket{le="0.1"}'] == 0
+    assert lines['latency_bucket{le="1"}'] == 1
+    assert lines['latency_bucket{le="10"}'] == 1
+    assert lines['latency_bucket{le="+Inf"}'] == 2
+
+def test_observe_on_bucket_boundary_is_inclusive():
+    registry = MetricsRegistry(enabled=True, buckets=(0.1, 1.0))
+    registry.observe('latency', (), 1.0)
+    
+    lines = histogram_lines(registry, 'latency')
+    assert lines['latency_bucket{le="0.1"}'] == 0
+    assert lines['latency_bucket{le="1"}'] == 1
+    assert lines['latency_sum'] == 1.0
+
+def test_metrics_endpoint_restricted_to_allowed_networks(monkeypatch):
+    monkeypatch.setattr(utils.metrics, 'METRICS_TOKEN', 'secret')
+    app = Flask(__name__)
+    init_metrics(app)
+    client = app.test_client()
+    
+    assert client.get('/api/metrics').status_code == 200
+    public = {'REMOTE_ADDR': '203.0.113.7'}
+    assert client.get('/api/metrics', environ_base=public).status_code == 404
+    assert client.get('/api/metrics', environ_base=public,
+                      headers={'Authorization': 'Bearer wrong'}).status_code == 404
+    assert client.get('/api/metrics', environ_base=public,
+                      headers={'Authorization': 'Bearer secret'}).status_code == 200
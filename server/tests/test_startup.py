@@ -0,0 +1,17 @@
+import os
+import statistics
+from benchmarks.startup_time import LAZY_MODULES, measure_once
+
+STARTUP_BUDGET_MS = float(os.environ.get('STARTUP_BUDGET_MS', 500))
+
+def test_create_app_is_fast_and_leaves_network_clients_unloaded(monkeypatch):
+    # The Supabase backend is the one whose client libraries must stay lazy
+    monkeypatch.setenv('DATA_BACKEND', 'supabase')
+    samples = [measure_once() for _ in range(3)]
+    
+    for sample in samples:
+        assert not set(sample['loaded']) & set(LAZY_MODULES), \
+            f"importing the app loaded {', '.join(sample['loaded'])}"
+    median_ms = statistics.median(sample['ms'] for sample in samples)
+    assert median_ms <= STARTUP_BUDGET_MS, \
+        f'create_app() took {median_ms:.0f} ms, over the {STARTUP_BUDGET_MS:g} ms budget'
@@ -0,0 +1,96 @@
+import time
+import pytest
+import models.stock_reservation
+from models.data_backend import DataBackend
+from models.sqlite_client import SQLiteClient
+from models.stock_reservation import (InsufficientStockError, ReservationNotFoundError,
+                                      StockReservationEngine)
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    backend = DataBackend(backend='sqlite')
+    backend._sqlite = SQLiteClient(str(tmp_path / 'store.sqlite3'))
+    backend.get_client().table('products').insert([
+        {'name': f'Product {number}', 'category': 'Snacks', 'price': 10.0, 'stock': 5}
+        for number in range(1, 4)
+    ]).execute()
+    monkeypatch.setattr(models.stock_reservation, 'data_backend', backend)
+    return backend
+
+@pytest.fixture
+def engine(backend):
+    # No background write-back: tests flush and expire explicitly
+    engine = StockReservationEngine(enabled=True, writeback_seconds=3600)
+    yield engine
+    engine._stop.set()
+
+def db_stock(backend, product_id):
+    return backend.get_client().table('products').select('stock').eq('id', product_id).execute().data[0]['stock']
+
+def test_reserve_is_all_or_nothing(engine):
+    engine.reserve({1: 3}, 'alice')
+    with pytest.raises(InsufficientStockError) as error:
+        engine.reserve({1: 3, 2: 1}, 'bob')
+    assert error.value.product_ids == [1]
+    assert engine._entries[1].available == 2
+    assert engine._entries[2].available == 5
+
+def test_commit_writes_back_on_flush(engine, backend):
+    reservation = engine.reserve({1: 2, 2: 1}, 'alice')
+    engine.commit(reservation['reservation_id'], 'alice')
+    assert db_stock(backend, 1) == 5
+    
+    assert engine.flush() == 2
+    assert db_stock(backend, 1) == 3
+    assert db_stock(backend, 2) == 4
+    assert engine.stats()['pending_units'] == 0
+
+def test_reservation_belongs_to_its_user(engine):
+    reservation = engine.reserve({1: 1}, 'alice')
+    with pytest.raises(ReservationNotFoundError):
+        engine.commit(reservation['reservation_id'], 'mallory')
+    with pytest.raises(ReservationNotFoundError):
+        engine.release(reservation['reservation_id'], 'mallory')
+    engine.commit(reservation['reservation_id'], 'alice')
+
+def test_release_returns_stock(engine):
+    reservation = engine.reserve({1: 4}, 'alice')
+    engine.release(reservation['reservation_id'], 'alice')
+    assert engine._entries[1].available == 5
+    with pytest.raises(ReservationNotFoundError):
+        engine.release(reservation['reservation_id'], 'alice')
+
+def test_expired_reservation_frees_stock(engine):
+    reservation = engine.reserve({1: 5}, 'alice', ttl=0.01)
+    time.sleep(0.02)
+    assert engine.expire() == 1
+    assert engine._entries[1].available == 5
+    with pytest.raises(ReservationNotFoundError):
+        engine.commit(reservation['reservation_id'], 'alice')
+
+def test_flush_after_product_deleted_releases_its_reservations(engine, backend):
+    sold = engine.reserve({1: 1, 2: 1}, 'alice')
+    engine.commit(sold['reservation_id'], 'alice')
+    held = engine.reserve({1: 1, 3: 1}, 'bob')
+    backend.get_client().table('products').delete().eq('id', 1).execute()
+    
+    assert engine.flush() == 1
+    assert 1 not in engine._entries
+    assert db_stock(backend, 2) == 4
+    # The reservation holding the deleted product is gone, and its other
+    # products are free again instead of raising KeyError later
+    with pytest.raises(ReservationNotFoundError):
+        engine.commit(held['reservation_id'], 'bob')
+    assert engine._entries[3].available == 5
+    assert engine.expire() == 0
+
+def test_flush_never_drives_stock_negative(engine, backend):
+    reservation = engine.reserve({1: 4}, 'alice')
+    engine.commit(reservation['reservation_id'], 'alice')
+    # An admin lowers stock before the write-back runs
+    backend.get_client().table('products').update({'stock': 1}).eq('id', 1).execute()
+    
+    engine.flush()
+    assert db_stock(backend, 1) == 0
+    assert engine._entries[1].on_hand == 0
+    assert engine._entries[1].pending == 0
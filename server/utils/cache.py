@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+# Marker stored for keys that are known not to exist (negative caching)
+_NEGATIVE = object()
+
+
+class TTLCache:
+    """Thread-safe, size-bounded LRU cache with a TTL per entry.
+    
+    Keys are usually tuples whose first element is a namespace
+    (e.g. ``('product', 42)``) so whole groups can be dropped at once.
+    """
+    
+    def __init__(self, max_size: int = 1024, default_ttl: float = 60.0,
+                 negative_ttl: float = 30.0, name: str = 'cache'):
+        self.name = name
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self.negative_ttl = negative_ttl
+        self._data: 'OrderedDict[Hashable, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        """Return ``(found, value)``; a negatively cached key yields ``(True, None)``."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+            self._data.move_to_end(key)
+            if value is _NEGATIVE:
+                self.negative_hits += 1
+                return True, None
+            self.hits += 1
+            return True, value
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        found, value = self.lookup(key)
+        return value if found and value is not None else default
+    
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+    
+    def set_missing(self, key: Hashable, ttl: Optional[float] = None) -> None:
+        """Remember that ``key`` does not exist in the backing store."""
+        self.set(key, _NEGATIVE, self.negative_ttl if ttl is None else ttl)
+    
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any],
+                    ttl: Optional[float] = None, cache_none: bool = False) -> Any:
+        """Read-through helper: return the cached value or call ``loader``.
+        
+        When ``cache_none`` is set a ``None`` result is negatively cached.
+        """
+        found, value = self.lookup(key)
+        if found:
+            return value
+        value = loader()
+        if value is None:
+            if cache_none:
+                self.set_missing(key)
+        else:
+            self.set(key, value, ttl)
+        return value
+    
+    def invalidate(self, key: Hashable) -> bool:
+        with self._lock:
+            return self._data.pop(key, None) is not None
+    
+    def invalidate_namespace(self, namespace: Hashable) -> int:
+        """Drop every tuple key whose first element equals ``namespace``."""
+        with self._lock:
+            doomed = [k for k in self._data
+                      if isinstance(k, tuple) and k and k[0] == namespace]
+            for k in doomed:
+                del self._data[k]
+            return len(doomed)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+    
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            'name': self.name,
+            'size': len(self._data),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'negative_hits': self.negative_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_ratio': round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0.0
+        }
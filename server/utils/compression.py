@@ -0,0 +1,71 @@
+import gzip
+import logging
+from typing import Optional
+from flask import Flask, request
+from utils.tracing import span
+
+try:
+    import brotli
+except ImportError:  # optional dependency, gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/html', 'text/plain', 'text/csv', 'text/css'}
+
+def available_encodings():
+    """Encodings this process can produce, in order of preference."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+def negotiate_encoding(accept_encoding) -> Optional[str]:
+    """Pick the preferred encoding the client accepts (q > 0), if any."""
+    best, best_quality = None, 0.0
+    for encoding in available_encodings():
+        quality = accept_encoding[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def compress(data: bytes, encoding: str, level: int) -> bytes:
+    if encoding == 'br':
+        # Brotli quality 0-11; map the shared gzip-style level onto it
+        return brotli.compress(data, quality=min(11, max(0, level)))
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+def init_compression(app: Flask) -> None:
+    """Compress large responses with brotli or gzip per ``Accept-Encoding``."""
+    min_size = app.config.get('COMPRESS_MIN_SIZE', 1024)
+    level = app.config.get('COMPRESS_LEVEL', 5)
+    if not app.config.get('COMPRESS_RESPONSES', True):
+        return
+    
+    @app.after_request
+    def compress_response(response):
+        if response.mimetype not in COMPRESSIBLE_MIMETYPES or response.direct_passthrough:
+            return response
+        response.vary.add('Accept-Encoding')
+        
+        encoding = negotiate_encoding(request.accept_encodings)
+        if encoding is None or 'Content-Encoding' in response.headers:
+            return response
+        
+        etag, weak = response.get_etag()
+        if response.status_code == 304:
+            # Keep the validator identical to the compressed 200 it refers to
+            if etag and not weak:
+                response.set_etag(f'{etag}-{encoding}')
+            return response
+        if response.status_code < 200 or response.status_code >= 300:
+            return response
+        
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+        
+        with span('compress'):
+            response.set_data(compress(data, encoding, level))
+        response.headers['Content-Encoding'] = encoding
+        # A strong ETag names exact bytes, so the encoded body needs its own
+        if etag and not weak:
+            response.set_etag(f'{etag}-{encoding}')
+        return response
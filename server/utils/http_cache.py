@@ -0,0 +1,59 @@
+import hashlib
+import logging
+from functools import wraps
+from typing import Callable
+from flask import current_app, make_response, request
+from utils.compression import available_encodings
+
+logger = logging.getLogger(__name__)
+
+def compute_etag(version: str) -> str:
+    """Strong ETag for the current request's view of a resource at ``version``.
+    
+    The endpoint, view arguments and query string are part of the tag so
+    e.g. two different pages of the same catalog never share one.
+    """
+    parts = [
+        version,
+        request.endpoint or '',
+        repr(sorted(request.view_args.items())) if request.view_args else '',
+        repr(sorted(request.args.items(multi=True)))
+    ]
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+
+def conditional_get(version_fn: Callable[[], str]):
+    """Decorator adding ETag/Cache-Control to GET responses and answering 304.
+    
+    ``version_fn`` returns a cheap version string for the underlying data.
+    When the client's ``If-None-Match`` matches, the view is never called,
+    so nothing is queried or serialized.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if request.method != 'GET':
+                return f(*args, **kwargs)
+            
+            try:
+                etag = compute_etag(version_fn())
+            except Exception as e:
+                logger.warning(f"⚠️ Could not compute ETag, serving uncached: {e}")
+                return f(*args, **kwargs)
+            
+            cache_control = current_app.config.get('CATALOG_CACHE_CONTROL', 'public, no-cache')
+            
+            # The compression layer suffixes ETags of encoded bodies ("<tag>-gzip")
+            candidates = [etag] + [f'{etag}-{encoding}' for encoding in available_encodings()]
+            if any(request.if_none_match.contains_weak(candidate) for candidate in candidates):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = cache_control
+            return response
+        
+        return decorated
+    return decorator
@@ -0,0 +1,68 @@
+import logging
+from typing import Any
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from utils.tracing import span
+
+try:
+    import orjson
+except ImportError:  # optional dependency, stdlib json is the fallback
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson.
+    
+    orjson serializes in C straight to bytes, which matters for the large
+    product and order lists. Types orjson does not know (Decimal, Product
+    leftovers, ...) go through Flask's ``default`` hook as before. Dates are
+    emitted as ISO 8601 rather than Flask's HTTP-date format.
+    """
+    
+    def _options(self, pretty: bool) -> int:
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if pretty:
+            options |= orjson.OPT_INDENT_2
+        return options
+    
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs.keys() - {'separators', 'indent'}:
+            # Unusual stdlib options (cls=, ensure_ascii=, ...) keep stdlib semantics
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default,
+                            option=self._options(bool(kwargs.get('indent')))).decode('utf-8')
+    
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+    
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = (self.compact is None and self._app.debug) or self.compact is False
+        with span('json'):
+            body = orjson.dumps(obj, default=self.default, option=self._options(pretty))
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
+class TracedJSONProvider(DefaultJSONProvider):
+    """Flask's stdlib JSON provider with serialization timed as the "json" span."""
+    
+    def response(self, *args: Any, **kwargs: Any):
+        with span('json'):
+            return super().response(*args, **kwargs)
+
+def init_json(app: Flask) -> None:
+    """Use the orjson provider when orjson is installed and JSON_PROVIDER allows it."""
+    choice = app.config.get('JSON_PROVIDER', 'auto')
+    if choice == 'stdlib' or orjson is None:
+        if choice == 'orjson':
+            logger.warning("⚠️ JSON_PROVIDER=orjson but orjson is not installed, using stdlib json")
+        app.json = TracedJSONProvider(app)
+        return
+    app.json = OrjsonProvider(app)
+    # Key order carries no meaning in our payloads and sorting costs time
+    app.json.sort_keys = False
+    logger.debug("✅ orjson JSON provider enabled")
@@ -1,9 +1,26 @@
 import jwt
+import hashlib
+import threading
+import time
 from datetime import datetime, timedelta
+from decouple import config
 from flask import current_app
 from functools import wraps
+from utils.cache import TTLCache
+from utils.tracing import span
+
+# Verified tokens -> decoded payloads, so repeat requests with the same token
+# skip signature verification. Entries never outlive the token's own exp.
+token_cache = TTLCache(
+    max_size=config('TOKEN_CACHE_MAX_SIZE', default=4096, cast=int),
+    default_ttl=config('TOKEN_CACHE_TTL', default=900, cast=float),
+    name='tokens'
+)
 
 class JWTHelper:
+    _cache_secret = None
+    _cache_lock = threading.Lock()
+    
     @staticmethod
     def encode_token(user_id, email, role):
         """Generate JWT token for user."""
@@ -16,11 +33,12 @@ class JWTHelper:
                 'role': role
             }
             
-            token = jwt.encode(
-                payload,
-                current_app.config['JWT_SECRET_KEY'],
-                algorithm='HS256'
-            )
+            with span('jwt'):
+                token = jwt.encode(
+                    payload,
+                    current_app.config['JWT_SECRET_KEY'],
+                    algorithm='HS256'
+                )
             return token
         except Exception as e:
             return str(e)
@@ -40,6 +58,44 @@ class JWTHelper:
         except jwt.InvalidTokenError:
             return {'error': 'Invalid token'}
     
+    @staticmethod
+    def decode_token_cached(token):
+        """Like decode_token, but serves repeat tokens from the verified-token cache."""
+        secret = current_app.config['JWT_SECRET_KEY']
+        if secret != JWTHelper._cache_secret:
+            # The secret changed underneath us: nothing cached is trustworthy
+            with JWTHelper._cache_lock:
+                if secret != JWTHelper._cache_secret:
+                    token_cache.clear()
+                    JWTHelper._cache_secret = secret
+        
+        key = hashlib.sha256(token.encode('utf-8')).digest()
+        payload = token_cache.get(key)
+        now = time.time()
+        if payload is not None and payload.get('exp', 0) > now:
+            return dict(payload)
+        
+        with span('jwt'):
+            payload = JWTHelper.decode_token(token)
+        if 'error' not in payload:
+            ttl = min(payload.get('exp', now) - now, token_cache.default_ttl)
+            token_cache.set(key, payload, ttl)
+            return dict(payload)
+        return payload
+    
+    @staticmethod
+    def flush_token_cache():
+        """Forget every cached token, e.g. after revoking sessions."""
+        token_cache.clear()
+    
+    @staticmethod
+    def rotate_secret(app, new_secret):
+        """Switch the JWT signing secret and flush tokens verified with the old one."""
+        with JWTHelper._cache_lock:
+            app.config['JWT_SECRET_KEY'] = new_secret
+            token_cache.clear()
+            JWTHelper._cache_secret = new_secret
+    
     @staticmethod
     def extract_token_from_header(auth_header):
         """Extract token from Authorization header."""
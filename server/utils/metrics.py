@@ -0,0 +1,317 @@
+import bisect
+import hmac
+import ipaddress
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from decouple import config
+from flask import Flask, Response, abort, g, request
+from utils.tracing import TRACE_ENABLED, record_db_call
+
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+# /api/metrics is not for the public internet. It answers callers from
+# these networks, or anyone sending "Authorization: Bearer <METRICS_TOKEN>".
+# Behind a reverse proxy every caller has the proxy's address, so block
+# the path at the proxy or set a token.
+METRICS_ALLOWED_NETWORKS = config('METRICS_ALLOWED_NETWORKS', default='127.0.0.0/8,::1/128')
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# Seconds; the same buckets serve HTTP requests and database calls
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Fold the shards of finished threads once this many are registered
+COMPACT_THRESHOLD = 64
+
+Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+class _Shard:
+    """Counters and histograms written by exactly one thread."""
+    
+    __slots__ = ('thread', 'counters', 'histograms')
+    
+    def __init__(self, thread: Optional[threading.Thread]):
+        self.thread = weakref.ref(thread) if thread is not None else None
+        self.counters: Dict[Key, float] = {}
+        # Bucket counts, then the count above the last bucket, then [sum, count]
+        self.histograms: Dict[Key, List[float]] = {}
+    
+    def alive(self) -> bool:
+        thread = self.thread() if self.thread is not None else None
+        return thread is not None and thread.is_alive()
+    
+    def merge(self, other: '_Shard') -> None:
+        for key, value in other.counters.items():
+            self.counters[key] = self.counters.get(key, 0) + value
+        for key, values in other.histograms.items():
+            mine = self.histograms.get(key)
+            if mine is None:
+                self.histograms[key] = list(values)
+            else:
+                for index, value in enumerate(values):
+                    mine[index] += value
+
+class MetricsRegistry:
+    """Prometheus-style counters, gauges and histograms with per-thread shards.
+    
+    Each thread updates its own shard without taking a lock, so recording
+    a sample costs a couple of dict operations and request threads never
+    contend with each other. ``render()`` sums the shards when scraped;
+    shards of threads that have exited are folded into one retired shard.
+    Gauges tracked this way (``add`` with +1/-1) must be incremented and
+    decremented on the same thread, as in-flight counts are.
+    """
+    
+    def __init__(self, enabled: bool = METRICS_ENABLED, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        self._retired = _Shard(None)
+        self._lock = threading.Lock()
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._collectors: List[Callable[[], List[Tuple[str, str, str, Dict[str, str], float]]]] = []
+    
+    def describe(self, name: str, kind: str, help_text: str) -> None:
+        self._help[name] = (kind, help_text)
+    
+    def add_collector(self, collector: Callable[[], List[Tuple[str, str, str, Dict[str, str], float]]]) -> None:
+        """Register a callback returning ``(name, kind, help, labels, value)`` samples at scrape time."""
+        self._collectors.append(collector)
+    
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = _Shard(threading.current_thread())
+            with self._lock:
+                self._shards.append(shard)
+                if len(self._shards) > COMPACT_THRESHOLD:
+                    self._compact_locked()
+            self._local.shard = shard
+        return shard
+    
+    def _compact_locked(self) -> None:
+        live = []
+        for shard in self._shards:
+            if shard.alive():
+                live.append(shard)
+            else:
+                self._retired.merge(shard)
+        self._shards = live
+    
+    def inc(self, name: str, labels: Tuple[Tuple[str, str], ...] = (), value: float = 1) -> None:
+        if not self.enabled:
+            return
+        counters = self._shard().counters
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + value
+    
+    add = inc
+    
+    def observe(self, name: str, labels: Tuple[Tuple[str, str], ...], value: float) -> None:
+        if not self.enabled:
+            return
+        histograms = self._shard().histograms
+        key = (name, labels)
+        values = histograms.get(key)
+        if values is None:
+            values = histograms[key] = [0] * (len(self.buckets) + 3)
+        # Values above the last bucket land in the overflow slot at len(buckets)
+        values[bisect.bisect_left(self.buckets, value)] += 1
+        values[-2] += value
+        values[-1] += 1
+    
+    def snapshot(self) -> _Shard:
+        """All shards summed into one."""
+        with self._lock:
+            self._compact_locked()
+            shards = list(self._shards)
+            total = _Shard(None)
+            total.merge(self._retired)
+        for shard in shards:
+            # Copies are taken in one step each, so an owner thread adding a
+            # key concurrently cannot break the iteration
+            copy = _Shard(None)
+            copy.counters = dict(shard.counters)
+            copy.histograms = {key: list(values) for key, values in dict(shard.histograms).items()}
+            total.merge(copy)
+        return total
+    
+    def render(self) -> str:
+        """The registry in the Prometheus text exposition format (0.0.4)."""
+        total = self.snapshot()
+        families: Dict[str, List[str]] = {}
+        
+        for (name, labels), value in sorted(total.counters.items()):
+            families.setdefault(name, []).append(f'{name}{_labels(labels)} {_number(value)}')
+        
+        for (name, labels), values in sorted(total.histograms.items()):
+            lines = families.setdefault(name, [])
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(labels + (("le", _number(bound)),))} {_number(cumulative)}')
+            lines.append(f'{name}_bucket{_labels(labels + (("le", "+Inf"),))} {_number(values[-1])}')
+            lines.append(f'{name}_sum{_labels(labels)} {_number(values[-2])}')
+            lines.append(f'{name}_count{_labels(labels)} {_number(values[-1])}')
+        
+        for collector in self._collectors:
+            try:
+                samples = collector()
+            except Exception:
+                continue
+            for name, kind, help_text, labels, value in samples:
+                self._help.setdefault(name, (kind, help_text))
+                families.setdefault(name, []).append(
+                    f'{name}{_labels(tuple(sorted(labels.items())))} {_number(value)}')
+        
+        output = []
+        for name, lines in families.items():
+            kind, help_text = self._help.get(name, ('untyped', ''))
+            if help_text:
+                output.append(f'# HELP {name} {help_text}')
+            output.append(f'# TYPE {name} {kind}')
+            output.extend(lines)
+        return '\n'.join(output) + '\n'
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+def _number(value: float) -> str:
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+# Global instance
+metrics = MetricsRegistry()
+
+metrics.describe('http_requests_total', 'counter', 'HTTP requests by route and status.')
+metrics.describe('http_request_duration_seconds', 'histogram', 'HTTP request latency by route.')
+metrics.describe('http_requests_in_flight', 'gauge', 'HTTP requests being handled.')
+metrics.describe('http_request_exceptions_total', 'counter', 'Unhandled exceptions raised by views.')
+metrics.describe('db_requests_total', 'counter', 'Database calls by table (or function) and operation.')
+metrics.describe('db_request_duration_seconds', 'histogram', 'Database call latency by table and operation.')
+metrics.describe('db_errors_total', 'counter', 'Failed database calls by table and operation.')
+
+# Builder methods that decide what a query does
+DB_OPERATIONS = ('select', 'insert', 'upsert', 'update', 'delete')
+
+class InstrumentedQuery:
+    """Wraps a query builder and records the duration of ``execute()``."""
+    
+    __slots__ = ('_query', '_table', '_operation')
+    
+    def __init__(self, query: Any, table: str, operation: str):
+        self._query = query
+        self._table = table
+        self._operation = operation
+    
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._query, name)
+        if not callable(attribute):
+            return attribute
+        
+        def call(*args: Any, **kwargs: Any) -> Any:
+            result = attribute(*args, **kwargs)
+            if not hasattr(result, 'execute'):
+                return result
+            return InstrumentedQuery(result, self._table, name if name in DB_OPERATIONS else self._operation)
+        return call
+    
+    def execute(self) -> Any:
+        labels = (('operation', self._operation), ('table', self._table))
+        started_at = time.perf_counter()
+        try:
+            return self._query.execute()
+        except Exception:
+            metrics.inc('db_errors_total', labels)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started_at
+            metrics.inc('db_requests_total', labels)
+            metrics.observe('db_request_duration_seconds', labels, elapsed)
+            record_db_call(self._table, self._operation, elapsed)
+
+class InstrumentedClient:
+    """Wraps a database client so every table query and RPC is counted and traced."""
+    
+    __slots__ = ('_client',)
+    
+    def __init__(self, client: Any):
+        self._client = client
+    
+    def table(self, table: str) -> InstrumentedQuery:
+        return InstrumentedQuery(self._client.table(table), table, 'select')
+    
+    from_ = table
+    
+    def rpc(self, function: str, *args: Any, **kwargs: Any) -> InstrumentedQuery:
+        return InstrumentedQuery(self._client.rpc(function, *args, **kwargs), function, 'rpc')
+    
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+def instrument_client(client: Any) -> Any:
+    return InstrumentedClient(client) if metrics.enabled or TRACE_ENABLED else client
+
+def metrics_access_allowed() -> bool:
+    """Whether the current request may read ``/api/metrics``."""
+    if METRICS_TOKEN:
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() == 'bearer' and hmac.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+            return True
+    try:
+        address = ipaddress.ip_address(request.remote_addr or '')
+    except ValueError:
+        return False
+    return any(address in network for network in _allowed_networks)
+
+_allowed_networks = [ipaddress.ip_network(network.strip(), strict=False)
+                     for network in METRICS_ALLOWED_NETWORKS.split(',') if network.strip()]
+
+def init_metrics(app: Flask) -> None:
+    """Record per-route request metrics and serve them at ``/api/metrics``.
+    
+    The endpoint only answers ``METRICS_ALLOWED_NETWORKS`` or a
+    ``METRICS_TOKEN`` bearer; everyone else gets a 404.
+    """
+    if not metrics.enabled:
+        return
+    
+    def route_labels() -> Tuple[Tuple[str, str], ...]:
+        rule = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+        return (('blueprint', request.blueprint or ''), ('method', request.method), ('route', rule))
+    
+    @app.before_request
+    def start_metrics():
+        g.metrics_started_at = time.perf_counter()
+        metrics.add('http_requests_in_flight', (), 1)
+    
+    @app.teardown_request
+    def finish_metrics(error=None):
+        started_at = g.pop('metrics_started_at', None)
+        if started_at is None:
+            return
+        metrics.add('http_requests_in_flight', (), -1)
+        labels = route_labels()
+        status = g.pop('metrics_status', 500)
+        metrics.inc('http_requests_total', labels + (('status', str(status)),))
+        metrics.observe('http_request_duration_seconds', labels, time.perf_counter() - started_at)
+        if error is not None:
+            metrics.inc('http_request_exceptions_total', labels)
+    
+    @app.after_request
+    def record_status(response):
+        g.metrics_status = response.status_code
+        return response
+    
+    @app.route('/api/metrics', methods=['GET'])
+    def metrics_endpoint():
+        if not metrics_access_allowed():
+            abort(404)
+        return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,40 @@
+import base64
+import json
+from typing import Any, Dict, Optional
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+class PaginationError(ValueError):
+    """Raised for malformed ``limit``/``cursor`` query parameters."""
+
+def encode_cursor(position: Dict[str, Any]) -> str:
+    """Encode the last row's sort key as an opaque, URL-safe cursor."""
+    raw = json.dumps(position, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Decode a cursor produced by ``encode_cursor``."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError):
+        raise PaginationError('Invalid cursor')
+    if not isinstance(position, dict):
+        raise PaginationError('Invalid cursor')
+    return position
+
+def parse_limit(value: Optional[str], default: int = DEFAULT_PAGE_SIZE,
+                maximum: int = MAX_PAGE_SIZE) -> int:
+    """Parse the ``limit`` query parameter, clamped to ``maximum``."""
+    if value in (None, ''):
+        return default
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise PaginationError('limit must be an integer')
+    if limit < 1:
+        raise PaginationError('limit must be at least 1')
+    return min(limit, maximum)
@@ -0,0 +1,150 @@
+import bcrypt
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from decouple import config
+from typing import Any, Callable, Dict, Optional
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+BCRYPT_ROUNDS = config('BCRYPT_ROUNDS', default=12, cast=int)
+BCRYPT_WORKERS = config('BCRYPT_WORKERS', default=min(4, os.cpu_count() or 1), cast=int)
+# Requests allowed to wait for a worker before new ones are turned away
+BCRYPT_MAX_PENDING = config('BCRYPT_MAX_PENDING', default=32, cast=int)
+BCRYPT_TIMEOUT = config('BCRYPT_TIMEOUT', default=10, cast=float)
+
+class HasherBusyError(Exception):
+    """Raised when the hashing queue is full or too slow; callers should answer 503."""
+
+class PasswordHasher:
+    """Runs bcrypt on a small dedicated thread pool.
+    
+    bcrypt releases the GIL, so hashing on a size-capped pool keeps a login
+    burst from occupying every request thread while catalog traffic waits.
+    Work beyond ``workers + max_pending`` is rejected instead of queued.
+    """
+    
+    def __init__(self, rounds: int = BCRYPT_ROUNDS, workers: int = BCRYPT_WORKERS,
+                 max_pending: int = BCRYPT_MAX_PENDING, timeout: float = BCRYPT_TIMEOUT):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._completed = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._hash_seconds_total = 0.0
+        self._hash_seconds_max = 0.0
+        self._wait_seconds_total = 0.0
+        self._reset()
+    
+    def _reset(self) -> None:
+        """Drop the pool and its bookkeeping.
+        
+        Also runs in a forked child (gunicorn ``--preload`` workers): an
+        executor created before the fork has no threads there, and locks
+        or slots held by the parent's in-flight hashes would never be
+        released.
+        """
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_pending)
+        self._stats_lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                        thread_name_prefix='bcrypt')
+        return self._executor
+    
+    def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self._rejected += 1
+            raise HasherBusyError('Too many concurrent password operations, please retry')
+        
+        submitted_at = time.perf_counter()
+        with self._stats_lock:
+            self._queued += 1
+        
+        def task():
+            started_at = time.perf_counter()
+            with self._stats_lock:
+                self._queued -= 1
+                self._running += 1
+                self._wait_seconds_total += started_at - submitted_at
+            try:
+                return fn(*args)
+            finally:
+                elapsed = time.perf_counter() - started_at
+                with self._stats_lock:
+                    self._running -= 1
+                    self._completed += 1
+                    self._hash_seconds_total += elapsed
+                    self._hash_seconds_max = max(self._hash_seconds_max, elapsed)
+                self._slots.release()
+        
+        with span('bcrypt'):
+            future = self._get_executor().submit(task)
+            try:
+                return future.result(timeout=self.timeout)
+            except FutureTimeoutError:
+                # The task keeps its slot until it finishes, so a stuck pool
+                # soon turns new work away at the queue instead
+                with self._stats_lock:
+                    self._timed_out += 1
+                raise HasherBusyError('Password operation timed out, please retry')
+    
+    def hash(self, password: str) -> str:
+        """Hash a password with the configured cost factor."""
+        return self._run(
+            lambda: bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(self.rounds)).decode('utf-8')
+        )
+    
+    def verify(self, password: str, password_hash: str) -> bool:
+        """Check a password against a stored bcrypt hash."""
+        return self._run(
+            lambda: bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+        )
+    
+    @staticmethod
+    def get_rounds(password_hash: str) -> Optional[int]:
+        """Cost factor of a ``$2b$12$...`` hash, or None if unparseable."""
+        parts = password_hash.split('$')
+        try:
+            return int(parts[2])
+        except (IndexError, ValueError):
+            return None
+    
+    def needs_rehash(self, password_hash: str) -> bool:
+        """True when a stored hash was made with a different cost factor."""
+        return self.get_rounds(password_hash) != self.rounds
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            completed = self._completed
+            return {
+                'rounds': self.rounds,
+                'workers': self.workers,
+                'max_pending': self.max_pending,
+                'queue_depth': self._queued,
+                'running': self._running,
+                'completed': completed,
+                'rejected': self._rejected,
+                'timed_out': self._timed_out,
+                'hash_ms_avg': round(self._hash_seconds_total / completed * 1000, 2) if completed else 0.0,
+                'hash_ms_max': round(self._hash_seconds_max * 1000, 2),
+                'queue_wait_ms_avg': round(self._wait_seconds_total / completed * 1000, 2) if completed else 0.0
+            }
+
+# Global instance
+password_hasher = PasswordHasher()
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=password_hasher._reset)
@@ -0,0 +1,88 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import time
+from typing import Dict, Optional
+from flask import Flask, g, request
+from utils.tracing import span
+
+LOG_FORMAT = '[%(asctime)s] %(levelname)s in %(module)s: %(message)s'
+
+access_logger = logging.getLogger('access')
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """Parse ``'/api/health=0.01,/api/products=0.5'`` into path prefix -> rate."""
+    rates = {}
+    for item in value.split(','):
+        if '=' not in item:
+            continue
+        prefix, rate = item.split('=', 1)
+        rates[prefix.strip()] = max(0.0, min(1.0, float(rate)))
+    return rates
+
+def configure_logging(level: str = 'INFO', stream=None) -> None:
+    """Route all log records through a queue drained by a background thread.
+    
+    Request threads only enqueue records; formatting and console I/O happen
+    on the listener thread, so a slow stdout never stalls a request.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        atexit.unregister(_listener.stop)
+    
+    log_queue: queue.Queue = queue.Queue(-1)
+    console = logging.StreamHandler(stream or sys.stdout)
+    console.setFormatter(logging.Formatter(LOG_FORMAT))
+    
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level.upper())
+    
+    _listener = logging.handlers.QueueListener(log_queue, console, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+def init_logging(app: Flask) -> None:
+    """Configure logging from app config and register the access log."""
+    configure_logging(app.config.get('LOG_LEVEL', 'INFO'))
+    # Werkzeug's own per-request line would duplicate the access log
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    
+    sample_rates = parse_sample_rates(app.config.get('ACCESS_LOG_SAMPLE_RATES', ''))
+    # Longest prefix first so '/api/products/suggest' beats '/api/products'
+    prefixes = sorted(sample_rates, key=len, reverse=True)
+    
+    def sample_rate(path: str) -> float:
+        for prefix in prefixes:
+            if path.startswith(prefix):
+                return sample_rates[prefix]
+        return 1.0
+    
+    @app.before_request
+    def start_timer():
+        g.request_started_at = time.perf_counter()
+    
+    @app.after_request
+    def log_access(response):
+        if request.method == 'OPTIONS':
+            return response
+        # Server errors are always logged; everything else is sampled per route
+        rate = sample_rate(request.path)
+        if response.status_code < 500 and rate < 1.0 and random.random() >= rate:
+            return response
+        started_at = g.get('request_started_at')
+        duration_ms = (time.perf_counter() - started_at) * 1000 if started_at else 0.0
+        with span('log'):
+            access_logger.info('%s %s %s %s %sB %.1fms',
+                               request.remote_addr, request.method, request.full_path.rstrip('?'),
+                               response.status_code, response.calculate_content_length() or '-',
+                               duration_ms)
+        return response
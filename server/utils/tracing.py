@@ -0,0 +1,101 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+from decouple import config
+from flask import Flask, g, has_request_context, request
+
+logger = logging.getLogger(__name__)
+
+TRACE_ENABLED = config('TRACE_ENABLED', default=True, cast=bool)
+# Warn about requests making more database calls than this (N+1 queries); 0 turns it off
+TRACE_MAX_DB_CALLS = config('TRACE_MAX_DB_CALLS', default=0, cast=int)
+
+class RequestTrace:
+    """Time spent per span name during one request."""
+    
+    __slots__ = ('started_at', 'spans', 'db_calls')
+    
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        # name -> [seconds, count], in first-seen order
+        self.spans: Dict[str, List[float]] = {}
+        # 'table.operation' -> calls
+        self.db_calls: Dict[str, int] = {}
+    
+    def add(self, name: str, seconds: float) -> None:
+        span = self.spans.get(name)
+        if span is None:
+            self.spans[name] = [seconds, 1]
+        else:
+            span[0] += seconds
+            span[1] += 1
+    
+    def server_timing(self) -> str:
+        """The ``Server-Timing`` header value: one entry per span plus the total."""
+        entries = []
+        for name, (seconds, count) in self.spans.items():
+            entry = f'{name};dur={seconds * 1000:.2f}'
+            if count > 1:
+                entry += f';desc="{count} calls"'
+            entries.append(entry)
+        entries.append(f'total;dur={(time.perf_counter() - self.started_at) * 1000:.2f}')
+        return ', '.join(entries)
+
+def current_trace() -> Optional[RequestTrace]:
+    if not TRACE_ENABLED or not has_request_context():
+        return None
+    return g.get('trace')
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time the enclosed block as ``name`` in the current request's trace.
+    
+    Outside a request (background threads, scripts) this does nothing.
+    """
+    trace = current_trace()
+    if trace is None:
+        yield
+        return
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, time.perf_counter() - started_at)
+
+def record_db_call(table: str, operation: str, seconds: float) -> None:
+    trace = current_trace()
+    if trace is None:
+        return
+    trace.add('db', seconds)
+    key = f'{table}.{operation}'
+    trace.db_calls[key] = trace.db_calls.get(key, 0) + 1
+
+def init_tracing(app: Flask) -> None:
+    """Trace each request and report its spans in a ``Server-Timing`` header.
+    
+    Registered before the other hooks so its ``after_request`` runs last
+    and the header covers compression and access logging too.
+    """
+    if not TRACE_ENABLED:
+        return
+    
+    @app.before_request
+    def start_trace():
+        g.trace = RequestTrace()
+    
+    @app.after_request
+    def finish_trace(response):
+        trace = g.pop('trace', None)
+        if trace is None:
+            return response
+        response.headers['Server-Timing'] = trace.server_timing()
+        
+        db_calls = sum(trace.db_calls.values())
+        if TRACE_MAX_DB_CALLS and db_calls > TRACE_MAX_DB_CALLS:
+            breakdown = ', '.join(f'{key} x{count}' for key, count in
+                                  sorted(trace.db_calls.items(), key=lambda item: -item[1]))
+            rule = request.url_rule.rule if request.url_rule is not None else request.path
+            logger.warning(f"⚠️ {request.method} {rule} made {db_calls} database calls "
+                           f"(limit {TRACE_MAX_DB_CALLS}): {breakdown}")
+        return response